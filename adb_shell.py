@@ -0,0 +1,183 @@
+import logging
+import queue
+import subprocess
+import threading
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+SENTINEL = '__ADB_SHELL_DONE__'
+
+
+class AdbShellError(Exception):
+    """
+    Raised when a pooled 'adb shell' session died or did not answer in time.
+    """
+
+
+class AdbShellInterrupted(AdbShellError):
+    """
+    Raised when a pooled 'adb shell' session failed after the command was sent, so the command may have run.
+    """
+
+
+class AdbShellSession:
+    """
+    This class keeps a single long-lived 'adb -s <udid> shell' process open and runs commands through its stdin.
+    Every command is followed by a 'printf' of a newline, a unique sentinel and the command exit status, so the
+    command output is framed by reading stdout until the sentinel line shows up, even when the output does
+    not end with a newline.
+    """
+
+    def __init__(self, udid, timeout=10):
+        self.udid = udid
+        self.timeout = timeout
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._lines = queue.Queue()
+        args = ['adb', '-s', self.udid, 'shell']
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=False)
+        self._reader = threading.Thread(target=self._read_lines, name=f'adb-shell-{udid}', daemon=True)
+        self._reader.start()
+        LOGGER.debug(f'Opened adb shell session to {self.udid}')
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def run(self, command):
+        """
+        This method runs a shell command on the device through the open session.
+
+        Args:
+            command:    the shell command, e.g. 'svc wifi enable'
+
+        Returns:
+            bytes:      the command output
+
+        Raises:
+            AdbShellError:                  if the session is closed or the command could not be sent
+            AdbShellInterrupted:            if the session died or timed out after the command was sent
+            subprocess.CalledProcessError:  if the command exited with a non-zero status
+        """
+
+        with self._lock, span('adb shell', 'adb', command=command, pooled=True):
+            if not self.is_alive():
+                raise AdbShellError(f'adb shell session to {self.udid} is closed')
+
+            self._sequence += 1
+            sentinel = f'{SENTINEL}{self._sequence}'
+            try:
+                self.process.stdin.write(f"{command}; printf '\\n%s %d\\n' {sentinel} $?\n".encode('utf-8'))
+                self.process.stdin.flush()
+            except OSError as error:
+                raise AdbShellError(f'Was unable to write to adb shell session of {self.udid}: {error}')
+
+            output = []
+            while True:
+                try:
+                    line = self._lines.get(timeout=self.timeout)
+                except queue.Empty:
+                    self.close()
+                    raise AdbShellInterrupted(f'"{command}" timed out on adb shell session of {self.udid}')
+                if line is None:
+                    raise AdbShellInterrupted(f'adb shell session to {self.udid} was closed while running "{command}"')
+
+                text = line.decode('utf-8', errors='replace').strip()
+                if text.startswith(sentinel):
+                    status = int(text[len(sentinel):].strip() or 0)
+                    break
+                output.append(line)
+
+        # The last newline is the one printed before the sentinel
+        output = b''.join(output)
+        output = output[:-2] if output.endswith(b'\r\n') else output[:-1]
+        # Line endings as a one-shot 'adb shell' prints them, and no line ending added to the last line
+        reply = b'\r\n'.join(output.splitlines())
+        if output.endswith(b'\n'):
+            reply += b'\r\n'
+        if status != 0:
+            raise subprocess.CalledProcessError(status, command, output=reply)
+        return reply
+
+    def close(self):
+        if self.is_alive():
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.kill()
+        self.process.wait()
+        LOGGER.debug(f'Closed adb shell session to {self.udid}')
+
+    def _read_lines(self):
+        for line in iter(self.process.stdout.readline, b''):
+            self._lines.put(line)
+        self._lines.put(None)
+
+
+class AdbShellPool:
+    """
+    This class holds one AdbShellSession per device, and reopens a session whose process died.
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._sessions = dict()
+        self._lock = threading.Lock()
+
+    def session(self, udid):
+        with self._lock:
+            session = self._sessions.get(udid)
+            if session is None or not session.is_alive():
+                session = AdbShellSession(udid, timeout=self.timeout)
+                self._sessions[udid] = session
+            return session
+
+    def run(self, udid, command):
+        return self.session(udid).run(command)
+
+    def close(self, udid=None):
+        with self._lock:
+            udids = list(self._sessions) if udid is None else [udid]
+            for serial in udids:
+                session = self._sessions.pop(serial, None)
+                if session is not None:
+                    session.close()
+
+
+def run_shell_command(udid, command, pool=None):
+    """
+    This function runs a shell command on the android device. When a pool is given the command goes
+    through the pooled 'adb shell' session of the device, otherwise (or if the session failed before the
+    command was sent) it falls back to the one-shot command:
+    adb -s <udid> shell <command>
+
+    Args:
+        udid:       the device serial
+        command:    the shell command, e.g. 'svc wifi enable'
+        pool:       AdbShellPool, or None for one-shot mode
+
+    Returns:
+        bytes:      the command output
+
+    Raises:
+        subprocess.CalledProcessError:  if the command exited with a non-zero status
+        OSError:                        if 'adb' could not be executed
+        AdbShellInterrupted:            if the pooled session failed after the command was sent. The command
+                                        is not run again, as it may not be safe to repeat
+    """
+
+    if pool is not None:
+        try:
+            return pool.run(udid, command)
+        except AdbShellInterrupted:
+            raise
+        except (AdbShellError, OSError) as error:
+            LOGGER.warning(f'Falling back to one-shot adb command: {error}')
+
+    args = ['adb', '-s', udid, 'shell', command]
+    with span('adb shell', 'adb', command=command, pooled=False):
+        return subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
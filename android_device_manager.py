@@ -1,21 +1,35 @@
+import asyncio
 import logging
-from logger import init_logger
-import re
-from Configuration.auto_configuration import Settings
 import subprocess
+from logger import init_logger
+from device_cache import DeviceCache
+from adb_shell import AdbShellError, run_shell_command
+from async_subprocess import run_command, run_sync
+from appium_sessions import AppiumSessionManager
+from page_load_metrics import PageLoadStats, measure_navigation
+from android_wifi_state import WifiStateProbe, WifiToggleTiming
+from ui_snapshot import UiSnapshotIndex
+from tracing import span, traced
 import time
-from appium import webdriver
-from appium.webdriver.common.touch_action import TouchAction
 
 
 LOGGER = logging.getLogger(__name__)
 # LOGGER.setLevel(logging.DEBUG)
 LOGGER.setLevel(logging.INFO)
 
+SETTINGS_PACKAGE = 'com.android.settings'
+SETTINGS_ACTIVITY = '.Settings'
+
 
 class AndroidManager:
-    def __init__(self):
+    def __init__(self, udid=None, device_cache=None, shell_pool=None, appium_sessions=None, page_load_timeout=30):
         LOGGER.info(f'AndroidManager object has been created')
+        self.page_load_timeout = page_load_timeout
+        self.page_loads = PageLoadStats()
+        self.target_udid = udid
+        self.appium_sessions = appium_sessions if appium_sessions is not None else AppiumSessionManager()
+        self.shell_pool = shell_pool
+        self.device_cache = device_cache if device_cache is not None else DeviceCache(shell_pool=shell_pool)
         self.udid_reply_msg = ''
         self.udid = ''
         self.model_reply_msg = ''
@@ -25,95 +39,95 @@ class AndroidManager:
         self.desired_caps = dict()
         self.wifi_enable_reply_msg = ''
         self.wifi_disable_reply_msg = ''
+        self.wifi_state = None
+        self.wifi_timings = []
         self.driver = ''
+        self.ui_index = None
+
+    @traced()
+    def get_device_identity(self):
+        """
+        This method returns the identity of the device from the device cache. The device is the one
+        whose UDID was given to the constructor, or the first attached device otherwise.
+        The cache fills the UDID, model and platform version with a single probe, so repeated
+        calls do not run any 'adb' command until the cache entry expires or is invalidated.
+
+        Args:
+            NA
+
+        Returns:
+            DeviceIdentity:     the device identity, or None if no device is attached
+
+        Raises:
+            NA
+        """
+
+        identity = self.device_cache.get(self.target_udid)
+        if identity is None:
+            LOGGER.error(f'Was unable to find an attached android device {self.target_udid or ""}')
+            return None
+
+        self.udid = identity.udid
+        self.device_model = identity.model
+        self.platform_version = identity.platform_version
+        return identity
 
     def get_device_udid(self):
         """
-        This method extract the device UDID by running the next 'adb' command:
+        This method returns the device UDID, as listed by the next 'adb' command:
         adb devices
 
         Args:
             NA
 
         Returns:
-            int:    udid
+            str:    udid, None if no device is attached
 
         Raises:
             NA
         """
 
-        args = ['adb', 'devices']
-        try:
-            self.udid_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            LOGGER.debug(f'{self.udid_reply_msg}')
-            pattern = re.search('attached\r\n(.+?)\tdevice', self.udid_reply_msg.decode("utf-8"))
-
-            if pattern:
-                LOGGER.info(f'Device UDID is: {pattern.group(1)}')
-                self.udid = pattern.group(1)
-                return self.udid
-        except:
-            LOGGER.error(f'Got exception while trying to run "adb devices" command. Got next reply: {self.udid_reply_msg()}')
+        if self.get_device_identity():
+            LOGGER.info(f'Device UDID is: {self.udid}')
+            return self.udid
 
     def get_device_model(self):
         """
-        This method extract the DEVICE MODEL by running the next 'adb' command:
+        This method returns the DEVICE MODEL, as listed by the next 'adb' command:
         adb devices -l
 
         Args:
             NA
 
         Returns:
-            int:    device model
+            str:    device model
 
         Raises:
             NA
         """
 
-        args = ['adb', 'devices', '-l']
-        try:
-            self.model_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            LOGGER.debug(f'{self.model_reply_msg}')
-            # Extract the DEVICE MODEL from reply:
-            pattern = re.search('model:(.+?)device:', self.model_reply_msg.decode("utf-8"))
-
-            if pattern:
-                LOGGER.info(f'Device Model is: {pattern.group(1)}')
-                self.device_model = pattern.group(1)
-                return self.device_model
-
-        except:
-            LOGGER.error(f'Got exception while trying to run "adb devices -l" command. Got next reply: {self.model_reply_msg}')
+        if self.get_device_identity():
+            LOGGER.info(f'Device Model is: {self.device_model}')
+            return self.device_model
 
     def get_device_platform_version(self):
         """
-        This method extract the device PLATFORM VERSION by running the next 'adb' command:
+        This method returns the device PLATFORM VERSION, as reported by the next 'adb' command:
         adb shell getprop ro.build.version.release
 
         Args:
             NA
 
         Returns:
-            int:    platform version
+            str:    platform version
 
         Raises:
             NA
         """
 
-        args = ['adb', 'shell', 'getprop', 'ro.build.version.release']
-        try:
-            self.platform_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            LOGGER.debug(f'{self.platform_reply_msg}')
-            # Extract the PLATFORM VERSION from reply:
-            pattern = re.search('(.+?)\r\n', self.platform_reply_msg.decode("utf-8"))
-
-            if pattern:
-                LOGGER.info(f'Device OS version: Android {pattern.group(1)}')
-                self.platform_version = pattern.group(1)
-                return self.platform_version
-
-        except:
-            LOGGER.error(f'Got exception while trying to run "adb shell getprop ro.build.version.release" command. Got next reply: {self.platform_reply_msg}')
+        if self.get_device_identity():
+            LOGGER.info(f'Device OS version: Android {self.platform_version}')
+            return self.platform_version
 
     def create_desire_capabilities(self, type):
         """
@@ -131,18 +145,20 @@ class AndroidManager:
             NA
         """
 
+        self.get_device_identity()
+        self.desired_caps = dict()
         self.desired_caps["platformName"] = "Android"
-        self.desired_caps["deviceName"] = self.get_device_model()
-        self.desired_caps["udid"] = self.get_device_udid()
-        self.desired_caps["platformVersion"] = self.get_device_platform_version()
+        self.desired_caps["deviceName"] = self.device_model
+        self.desired_caps["udid"] = self.udid
+        self.desired_caps["platformVersion"] = self.platform_version
 
         if type == 'chrome':
             self.desired_caps["browserName"] = "Chrome"
             LOGGER.info(f'Created successfully desired capabilities dictionary for settings: {self.desired_caps}')
 
         elif type == 'settings':
-            self.desired_caps["appPackage"] = "com.android.settings"
-            self.desired_caps["appActivity"] = ".Settings"
+            self.desired_caps["appPackage"] = SETTINGS_PACKAGE
+            self.desired_caps["appActivity"] = SETTINGS_ACTIVITY
             LOGGER.info(f'Created successfully desired capabilities dictionary for chrome: {self.desired_caps}')
 
         else:
@@ -150,60 +166,58 @@ class AndroidManager:
 
         return self.desired_caps
 
-    def turn_wifi_on(self):
+    @traced()
+    def turn_wifi_on(self, wait=False, timeout=20, reconnect=True):
         """
         This method turns 'ON' the Wi-Fi button on the Android device
 
         Args:
-            NA
+            wait:       block until the device reports that Wi-Fi is enabled, instead of returning right after
+                        'svc wifi enable'
+            timeout:    seconds to wait
+            reconnect:  with 'wait', wait until the device is connected to a network again as well
 
         Returns:
-            NA
+            WifiToggleTiming:   the enable (and reconnect) latency. 'error' is None on success
 
         Raises:
             NA
         """
 
-        self.get_device_udid()
-        args = ['adb', '-s', self.udid, 'shell', 'svc wifi enable']
-        try:
-            self.wifi_enable_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            LOGGER.debug(f'{self.wifi_enable_reply_msg}')
-            LOGGER.info('Turned Wi-Fi on')
+        return self._toggle_wifi(True, wait, timeout, reconnect)
 
-        except:
-            LOGGER.error(f"Got exception while trying to turn on device's wi-fi. Got next reply: {self.wifi_enable_reply_msg()}")
-
-    def turn_wifi_off(self):
+    @traced()
+    def turn_wifi_off(self, wait=False, timeout=20):
         """
         This method turns 'OFF' the Wi-Fi button on the Android device
 
         Args:
-            NA
+            wait:       block until the device reports that Wi-Fi is disabled, instead of returning right after
+                        'svc wifi disable'
+            timeout:    seconds to wait
 
         Returns:
-            NA
+            WifiToggleTiming:   the disable latency. 'error' is None on success
 
         Raises:
             NA
         """
 
-        self.get_device_udid()
-        args = ['adb', '-s', self.udid, 'shell', 'svc wifi disable']
-        try:
-            self.wifi_disable_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            LOGGER.debug(f'{self.wifi_disable_reply_msg}')
-            LOGGER.info('Turned Wi-Fi off')
-            'usage'
-        except:
-            LOGGER.error(f"Got exception while trying to turn off device's wi-fi. Got next reply: {self.wifi_disable_reply_msg()}")
+        return self._toggle_wifi(False, wait, timeout, False)
+
+    def _toggle_wifi(self, enable, wait, timeout, reconnect):
+        return run_sync(AsyncAndroidManager(manager=self).toggle_wifi(enable, wait=wait, wait_timeout=timeout, reconnect=reconnect))
 
-    def connect_to_wifi(self):
+    @traced()
+    def connect_to_wifi(self, use_snapshot=False):
         """
         This method connects the android device to a Wi-Fi network which its ssid named in the method input argument.
 
         Args:
-            ssid:   Wi-Fi ssid
+            ssid:           Wi-Fi ssid
+            use_snapshot:   resolve the settings elements against one page source snapshot per screen and tap
+                            them by their bounds, instead of a find_element round trip per element after a
+                            fixed sleep
 
         Returns:
             True:   If connecting to Wi-Fi was successful
@@ -213,46 +227,272 @@ class AndroidManager:
             NA
         """
 
-        self.create_desire_capabilities('settings')
         try:
-            self.driver = webdriver.Remote("http://localhost:4723/wd/hub", self.desired_caps)
-            LOGGER.info(f'Launching chrome')
-            time.sleep(1)
+            self.driver = self.appium_sessions.get(self, 'settings')
+            # A reused session may have been left on any settings screen
+            self.driver.start_activity(SETTINGS_PACKAGE, SETTINGS_ACTIVITY)
+            LOGGER.info(f'Launching settings')
+            if use_snapshot:
+                self.ui_index = UiSnapshotIndex(self.driver)
+                self.ui_index.tap('id', 'com.android.settings:id/dashboard_tile')
+                self.ui_index.tap('id', 'com.android.settings:id/icon_frame')
+                return True
+
+            with span('sleep', 'sleep'):
+                time.sleep(1)
             self.el = self.driver.find_element_by_id('com.android.settings:id/dashboard_tile')
             self.el.click()
 
-            time.sleep(1)
+            with span('sleep', 'sleep'):
+                time.sleep(1)
             self.el = self.driver.find_element_by_id('com.android.settings:id/icon_frame')
             self.el.click()
+            return True
 
-        except:
-            pass
+        except Exception as error:
+            LOGGER.error(f'Was unable to open the Wi-Fi settings: {error!r}')
+            return False
 
-    def browse_to(self, url):
+    @traced()
+    def browse_to(self, url, ap_config=''):
         """
-        This method navigates the chrome browser to the selected 'url' in the method input argument.
+        This method navigates the chrome browser to the selected 'url' in the method input argument, and
+        measures how long the page took to load.
 
         Args:
-            url:    a valid url
+            url:        a valid url
+            ap_config:  a label of the AP configuration under test, stored in the measurement
 
         Returns:
+            PageLoadRecord: the measured navigation, or None if chrome could not be launched
+
+        Raises:
             NA
+        """
+
+        records = self.browse_many([url], ap_config)
+        return records[0] if records else None
+
+    @traced()
+    def browse_many(self, urls, ap_config=''):
+        """
+        This method navigates the chrome browser to every url in 'urls', one after the other, in a single
+        Appium session. Every navigation waits for the document to be ready, and its navigation timing
+        (DNS, connect, TTFB, load) is added to self.page_loads.
+
+        Args:
+            urls:       a list of valid urls
+            ap_config:  a label of the AP configuration under test, stored in the measurements
+
+        Returns:
+            list:   PageLoadRecord per url
 
         Raises:
             NA
         """
 
-        self.create_desire_capabilities('chrome')
+        records = []
         try:
-            self.driver = webdriver.Remote("http://localhost:4723/wd/hub", self.desired_caps)
-            LOGGER.info(f'Launching chrome')
-            time.sleep(1)
-            self.driver.get(url)
-            LOGGER.info(f'Navigating chrome to: {url}')
-            time.sleep(3)
-            self.driver.close()
+            self.driver = self.appium_sessions.get(self, 'chrome')
+            for url in urls:
+                LOGGER.info(f'Navigating chrome to: {url}')
+                record = measure_navigation(self.driver, url, self.udid, ap_config, timeout=self.page_load_timeout)
+                if record.error is None:
+                    LOGGER.info(f'Loaded {url} in {record.load} ms (TTFB {record.ttfb} ms)')
+                else:
+                    LOGGER.error(f'Was unable to measure the navigation to {url}: {record.error}')
+                self.page_loads.add(record)
+                records.append(record)
         except:
             LOGGER.error(f'Was unable to  run chrome')
+        return records
+
+    def close(self):
+        """
+        This method quits the Appium sessions of the device.
+
+        Args:
+            NA
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        self.appium_sessions.close(self.udid or None)
+
+
+class AsyncAndroidManager:
+    """
+    This class runs AndroidManager's adb commands with asyncio; AndroidManager's Wi-Fi toggles wrap it.
+    Every command runs with asyncio.create_subprocess_exec under a per-call timeout, and at most
+    'max_concurrency' adb processes run at the same time. Cancelling a call kills its adb process.
+    When the AndroidManager 'manager' has a shell pool, the commands go through its pooled 'adb shell'
+    session in a worker thread instead.
+    The device identity, Wi-Fi state probe and toggle timings are kept by 'manager' (a new AndroidManager for
+    'udid' and 'device_cache' by default).
+    """
+
+    def __init__(self, udid=None, device_cache=None, timeout=30, max_concurrency=8, limiter=None, manager=None):
+        self.manager = manager if manager is not None else AndroidManager(udid=udid, device_cache=device_cache)
+        self.timeout = timeout
+        self.limiter = limiter if limiter is not None else asyncio.Semaphore(max_concurrency)
+
+    async def get_device_udid(self):
+        """
+        This coroutine returns the device UDID. A cached identity is returned immediately, a cache miss
+        probes the device in a worker thread.
+
+        Args:
+            NA
+
+        Returns:
+            str:    udid
+
+        Raises:
+            NA
+        """
+
+        identity = self.manager.device_cache.get_cached(self.manager.target_udid)
+        if identity is None:
+            identity = await asyncio.to_thread(self.manager.get_device_identity)
+        if identity is not None:
+            self.manager.udid = identity.udid
+            self.manager.device_model = identity.model
+            self.manager.platform_version = identity.platform_version
+            return identity.udid
+
+    async def shell(self, command, timeout=None):
+        """
+        This coroutine runs a shell command on the device, through the manager's pooled 'adb shell' session
+        if it has a shell pool:
+        adb -s <udid> shell <command>
+        The limiter and the timeout apply to both paths, and a timed out or cancelled command is killed.
+
+        Args:
+            command:    the shell command, e.g. 'svc wifi enable'
+            timeout:    seconds to wait for the command. None uses the manager's timeout
+
+        Returns:
+            bytes:      the command output
+
+        Raises:
+            LookupError:                    if no device is attached
+            asyncio.TimeoutError:           if the command did not finish in time
+            subprocess.CalledProcessError:  if the command exited with a non-zero status
+            OSError:                        if 'adb' could not be executed
+            AdbShellError:                  if the pooled 'adb shell' session failed
+        """
+
+        udid = await self.get_device_udid()
+        if udid is None:
+            raise LookupError('No android device is attached')
+        if self.manager.shell_pool is not None:
+            async with self.limiter:
+                try:
+                    return await asyncio.wait_for(asyncio.to_thread(run_shell_command, udid, command, self.manager.shell_pool),
+                                                  timeout or self.timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # The worker thread cannot be stopped, so the session is closed: the command is killed
+                    # instead of finishing in the background, and the next command opens a new session
+                    LOGGER.warning(f'Closing the adb shell session of {udid}, "{command}" was interrupted')
+                    self.manager.shell_pool.close(udid)
+                    raise
+        args = ['adb', '-s', udid, 'shell', command]
+        return await run_command(args, timeout=timeout or self.timeout, limiter=self.limiter)
+
+    async def turn_wifi_on(self, timeout=None):
+        """
+        This coroutine turns 'ON' the Wi-Fi button on the Android device
+
+        Args:
+            timeout:    seconds to wait for the adb command
+
+        Returns:
+            True:   If the Wi-Fi was turned on
+            False:  If the adb command failed or timed out
+
+        Raises:
+            NA
+        """
+
+        timing = await self.toggle_wifi(True, timeout)
+        return timing.error is None
+
+    async def turn_wifi_off(self, timeout=None):
+        """
+        This coroutine turns 'OFF' the Wi-Fi button on the Android device
+
+        Args:
+            timeout:    seconds to wait for the adb command
+
+        Returns:
+            True:   If the Wi-Fi was turned off
+            False:  If the adb command failed or timed out
+
+        Raises:
+            NA
+        """
+
+        timing = await self.toggle_wifi(False, timeout)
+        return timing.error is None
+
+    async def toggle_wifi(self, enable, timeout=None, wait=False, wait_timeout=20, reconnect=True):
+        """
+        This coroutine turns the Wi-Fi of the Android device on or off, and optionally waits until the device
+        reports the new state.
+
+        Args:
+            enable:         turn the Wi-Fi on (True) or off (False)
+            timeout:        seconds to wait for the adb command. None uses the manager's timeout
+            wait:           wait until the device reports the new Wi-Fi state, see WifiStateProbe
+            wait_timeout:   seconds, from the request, to wait for the new state
+            reconnect:      with 'wait' and 'enable', wait until the device is connected to a network again
+
+        Returns:
+            WifiToggleTiming:   the command (and state, reconnect) latency. 'error' is None on success
+
+        Raises:
+            NA
+        """
+
+        manager = self.manager
+        action = 'on' if enable else 'off'
+        requested_at = time.monotonic()
+        try:
+            reply = await self.shell(f'svc wifi {"enable" if enable else "disable"}', timeout)
+            if enable:
+                manager.wifi_enable_reply_msg = reply
+            else:
+                manager.wifi_disable_reply_msg = reply
+            LOGGER.debug(f'{reply}')
+        except (LookupError, asyncio.TimeoutError, subprocess.CalledProcessError, OSError, AdbShellError) as error:
+            LOGGER.error(f"Got exception while trying to turn {action} device's wi-fi. Got next reply: {error!r}")
+            if manager.udid:
+                manager.device_cache.invalidate(manager.udid)
+            return WifiToggleTiming(manager.udid or None, manager.device_model, action, None, None, None, repr(error))
+
+        command_latency = time.monotonic() - requested_at
+        state_latency = reconnect_latency = error = None
+        if wait:
+            if manager.wifi_state is None or manager.wifi_state.udid != manager.udid:
+                manager.wifi_state = WifiStateProbe(manager.udid, manager.shell_pool)
+            state_latency, reconnect_latency, error = await asyncio.to_thread(
+                manager.wifi_state.wait, enable, requested_at, wait_timeout, reconnect and enable)
+
+        timing = WifiToggleTiming(manager.udid, manager.device_model, action, command_latency, state_latency,
+                                  reconnect_latency, error)
+        manager.wifi_timings.append(timing)
+        if error is not None:
+            LOGGER.error(f'Wi-Fi of {manager.udid} did not turn {action}: {error}')
+        elif state_latency is None:
+            LOGGER.info(f'Turned Wi-Fi {action}')
+        else:
+            reconnected = '' if reconnect_latency is None else f', reconnected after {reconnect_latency:.3f}s'
+            LOGGER.info(f'Turned Wi-Fi {action} in {state_latency:.3f}s{reconnected}')
+        return timing
 
 
 if __name__ == '__main__':
@@ -272,8 +512,7 @@ if __name__ == '__main__':
 
     # android.clear_browser_history()
 
-    # android.turn_wifi_off()
-    # time.sleep(5)
-    # android.turn_wifi_on()
+    # android.turn_wifi_off(wait=True)
+    # android.turn_wifi_on(wait=True)
 
     # android.connect_to_wifi()
@@ -0,0 +1,131 @@
+import logging
+import re
+import subprocess
+import time
+from collections import namedtuple
+from adb_shell import run_shell_command
+from page_load_metrics import percentile
+from waits import WaitTimeoutError, poll_until
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+WifiToggleTiming = namedtuple('WifiToggleTiming', ['udid', 'model', 'action', 'command', 'state', 'reconnect', 'error'])
+WifiToggleTiming.__doc__ = '''
+Latencies, in seconds from the 'svc wifi' request, of a Wi-Fi toggle: 'command' until svc returned, 'state' until the
+device reported the requested Wi-Fi state, and 'reconnect' until it was connected to a network again (enable only).
+A latency which was not measured is None.
+'''
+
+# 'cmd wifi status' (Android 11+) / 'dumpsys wifi' replies
+_ENABLED = re.compile(r'Wi-?Fi is (enabled|disabled)', re.IGNORECASE)
+_CONNECTED = re.compile(r'Wifi is connected to|state: CONNECTED/CONNECTED', re.IGNORECASE)
+
+STATUS_COMMANDS = ['cmd wifi status', 'dumpsys wifi']
+
+
+def parse_wifi_status(reply):
+    """
+    This function parses the reply of 'cmd wifi status' or 'dumpsys wifi'.
+
+    Args:
+        reply:  the command output, as a str
+
+    Returns:
+        tuple:  (enabled, connected). enabled is None if the reply does not state it
+
+    Raises:
+        NA
+    """
+
+    match = _ENABLED.search(reply)
+    enabled = None if match is None else match.group(1).lower() == 'enabled'
+    return enabled, bool(_CONNECTED.search(reply))
+
+
+class WifiStateProbe:
+    """
+    This class reads the Wi-Fi state of an android device through 'cmd wifi status', and falls back to the
+    slower 'dumpsys wifi' on devices which do not support it.
+    """
+
+    def __init__(self, udid, shell_pool=None):
+        self.udid = udid
+        self.shell_pool = shell_pool
+        self.command = STATUS_COMMANDS[0]
+
+    def read(self):
+        """
+        Returns (enabled, connected) of the device, see parse_wifi_status().
+        """
+        while True:
+            try:
+                reply = run_shell_command(self.udid, self.command, self.shell_pool).decode('utf-8', errors='replace')
+            except subprocess.CalledProcessError as error:
+                reply = (error.output or b'').decode('utf-8', errors='replace')
+            enabled, connected = parse_wifi_status(reply)
+            if enabled is not None or self.command == STATUS_COMMANDS[-1]:
+                return enabled, connected
+            LOGGER.debug(f'"{self.command}" is not supported by {self.udid}, falling back to "{STATUS_COMMANDS[-1]}"')
+            self.command = STATUS_COMMANDS[-1]
+
+    def wait(self, enable, requested_at, timeout=20, reconnect=True):
+        """
+        This method polls the Wi-Fi state, with a growing poll interval, until it is 'enable'd / disabled and,
+        when enabling with 'reconnect', until the device is connected to a network again.
+
+        Args:
+            enable:         the requested Wi-Fi state
+            requested_at:   time.monotonic() of the 'svc wifi' request
+            timeout:        seconds, from the request, to wait
+            reconnect:      wait for a network connection after enabling
+
+        Returns:
+            tuple:  (state latency, reconnect latency, error). Latencies are None if not reached
+
+        Raises:
+            NA
+        """
+
+        state_latency = reconnect_latency = error = None
+        try:
+            poll_until(lambda: self.read()[0] == enable, timeout=max(requested_at + timeout - time.monotonic(), 0),
+                       initial_interval=0.05, max_interval=0.5)
+            state_latency = time.monotonic() - requested_at
+            if enable and reconnect:
+                poll_until(lambda: self.read()[1], timeout=max(requested_at + timeout - time.monotonic(), 0),
+                           initial_interval=0.05, max_interval=0.5)
+                reconnect_latency = time.monotonic() - requested_at
+        except WaitTimeoutError as exception:
+            error = f'Timed out after {timeout}s: {exception}'
+        return state_latency, reconnect_latency, error
+
+
+def readiness_by_model(timings, percents=(50, 90)):
+    """
+    This function summarises measured Wi-Fi toggles per device model and action.
+
+    Args:
+        timings:    WifiToggleTiming records, e.g. AndroidManager.wifi_timings
+        percents:   the percentiles to compute
+
+    Returns:
+        dict:   {(model, action): {'count': n, 'state': {percent: seconds}, 'reconnect': {percent: seconds}}}
+
+    Raises:
+        NA
+    """
+
+    groups = dict()
+    for timing in timings:
+        if timing.error is None and timing.state is not None:
+            groups.setdefault((timing.model, timing.action), []).append(timing)
+    summary = dict()
+    for key, group in groups.items():
+        reconnects = [timing.reconnect for timing in group if timing.reconnect is not None]
+        summary[key] = {'count': len(group),
+                        'state': {percent: percentile([timing.state for timing in group], percent) for percent in percents},
+                        'reconnect': {percent: percentile(reconnects, percent) for percent in percents}}
+    return summary
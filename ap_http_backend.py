@@ -0,0 +1,253 @@
+import http.client
+import json
+import logging
+from urllib.parse import urlencode, urlsplit
+from Configuration.auto_configuration import Settings
+from JSON.channels_map import wifi_channels_map
+from JSON.security_types_map import security_types_map
+from ap_settings import changed_settings, channel_band, requested_settings
+from tracing import span, traced
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.DEBUG)
+
+# The endpoints of the assumed protocol, see HttpAPManager
+LOGIN_PATH = '/cgi-bin/luci/;stok=/login?form=login'
+WIRELESS_PATH = '/cgi-bin/luci/;stok={stok}/admin/wireless?form=wireless'
+BAND_ITEMS = {2.4: 1, 5: 2}
+# Error codes of an expired / missing login
+LOGIN_ERRORS = ('timeout', 'unauthorized')
+
+
+class APLoginError(Exception):
+    """
+    Raised when the AP rejected the login password.
+    """
+
+
+class DropdownItemEncoding:
+    """
+    The field encoding of the assumed wireless form: ssid and key are sent as text, and band, channel and
+    security as the 1-based item index of their dropdown in the web UI (BAND_ITEMS, wifi_channels_map,
+    security_types_map). A firmware which encodes the fields differently needs its own class with the same
+    encode / decode methods, passed as HttpAPManager's 'encoding'.
+    """
+
+    def encode(self, field, value):
+        """
+        Returns the (form field, form value) of a set_ap_params field.
+        """
+        if field == 'band':
+            return field, BAND_ITEMS[value]
+        if field == 'channel':
+            return field, wifi_channels_map[value]
+        if field == 'security':
+            return field, security_types_map[value]
+        if field == 'password':
+            return 'key', value
+        return field, value
+
+    def decode(self, data):
+        """
+        Returns the snapshot (see HttpAPManager.read_wireless_settings) of the fields of a read reply.
+        """
+        snapshot = dict()
+        snapshot['ssid'] = data.get('ssid')
+        snapshot['band'] = next((band for band, item in BAND_ITEMS.items() if item == data.get('band')), None)
+        channels = [channel for channel, item in wifi_channels_map.items()
+                    if item == data.get('channel') and channel_band(channel) == snapshot['band']]
+        snapshot['channel'] = channels[0] if channels else None
+        snapshot['security'] = next((security for security, item in security_types_map.items() if item == data.get('security')), None)
+        snapshot['password'] = data.get('key')
+        return snapshot
+
+
+class HttpAPManager:
+    """
+    This class configures the TP-Link Access Point through its web endpoints directly, without a browser:
+    it logs in once for a session token (stok) and reads / writes the wireless settings form as JSON, over a
+    single keep-alive HTTP connection which is reopened if the AP drops it.
+    It has the same set_ap_params / save_params API as configure_ap.APManager, so it can replace it, e.g. in
+    ap_matrix.MatrixRunner. set_ap_params only collects the form fields, and save_params submits them in one request.
+
+    With 'only_changed' set, set_ap_params reads the current wireless settings once, and submits only the
+    fields which differ from them. save_params is skipped when nothing changed.
+
+    The protocol is assumed, not taken from a firmware: it is the one benchmarks/stub_ap_server.py serves.
+    LOGIN_PATH takes the admin password in plain text ('operation=login&password=...') and returns
+    {'success': true, 'data': {'stok': ...}}, and WIRELESS_PATH reads ('operation=read') and writes
+    ('operation=write') the wireless form with the field encoding of 'encoding' (DropdownItemEncoding by
+    default). Firmwares which encrypt the login password, or encode the form differently, need a subclass
+    overriding login_ap, or their own 'encoding'.
+    """
+
+    def __init__(self, ap_address=None, timeout=10, only_changed=False, encoding=None):
+        address = urlsplit(ap_address or Settings.AP_HOME_PAGE)
+        self.scheme = address.scheme or 'http'
+        self.host = address.hostname
+        self.port = address.port
+        self.timeout = timeout
+        self.only_changed = only_changed
+        self.encoding = encoding or DropdownItemEncoding()
+        self.connection = None
+        self.stok = None
+        self.login_password = None
+        self.snapshot = None
+        self.form = dict()
+        self.pending_changes = None
+        self.requests_sent = 0
+        self.connections_opened = 0
+
+    @traced()
+    def login_ap(self, password):
+        """
+        This method logs in to the AP and keeps the session token.
+
+        Args:
+            password:   the AP admin password
+
+        Returns:
+            NA
+
+        Raises:
+            APLoginError:   if the AP rejected the password
+        """
+
+        self.login_password = password
+        reply = self._post(LOGIN_PATH, {'operation': 'login', 'password': password})
+        if not reply.get('success'):
+            raise APLoginError(f'AP login failed: {reply.get("errorcode")}')
+        self.stok = reply['data']['stok']
+        LOGGER.info(f'Logged in to the AP at {self.host}')
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @traced()
+    def read_wireless_settings(self):
+        """
+        This method reads the current wireless settings of the AP.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   snapshot with the keys 'ssid', 'band', 'channel', 'security' and 'password'.
+                    A value which could not be mapped back to APManager's arguments is None
+
+        Raises:
+            APLoginError:   if the login expired and logging in again failed
+        """
+
+        snapshot = self.encoding.decode(self._wireless({'operation': 'read'}))
+        LOGGER.debug(f'Current wireless settings: {snapshot}')
+        return snapshot
+
+    @traced()
+    def set_ap_params(self, ssid, band, channel, mode, security, password, only_changed=None):
+        if only_changed is None:
+            only_changed = self.only_changed
+
+        requested = requested_settings(ssid, band, channel, security, password)
+        if only_changed and self.snapshot is None:
+            self.snapshot = self.read_wireless_settings()
+        changes = changed_settings(self.snapshot if only_changed else None, requested)
+
+        self.ssid = ssid
+        self.band = band
+        self.channel = channel
+        self.security = security
+        self.password = password
+
+        for field in changes:
+            name, value = self.encoding.encode(field, requested[field])
+            self.form[name] = value
+
+        self.pending_changes = bool(changes) or bool(self.pending_changes)
+        if self.snapshot is not None:
+            self.snapshot.update(requested)
+        if only_changed:
+            LOGGER.info(f'Changed AP fields: {changes or "none"}')
+        return changes
+
+    @traced()
+    def save_params(self):
+        """
+        This method submits the fields collected by set_ap_params in a single write request.
+
+        Args:
+            NA
+
+        Returns:
+            True:   If the AP accepted the settings
+            None:   If nothing changed, so the save was skipped
+            False:  If the AP rejected the settings
+
+        Raises:
+            APLoginError:   if the login expired and logging in again failed
+        """
+
+        if not self.form:
+            LOGGER.info(f'No AP setting changed, skipping save')
+            return None
+
+        form = dict(self.form, operation='write')
+        try:
+            self._wireless(form)
+        except ValueError as error:
+            LOGGER.error(f'AP rejected the wireless settings {self.form}: {error}')
+            return False
+        LOGGER.info(f'Saved AP wireless settings: {self.form}')
+        self.form = dict()
+        self.pending_changes = False
+        return True
+
+    def _wireless(self, fields, retry_login=True):
+        reply = self._post(WIRELESS_PATH.format(stok=self.stok or ''), fields)
+        if reply.get('success'):
+            return reply.get('data') or dict()
+        if reply.get('errorcode') in LOGIN_ERRORS and retry_login and self.login_password is not None:
+            LOGGER.info(f'AP login has expired, logging in again')
+            self.login_ap(self.login_password)
+            return self._wireless(fields, retry_login=False)
+        raise ValueError(f'AP request failed: {reply.get("errorcode")}')
+
+    def _post(self, path, fields):
+        body = urlencode(fields).encode('utf-8')
+        headers = {'Content-Type': 'application/x-www-form-urlencoded', 'Connection': 'keep-alive'}
+        for attempt in range(2):
+            if self.connection is None:
+                connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+                self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+                self.connections_opened += 1
+            try:
+                with span('ap http', 'http', path=path.split('?')[-1]):
+                    self.connection.request('POST', path, body=body, headers=headers)
+                    response = self.connection.getresponse()
+                    data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest) as error:
+                # The AP closed the idle keep-alive connection, so reopen it once
+                self.close()
+                if attempt:
+                    raise
+                LOGGER.debug(f'AP connection was dropped ({error!r}), reconnecting')
+
+        self.requests_sent += 1
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        try:
+            return json.loads(data or b'{}')
+        except ValueError:
+            return {'success': False, 'errorcode': f'HTTP {response.status}'}
+
+
+if __name__ == '__main__':
+    ap = HttpAPManager()
+    ap.login_ap('admin')
+    ap.set_ap_params('Hilton_5_OPEN', 5, 44, '', 'AES', '00099999')
+    ap.save_params()
+    ap.close()
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from JSON.channels_map import wifi_channels_map
+from JSON.security_types_map import security_types_map
+from ap_settings import channel_band
+from configure_ap import APManager
+from logger import init_logger
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.DEBUG)
+
+
+APConfig = namedtuple('APConfig', ['ssid', 'band', 'channel', 'mode', 'security', 'password'])
+ConfigTiming = namedtuple('ConfigTiming', ['config', 'duration', 'changed_fields'])
+
+
+def config_label(config):
+    """
+    Returns a short label of an AP configuration, e.g. '5/44/AES', used to group client measurements by AP configuration.
+    """
+    return f'{config.band}/{config.channel}/{config.security}'
+
+
+def build_matrix(bands=(2.4, 5), security_types=None, ssid_format='AP_{band}_{channel}_{security}', mode='', password='00099999'):
+    """
+    This function builds the band x channel x security matrix of AP configurations.
+
+    Args:
+        bands:              the bands to include (2.4 | 5)
+        security_types:     the security types to include. None takes all of security_types_map
+        ssid_format:        the ssid of each configuration, formatted with its band, channel and security
+        mode:               Wi-Fi mode, passed through to APManager.set_ap_params
+        password:           the network key of secured configurations
+
+    Returns:
+        list:   APConfig tuples, one per combination
+
+    Raises:
+        NA
+    """
+
+    if security_types is None:
+        security_types = list(security_types_map)
+
+    configs = []
+    for band in bands:
+        for channel in wifi_channels_map:
+            if channel_band(channel) != band:
+                continue
+            for security in security_types:
+                ssid = ssid_format.format(band=band, channel=channel, security=security)
+                configs.append(APConfig(ssid, band, channel, mode, security, password))
+    return configs
+
+
+def load_matrix(path):
+    """
+    This function loads a declarative list of AP configurations from a JSON file, e.g.:
+    [{"ssid": "AP_5_44_AES", "band": 5, "channel": 44, "security": "AES", "password": "00099999"}, ...]
+
+    Args:
+        path:   the JSON file
+
+    Returns:
+        list:   APConfig tuples
+
+    Raises:
+        NA
+    """
+
+    with open(path) as matrix_file:
+        entries = json.load(matrix_file)
+    return [APConfig(entry['ssid'], entry['band'], entry['channel'], entry.get('mode', ''), entry['security'], entry.get('password', ''))
+            for entry in entries]
+
+
+def order_matrix(configs):
+    """
+    This function orders AP configurations so consecutive configurations differ in as few UI fields as possible:
+    configurations are grouped by band (so the band dropdown changes at most once per band), walk the channels
+    of the band in order, and the security types are walked back and forth, so that the last security type of
+    one channel is the first of the next one.
+
+    Args:
+        configs:    APConfig tuples
+
+    Returns:
+        list:       the ordered APConfig tuples
+
+    Raises:
+        NA
+    """
+
+    security_order = {security: index for index, security in enumerate(security_types_map)}
+    channel_order = {channel: index for index, channel in enumerate(wifi_channels_map)}
+
+    ordered = []
+    for band in sorted({config.band for config in configs}):
+        band_configs = [config for config in configs if config.band == band]
+        channels = sorted({config.channel for config in band_configs}, key=lambda channel: channel_order.get(channel, len(channel_order)))
+        for index, channel in enumerate(channels):
+            channel_configs = sorted((config for config in band_configs if config.channel == channel),
+                                     key=lambda config: (security_order.get(config.security, len(security_order)), config.ssid))
+            ordered.extend(reversed(channel_configs) if index % 2 else channel_configs)
+    return ordered
+
+
+class MatrixReport:
+    def __init__(self, timings, skipped, wall_time, failed=()):
+        self.timings = timings
+        self.skipped = skipped
+        self.wall_time = wall_time
+        self.failed = list(failed)
+
+    @property
+    def configs_per_hour(self):
+        busy = sum(timing.duration for timing in self.timings)
+        return len(self.timings) * 3600 / busy if busy else 0.0
+
+    def __str__(self):
+        return (f'{len(self.timings)} configurations applied, {len(self.failed)} failed, {self.skipped} resumed from '
+                f'checkpoint, {self.wall_time:.1f}s wall time, {self.configs_per_hour:.0f} configurations/hour')
+
+
+class MatrixRunner:
+    """
+    This class applies a whole matrix of AP configurations through a single, logged-in APManager.
+    The configurations are ordered with order_matrix(), and only the changed fields of every configuration are
+    applied (APManager 'only_changed' mode). After each configuration the AP confirmed (or which needed no save)
+    the progress is written to 'checkpoint_path', so an interrupted run resumes with the first configuration which
+    was not applied yet. A run which applied every configuration deletes the checkpoint, so the next run starts over.
+    'on_config' is called after every saved configuration, e.g. to run the client measurements.
+    """
+
+    def __init__(self, ap_manager, checkpoint_path=None, on_config=None):
+        self.ap_manager = ap_manager
+        self.checkpoint_path = checkpoint_path
+        self.on_config = on_config
+
+    def run(self, configs, order=True):
+        """
+        This method applies the configurations one after the other.
+
+        Args:
+            configs:    APConfig tuples
+            order:      reorder the configurations with order_matrix()
+
+        Returns:
+            MatrixReport:   per-configuration timings and the throughput
+
+        Raises:
+            NA
+        """
+
+        if order:
+            configs = order_matrix(configs)
+        completed = self._load_checkpoint()
+
+        start = time.perf_counter()
+        timings = []
+        failed = []
+        skipped = 0
+        for index, config in enumerate(configs, start=1):
+            key = self._key(config)
+            if key in completed:
+                skipped += 1
+                continue
+
+            config_start = time.perf_counter()
+            fields = self.ap_manager.set_ap_params(*config, only_changed=True)
+            # None: nothing changed, so there was nothing to save
+            if self.ap_manager.save_params() is False:
+                LOGGER.error(f'[{index}/{len(configs)}] The AP did not save {config}, it is left for the next run')
+                failed.append(config)
+                continue
+            duration = time.perf_counter() - config_start
+
+            timings.append(ConfigTiming(config, duration, fields))
+            LOGGER.info(f'[{index}/{len(configs)}] Applied {config} in {duration:.2f}s')
+            if self.on_config is not None:
+                self.on_config(config, self.ap_manager)
+
+            completed[key] = duration
+            self._save_checkpoint(completed)
+
+        if not failed:
+            self._clear_checkpoint()
+        report = MatrixReport(timings, skipped, time.perf_counter() - start, failed)
+        LOGGER.info(f'{report}')
+        return report
+
+    @staticmethod
+    def _key(config):
+        return json.dumps(list(config))
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return dict()
+        with open(self.checkpoint_path) as checkpoint_file:
+            completed = json.load(checkpoint_file)['completed']
+        LOGGER.info(f'Resuming from {self.checkpoint_path}: {len(completed)} configurations already applied')
+        return completed
+
+    def _clear_checkpoint(self):
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _save_checkpoint(self, completed):
+        if self.checkpoint_path is None:
+            return
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump({'completed': completed}, checkpoint_file)
+        os.replace(temp_path, self.checkpoint_path)
+
+
+if __name__ == '__main__':
+    init_logger()
+    ap = APManager(only_changed=True)
+    ap.login_ap('admin')
+    runner = MatrixRunner(ap, checkpoint_path='ap_matrix_checkpoint.json')
+    runner.run(build_matrix(security_types=['OPEN', 'AES']))
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from lazy_imports import lazy_import
+from tracing import span, trace_webdriver
+
+# Loaded on first use, so importing this module does not pay for selenium
+webdriver = lazy_import('selenium.webdriver')
+auto_configuration = lazy_import('Configuration.auto_configuration')
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.DEBUG)
+
+
+def create_chrome_driver():
+    with span('chrome new session', 'webdriver'):
+        driver = trace_webdriver(webdriver.Chrome(auto_configuration.Settings.PATH_TO_CHROMEDRIVER))
+    driver.set_window_size(1280, 1024)
+    return driver
+
+
+class APSession:
+    def __init__(self, address, driver):
+        self.address = address
+        self.driver = driver
+        self.password = None
+        self.in_use = False
+        self.last_used = time.monotonic()
+
+
+class APSessionPool:
+    """
+    This class keeps warm browser sessions per AP address, so consecutive APManager objects skip the
+    browser cold start and the login. A session is checked out by acquire() until release(), so two
+    APManager objects never share a browser: while the session of an address is in use, acquire()
+    opens another one, which is pooled as well. A released session which was idle for more than
+    'idle_timeout' seconds is closed, and a session whose browser died is replaced.
+    Expired logins are detected and re-authenticated lazily by APManager.open_wireless_settings.
+    """
+
+    def __init__(self, idle_timeout=600, driver_factory=create_chrome_driver):
+        self.idle_timeout = idle_timeout
+        self.driver_factory = driver_factory
+        self.sessions = dict()
+        self.created = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, address):
+        """
+        This method returns the session of an AP, opening a new browser on the AP home page if needed.
+
+        Args:
+            address:    the AP home page url, e.g. Settings.AP_HOME_PAGE
+
+        Returns:
+            APSession:  the session, checked out until release(). session.password holds the password it
+                        last logged in with
+
+        Raises:
+            NA
+        """
+
+        self.evict_idle()
+        with self._lock:
+            sessions = self.sessions.setdefault(address, [])
+            session = None
+            for idle in [item for item in sessions if not item.in_use]:
+                if self._is_alive(idle):
+                    session = idle
+                    break
+                LOGGER.warning(f'Browser session of {address} died, opening a new one')
+                sessions.remove(idle)
+                self._close(idle)
+
+            if session is None:
+                session = APSession(address, self.driver_factory())
+                session.driver.get(address)
+                sessions.append(session)
+                self.created += 1
+            else:
+                self.reused += 1
+            session.in_use = True
+            session.last_used = time.monotonic()
+            return session
+
+    def release(self, session):
+        """
+        This method returns a session acquire() checked out to the pool.
+        """
+        with self._lock:
+            session.in_use = False
+            session.last_used = time.monotonic()
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            for address, sessions in self.sessions.items():
+                for session in list(sessions):
+                    # A checked out session is in use, however long ago it was acquired
+                    if not session.in_use and now - session.last_used > self.idle_timeout:
+                        LOGGER.info(f'Closing browser session of {address} after {now - session.last_used:.0f}s idle')
+                        sessions.remove(session)
+                        self._close(session)
+
+    def close_all(self):
+        with self._lock:
+            for sessions in self.sessions.values():
+                for session in sessions:
+                    self._close(session)
+            self.sessions.clear()
+
+    @staticmethod
+    def _is_alive(session):
+        try:
+            session.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.driver.quit()
+        except Exception as error:
+            LOGGER.debug(f'Got exception while closing browser session of {session.address}: {error!r}')
@@ -0,0 +1,44 @@
+def channel_band(channel):
+    """
+    Returns the band (2.4 | 5) of a Wi-Fi channel.
+    """
+    if isinstance(channel, int) and channel >= 36:
+        return 5
+    return 2.4
+
+
+def requested_settings(ssid, band, channel, security, password):
+    """
+    Returns the wireless settings set_ap_params applies, keyed by field. An OPEN network has no password field.
+    """
+    requested = {'ssid': ssid, 'band': band, 'channel': channel, 'security': security, 'password': password}
+    if security == 'OPEN':
+        del requested['password']
+    return requested
+
+
+def changed_settings(snapshot, requested):
+    """
+    This function returns the fields of the requested wireless settings which have to be applied on an AP
+    whose current settings are 'snapshot'.
+
+    Args:
+        snapshot:   the current settings, as read by read_wireless_settings(). None applies every field
+        requested:  the requested settings, see requested_settings()
+
+    Returns:
+        list:   the field names, in the order of 'requested'
+
+    Raises:
+        NA
+    """
+
+    if snapshot is None:
+        return list(requested)
+    changes = [field for field, value in requested.items() if snapshot.get(field) != value]
+    # A channel item depends on the band (the AP reloads the channel list), and a new security type needs its key again
+    if 'band' in changes and 'channel' not in changes:
+        changes.append('channel')
+    if 'security' in changes and 'password' in requested and 'password' not in changes:
+        changes.append('password')
+    return changes
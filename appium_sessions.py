@@ -0,0 +1,104 @@
+import logging
+import threading
+from lazy_imports import lazy_import
+from tracing import span, trace_webdriver
+
+# Loaded on first use, so importing this module (e.g. for a pure adb run) does not pay for Appium and selenium
+webdriver = lazy_import('appium.webdriver')
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+APPIUM_SERVER_URL = 'http://localhost:4723/wd/hub'
+
+# A cheap WebDriver call per capability type, which fails if the session is gone
+HEALTH_CHECKS = {'chrome': lambda driver: driver.current_url,
+                 'settings': lambda driver: driver.current_activity}
+
+
+class AppiumSessionManager:
+    """
+    This class keeps one Appium session per device and capability type ('chrome' / 'settings').
+    A cached session is health-checked before it is reused, and is recreated if the check fails.
+    """
+
+    def __init__(self, command_executor=APPIUM_SERVER_URL):
+        self.command_executor = command_executor
+        self.sessions = dict()
+        self.created = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def get(self, android_manager, type):
+        """
+        This method returns the Appium session of the android manager's device for the given capability type.
+
+        Args:
+            android_manager:    AndroidManager of the device
+            type:               chrome - for launching chrome by appium
+                                settings - for launching settings app
+
+        Returns:
+            WebDriver:  the Appium session
+
+        Raises:
+            WebDriverException:     if a new session could not be created
+        """
+
+        udid = android_manager.get_device_udid()
+        key = (udid, type)
+        with self._lock:
+            driver = self.sessions.get(key)
+        if driver is not None:
+            if self._is_healthy(driver, type):
+                self.reused += 1
+                return driver
+            LOGGER.warning(f'Appium {type} session of {udid} failed the health check, creating a new one')
+            self._quit(driver)
+
+        desired_caps = dict(android_manager.create_desire_capabilities(type))
+        with span('appium new session', 'appium', udid=udid, type=type):
+            driver = trace_webdriver(webdriver.Remote(self.command_executor, desired_caps))
+        LOGGER.info(f'Created Appium {type} session {driver.session_id} for {udid}')
+        with self._lock:
+            self.sessions[key] = driver
+            self.created += 1
+        return driver
+
+    def close(self, udid=None, type=None):
+        """
+        This method quits the cached sessions of a device / capability type, or all of them.
+
+        Args:
+            udid:   the device serial. None matches all devices
+            type:   the capability type. None matches all types
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        with self._lock:
+            for key in list(self.sessions):
+                if (udid is None or key[0] == udid) and (type is None or key[1] == type):
+                    self._quit(self.sessions.pop(key))
+
+    @staticmethod
+    def _is_healthy(driver, type):
+        try:
+            HEALTH_CHECKS.get(type, HEALTH_CHECKS['chrome'])(driver)
+            return True
+        except Exception as error:
+            LOGGER.debug(f'Appium session {driver.session_id} health check failed: {error!r}')
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as error:
+            LOGGER.debug(f'Got exception while quitting Appium session {driver.session_id}: {error!r}')
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+import logging
+import subprocess
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+async def run_command(args, timeout=None, limiter=None):
+    """
+    This coroutine runs a command with asyncio.create_subprocess_exec and returns its output.
+    The child process is killed if the timeout expires or the awaiting task is cancelled.
+
+    Args:
+        args:       the command and its arguments, e.g. ['adb', '-s', udid, 'shell', 'svc wifi enable']
+        timeout:    seconds to wait for the command. None waits forever
+        limiter:    asyncio.Semaphore which bounds the number of concurrent child processes, or None
+
+    Returns:
+        bytes:      the command output
+
+    Raises:
+        asyncio.TimeoutError:           if the command did not finish in time
+        subprocess.CalledProcessError:  if the command exited with a non-zero status
+        OSError:                        if the command could not be executed
+    """
+
+    async with limiter if limiter is not None else contextlib.AsyncExitStack():
+        # Spans of concurrent coroutines interleave on one thread, so they are not nested
+        with span(args[0], args[0], detached=True, args=' '.join(args[1:])):
+            process = await asyncio.create_subprocess_exec(*args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+            try:
+                output, _ = await asyncio.wait_for(process.communicate(), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                LOGGER.warning(f'Killing "{" ".join(args)}" (pid {process.pid})')
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+                await process.wait()
+                raise
+
+    LOGGER.debug(f'{output}')
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, output=output)
+    return output
+
+
+def run_sync(coroutine):
+    """
+    This function runs a coroutine to completion from synchronous code, in a new event loop, so the sync
+    managers can wrap the asyncio implementation of their commands.
+
+    Args:
+        coroutine:  the coroutine, e.g. AsyncWiFiManager(manager=wfm).connect_to_wifi(ssid)
+
+    Returns:
+        the coroutine result
+
+    Raises:
+        RuntimeError:   if called from a running event loop. Await the coroutine there instead
+    """
+
+    return asyncio.run(coroutine)
@@ -0,0 +1,53 @@
+"""
+Compares one-shot 'adb -s <udid> shell <command>' forks with the pooled 'adb shell' session,
+using a fake 'adb' script. Run from the repository root:
+python -m benchmarks.adb_shell_benchmark --commands 200 --startup-delay 0.02
+"""
+import argparse
+import os
+import tempfile
+import time
+from adb_shell import AdbShellPool, run_shell_command
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool, prepend_to_path
+
+
+UDID = 'FAKE0001'
+
+
+def commands_per_second(pool, commands):
+    start = time.perf_counter()
+    for index in range(commands):
+        run_shell_command(UDID, 'svc wifi enable' if index % 2 else 'svc wifi disable', pool)
+    return commands / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='adb one-shot vs pooled shell session benchmark')
+    parser.add_argument('--commands', type=int, default=100)
+    parser.add_argument('--startup-delay', type=float, default=0.0, help='simulated adb start/server round trip, in seconds')
+    parser.add_argument('--command-delay', type=float, default=0.0, help='simulated on-device command time, in seconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_ADB_DEVICES'] = f'{UDID}:Pixel_3'
+        os.environ['FAKE_ADB_STARTUP_DELAY'] = str(args.startup_delay)
+        os.environ['FAKE_ADB_COMMAND_DELAY'] = str(args.command_delay)
+
+        one_shot = commands_per_second(None, args.commands)
+
+        pool = AdbShellPool()
+        pool.session(UDID)
+        try:
+            pooled = commands_per_second(pool, args.commands)
+        finally:
+            pool.close()
+
+    print(f'one-shot: {one_shot:10.1f} commands/s')
+    print(f'pooled:   {pooled:10.1f} commands/s')
+    print(f'speedup:  {pooled / one_shot:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Applies a matrix of AP configurations through the browser-free HttpAPManager against the stub TP-Link
+endpoints, checks that the stub saved every configuration, and prints the configurations per second,
+requests and HTTP connections used. Half way through the stub expires the login, so the re-login is exercised.
+Run from the repository root:
+python -m benchmarks.ap_http_backend_benchmark
+"""
+import argparse
+import time
+from ap_http_backend import HttpAPManager
+from ap_matrix import build_matrix, order_matrix
+from benchmarks.stub_ap_server import SECURITY, StubAPServer
+
+
+SECURITY_LABELS = {'OPEN': SECURITY[0], 'AUTO': SECURITY[1], 'AES': SECURITY[2]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Browser-free AP configuration against the stub TP-Link endpoints')
+    parser.add_argument('--only-changed', action='store_true', help='submit only the fields which changed')
+    args = parser.parse_args()
+
+    configs = order_matrix(build_matrix(security_types=['OPEN', 'AES']))
+    with StubAPServer() as server:
+        ap = HttpAPManager(server.url, only_changed=args.only_changed)
+        ap.login_ap(server.password)
+        start = time.perf_counter()
+        for index, config in enumerate(configs):
+            if index == len(configs) // 2:
+                server.expire_sessions()
+            ap.set_ap_params(*config)
+            ap.save_params()
+            state = server.state
+            expected = {'ssid': config.ssid, 'band': '5GHz' if config.band == 5 else '2.4GHz',
+                        'channel': str(config.channel), 'security': SECURITY_LABELS[config.security]}
+            assert all(state[field] == value for field, value in expected.items()), (config, state)
+        elapsed = time.perf_counter() - start
+        ap.close()
+
+    print(f'{len(configs)} configurations in {elapsed:.3f}s: {len(configs) / elapsed:.1f} configurations/s')
+    print(f'{ap.requests_sent} requests over {server.connections} HTTP connection(s), {server.logins} logins')
+
+
+if __name__ == '__main__':
+    main()
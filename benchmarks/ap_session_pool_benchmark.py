@@ -0,0 +1,61 @@
+"""
+Runs a number of AP configuration steps against the stub TP-Link web UI, first with a new browser
+and login per step, then with an APSessionPool. Half way through the pooled run the stub expires all
+logins, so the lazy re-authentication is exercised as well. Needs Chrome and chromedriver.
+Run from the repository root:
+python -m benchmarks.ap_session_pool_benchmark --steps 6
+"""
+import argparse
+import time
+from Configuration.auto_configuration import Settings
+from ap_session_pool import APSessionPool
+from benchmarks.stub_ap_server import StubAPServer
+from configure_ap import APManager
+
+
+def run_step(server, index, session_pool=None):
+    ap = APManager(session_pool=session_pool)
+    try:
+        ap.login_ap(server.password)
+        ap.set_ap_params(f'Stub_{index}', 2.4, 1 + index % 11, '', 'AES', '00099999')
+        ap.save_params()
+    finally:
+        ap.close()
+    assert server.saves[-1]['ssid'] == f'Stub_{index}', server.saves[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='APManager browser session pool against the stub AP')
+    parser.add_argument('--steps', type=int, default=6)
+    parser.add_argument('--delay', type=float, default=0.1, help='stub UI transition delay, in seconds')
+    args = parser.parse_args()
+
+    with StubAPServer(delay=args.delay) as server:
+        Settings.AP_HOME_PAGE = server.url
+        Settings.AP_WIRELESS_SETTINGS_PAGE = server.wireless_settings_url
+
+        start = time.perf_counter()
+        for index in range(args.steps):
+            run_step(server, index)
+        cold = time.perf_counter() - start
+        cold_logins = server.logins
+
+        pool = APSessionPool()
+        start = time.perf_counter()
+        try:
+            for index in range(args.steps):
+                if index == args.steps // 2:
+                    server.expire_sessions()
+                run_step(server, index, pool)
+        finally:
+            pool.close_all()
+        pooled = time.perf_counter() - start
+        pooled_logins = server.logins - cold_logins
+
+    print(f'new browser per step: {cold / args.steps:.3f}s/step, {cold_logins} logins')
+    print(f'session pool:         {pooled / args.steps:.3f}s/step, {pooled_logins} logins, '
+          f'{pool.created} browsers opened, {pool.reused} sessions reused')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Runs APManager.set_ap_params + save_params against the stub TP-Link web UI and prints how long
+every step actually waited, then re-applies the configuration with 'only_changed' and a single
+changed field, and prints the number of UI interactions that saved. Needs Chrome and chromedriver (Settings.PATH_TO_CHROMEDRIVER).
+Run from the repository root:
+python -m benchmarks.ap_wait_benchmark --delay 0.2
+"""
+import argparse
+import time
+from Configuration.auto_configuration import Settings
+from benchmarks.stub_ap_server import StubAPServer
+from configure_ap import APManager
+
+
+# Sum of the fixed sleeps set_ap_params and save_params used to have
+FIXED_SLEEPS = 7.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description='APManager condition-driven waits against the stub AP')
+    parser.add_argument('--delay', type=float, default=0.2, help='stub UI transition delay, in seconds')
+    args = parser.parse_args()
+
+    with StubAPServer(delay=args.delay) as server:
+        Settings.AP_HOME_PAGE = server.url
+        Settings.AP_WIRELESS_SETTINGS_PAGE = server.wireless_settings_url
+
+        ap = APManager()
+        try:
+            ap.login_ap(server.password)
+            start = time.perf_counter()
+            ap.set_ap_params('Stub_5_AES', 5, 44, '', 'AES', '00099999')
+            ap.save_params()
+            elapsed = time.perf_counter() - start
+            saved = server.saves[-1]
+            assert saved['ssid'] == 'Stub_5_AES' and saved['band'] == '5GHz' and saved['channel'] == '44', saved
+            print(ap.waiter.report())
+            print(f'set_ap_params + save_params: {elapsed:.3f}s (fixed sleeps alone used to take {FIXED_SLEEPS}s)')
+
+            start = time.perf_counter()
+            ap.set_ap_params('Stub_5_AES', 5, 48, '', 'AES', '00099999', only_changed=True)
+            ap.save_params()
+            ap.set_ap_params('Stub_5_AES', 5, 48, '', 'AES', '00099999', only_changed=True)
+            ap.save_params()
+            elapsed = time.perf_counter() - start
+            assert server.saves[-1]['channel'] == '48' and len(server.saves) == 2, server.saves
+            print(f'only_changed (channel change + no-op): {elapsed:.3f}s, {ap.interactions_saved} UI interactions saved')
+        finally:
+            ap.driver.quit()
+
+
+if __name__ == '__main__':
+    main()
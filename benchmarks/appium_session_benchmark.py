@@ -0,0 +1,53 @@
+"""
+Navigates a list of urls through AndroidManager against the stub Appium server and a fake 'adb',
+first with a new Appium session per url, then with a reused session and browse_many(). Half way
+through the reused run the stub drops all sessions, so the health check and recreation are exercised.
+Needs the Appium python client. Run from the repository root:
+python -m benchmarks.appium_session_benchmark --urls 4 --session-delay 2
+"""
+import argparse
+import os
+import tempfile
+import time
+from android_device_manager import AndroidManager
+from appium_sessions import AppiumSessionManager
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool, prepend_to_path
+from benchmarks.stub_webdriver_server import StubWebDriverServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Appium session reuse against the stub Appium server')
+    parser.add_argument('--urls', type=int, default=4)
+    parser.add_argument('--session-delay', type=float, default=2.0, help='stub session creation time, in seconds')
+    args = parser.parse_args()
+
+    urls = [f'http://stub.local/page/{index}' for index in range(args.urls)]
+
+    with tempfile.TemporaryDirectory() as fake_dir, StubWebDriverServer(session_delay=args.session_delay) as server:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_ADB_DEVICES'] = 'FAKE0001:Pixel_3'
+
+        start = time.perf_counter()
+        for url in urls:
+            android = AndroidManager(appium_sessions=AppiumSessionManager(server.url))
+            android.browse_to(url)
+            android.close()
+        per_url = time.perf_counter() - start
+        per_url_sessions = server.sessions_created
+
+        android = AndroidManager(appium_sessions=AppiumSessionManager(server.url))
+        start = time.perf_counter()
+        android.browse_many(urls[:len(urls) // 2])
+        server.kill_sessions()
+        android.browse_many(urls[len(urls) // 2:])
+        reused = time.perf_counter() - start
+        reused_sessions = server.sessions_created - per_url_sessions
+        android.close()
+
+    print(f'new session per url: {per_url:.2f}s, {per_url_sessions} sessions')
+    print(f'reused session:      {reused:.2f}s, {reused_sessions} sessions (1 recreated after the stub dropped it)')
+
+
+if __name__ == '__main__':
+    main()
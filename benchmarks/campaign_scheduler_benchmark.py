@@ -0,0 +1,55 @@
+"""
+Runs a simulated AP campaign (every stage sleeps its typical duration, scaled by --scale) once strictly
+sequentially and once through the PipelineScheduler, and prints the stage utilisation and the speedup.
+Run from the repository root:
+python -m benchmarks.campaign_scheduler_benchmark --configs 6 --scale 0.1
+"""
+import argparse
+import time
+from ap_matrix import build_matrix, order_matrix
+from campaign_scheduler import PipelineScheduler, Stage
+
+
+# Typical seconds per stage of a real campaign
+DURATIONS = {'wifi profile': 1.0, 'appium session': 3.0, 'configure ap': 4.0, 'connect': 3.0, 'browse': 6.0}
+
+
+def simulated_stages(scale, fail_ssid=None):
+    def sleeper(name):
+        def action(config):
+            if config.ssid == fail_ssid and name == 'connect':
+                raise ConnectionError(f'{config.ssid} did not connect')
+            time.sleep(DURATIONS[name] * scale)
+        return action
+
+    return [
+        Stage('wifi profile', sleeper('wifi profile'), resource='host'),
+        Stage('appium session', sleeper('appium session'), resource='appium', after_previous=('browse',)),
+        Stage('configure ap', sleeper('configure ap'), resource='ap', after_previous=('browse',)),
+        Stage('connect', sleeper('connect'), depends_on=('configure ap', 'wifi profile'), resource='client'),
+        Stage('browse', sleeper('browse'), depends_on=('connect', 'appium session'), resource='client'),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sequential vs pipelined AP campaign, with simulated stage durations')
+    parser.add_argument('--configs', type=int, default=6)
+    parser.add_argument('--scale', type=float, default=0.1, help='multiplier of the typical stage durations')
+    args = parser.parse_args()
+
+    configs = order_matrix(build_matrix(security_types=['OPEN', 'AES']))[:args.configs]
+    fail_ssid = configs[len(configs) // 2].ssid
+
+    start = time.perf_counter()
+    sequential = PipelineScheduler(simulated_stages(args.scale, fail_ssid), max_workers=1).run(configs)
+    sequential_wall = time.perf_counter() - start
+    pipelined = PipelineScheduler(simulated_stages(args.scale, fail_ssid)).run(configs)
+
+    print(pipelined)
+    print(f'strictly sequential: {sequential_wall:.3f}s, pipelined: {pipelined.wall_time:.3f}s, '
+          f'end-to-end speedup {sequential_wall / pipelined.wall_time:.2f}x '
+          f'({len(pipelined.failed)} failed or skipped tasks of {fail_ssid})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares device lookups which poll 'adb devices -l' with lookups from the DeviceTracker registry, and
+measures how fast a hot-plug event reaches the tracker callbacks, using a fake 'adb' script.
+Run from the repository root:
+python -m benchmarks.device_tracker_benchmark --lookups 200 --startup-delay 0.02
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool, prepend_to_path
+from device_cache import DeviceCache
+from device_tracker import DeviceTracker
+
+
+def lookups_per_second(cache, lookups):
+    start = time.perf_counter()
+    for _ in range(lookups):
+        cache.list_devices()
+    return lookups / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='adb devices polling vs adb track-devices registry benchmark')
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--devices', type=int, default=20)
+    parser.add_argument('--startup-delay', type=float, default=0.0, help='simulated adb start/server round trip, in seconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        prepend_to_path(fake_dir)
+        devices = [f'FAKE{index:04}:Pixel_{index % 5}' for index in range(args.devices)]
+        devices_path = os.path.join(fake_dir, 'devices')
+        with open(devices_path, 'w') as devices_file:
+            devices_file.write(','.join(devices))
+        os.environ['FAKE_ADB_DEVICES_FILE'] = devices_path
+        os.environ['FAKE_ADB_STARTUP_DELAY'] = str(args.startup_delay)
+
+        polled = lookups_per_second(DeviceCache(), args.lookups)
+
+        tracker = DeviceTracker().start()
+        events = []
+        plugged = threading.Event()
+
+        def on_change(serial, old_state, new_state, model):
+            events.append((serial, old_state, new_state, time.perf_counter()))
+            plugged.set()
+
+        tracker.add_callback(on_change)
+        try:
+            tracked = lookups_per_second(DeviceCache(tracker=tracker), args.lookups)
+
+            plugged_at = time.perf_counter()
+            with open(devices_path, 'w') as devices_file:
+                devices_file.write(','.join(devices + ['HOTPLUG1:Pixel_9']))
+            plugged.wait(5)
+        finally:
+            tracker.stop()
+
+    print(f'polling adb devices: {polled:12.1f} lookups/s')
+    print(f'tracker registry:    {tracked:12.1f} lookups/s')
+    print(f'speedup:             {tracked / polled:12.1f}x')
+    if events:
+        print(f'hot-plug {events[0][0]} reported after {(events[0][3] - plugged_at) * 1000:.1f} ms')
+    else:
+        print('hot-plug event was not reported')
+
+
+if __name__ == '__main__':
+    main()
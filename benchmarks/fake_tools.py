@@ -0,0 +1,209 @@
+import os
+import stat
+import sys
+
+
+FAKE_ADB_SCRIPT = r'''
+import json
+import os
+import re
+import sys
+import time
+
+
+def load_devices():
+    # FAKE_ADB_DEVICES_FILE, when it exists, overrides FAKE_ADB_DEVICES, so devices can be plugged in and out
+    devices = os.environ.get('FAKE_ADB_DEVICES', 'FAKE0001:Pixel_3')
+    if os.path.exists(os.environ.get('FAKE_ADB_DEVICES_FILE', '')):
+        with open(os.environ['FAKE_ADB_DEVICES_FILE']) as devices_file:
+            devices = devices_file.read().strip()
+    return [entry.split(':') for entry in devices.split(',') if entry]
+
+
+def device_list(devices, long_format):
+    lines = []
+    for serial, model in devices:
+        if long_format:
+            lines.append(f'{serial}\tdevice usb:1-1 product:{model} model:{model} device:{model}\n')
+        else:
+            lines.append(f'{serial}\tdevice\n')
+    return ''.join(lines)
+
+
+DEVICES = load_devices() or [['FAKE0001', 'Pixel_3']]
+PROPS = {'ro.build.version.release': os.environ.get('FAKE_ADB_PLATFORM_VERSION', '10'),
+         'ro.product.model': DEVICES[0][1]}
+# Seconds after 'svc wifi enable' until Wi-Fi reports enabled, and until it is connected; and after 'svc wifi disable'
+WIFI_TIMELINE = [float(value) for value in os.environ.get('FAKE_ADB_WIFI_TIMELINE', '0.3,1.0,0.2').split(',')]
+WIFI_STATE = os.environ.get('FAKE_ADB_WIFI_STATE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'adb_wifi.json'))
+
+
+def wifi_status():
+    state = {'enable': True, 'requested_at': 0}
+    if os.path.exists(WIFI_STATE):
+        with open(WIFI_STATE) as state_file:
+            state = json.load(state_file)
+    elapsed = time.time() - state['requested_at']
+    if state['enable']:
+        return elapsed >= WIFI_TIMELINE[0], elapsed >= WIFI_TIMELINE[1]
+    return elapsed < WIFI_TIMELINE[2], False
+
+
+def shell(command):
+    time.sleep(float(os.environ.get('FAKE_ADB_COMMAND_DELAY', '0')))
+    if command.startswith('getprop '):
+        return PROPS.get(command.split()[1], '') + '\n', 0
+    if command in ('svc wifi enable', 'svc wifi disable'):
+        with open(WIFI_STATE, 'w') as state_file:
+            json.dump({'enable': command.endswith('enable'), 'requested_at': time.time()}, state_file)
+        return '', 0
+    if command == 'cmd wifi status':
+        if os.environ.get('FAKE_ADB_NO_CMD_WIFI'):
+            return "Can't find service: wifi\n", 20
+        enabled, connected = wifi_status()
+        connection = 'Wifi is connected to "FakeAP"' if connected else 'Wifi is not connected'
+        return f'Wifi is {"enabled" if enabled else "disabled"}\n{connection}\n', 0
+    if command == 'dumpsys wifi':
+        enabled, connected = wifi_status()
+        network = 'CONNECTED/CONNECTED' if connected else 'DISCONNECTED/DISCONNECTED'
+        return f'Wi-Fi is {"enabled" if enabled else "disabled"}\nmNetworkInfo [type: WIFI[], state: {network}]\n', 0
+    if command.startswith('echo '):
+        return command[len('echo '):] + '\n', 0
+    if command.startswith('printf '):
+        # No trailing newline, as printf prints it
+        return command[len('printf '):].strip("'"), 0
+    return f'/system/bin/sh: {command.split()[0]}: not found\n', 127
+
+
+args = sys.argv[1:]
+time.sleep(float(os.environ.get('FAKE_ADB_STARTUP_DELAY', '0')))
+if args[:1] == ['-s']:
+    args = args[2:]
+
+if args[:1] == ['devices']:
+    sys.stdout.write('List of devices attached\r\n')
+    sys.stdout.write(device_list(load_devices(), '-l' in args).replace('\n', '\r\n'))
+    sys.stdout.write('\r\n')
+
+elif args[:1] == ['track-devices']:
+    # Every change is sent as 4 hex digits of payload length and the payload
+    last = None
+    while True:
+        payload = device_list(load_devices(), '-l' in args).encode()
+        if payload != last:
+            sys.stdout.buffer.write(b'%04x' % len(payload) + payload)
+            sys.stdout.buffer.flush()
+            last = payload
+        time.sleep(0.02)
+
+elif args[:1] == ['shell'] and len(args) > 1:
+    output, status = shell(' '.join(args[1:]))
+    sys.stdout.write(output)
+    sys.exit(status)
+
+elif args[:1] == ['shell']:
+    # Interactive session: every line is "<command>; printf '\n%s %d\n' <sentinel> $?"
+    for line in sys.stdin:
+        match = re.match(r"(.*); printf '\\n%s %d\\n' (\S+) \$\?$", line.rstrip('\n'))
+        if match is None:
+            continue
+        output, status = shell(match.group(1))
+        sys.stdout.write(f'{output}\n{match.group(2)} {status}\n')
+        sys.stdout.flush()
+'''
+
+
+FAKE_NETSH_SCRIPT = r'''
+import json
+import os
+import sys
+import time
+
+
+# Seconds after 'wlan connect' at which the interface reaches each state, and gets its IP address
+TIMELINE = [float(value) for value in os.environ.get('FAKE_NETSH_TIMELINE', '0.1,0.2,0.3,0.4').split(',')]
+STATE_FILE = os.environ.get('FAKE_NETSH_STATE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'netsh_state.json'))
+INTERFACE = 'Wi-Fi'
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'ssid': None, 'requested_at': None}
+    with open(STATE_FILE) as state_file:
+        return json.load(state_file)
+
+
+def interface_state(state):
+    if state['requested_at'] is None:
+        return 'disconnected', False
+    elapsed = time.time() - state['requested_at']
+    if os.environ.get('FAKE_NETSH_FAIL_AUTH') and elapsed >= TIMELINE[1]:
+        return 'disconnected', False
+    for name, reached in (('connected', TIMELINE[2]), ('authenticating', TIMELINE[1]), ('associating', TIMELINE[0])):
+        if elapsed >= reached:
+            return name, elapsed >= TIMELINE[3]
+    return 'disconnected', False
+
+
+time.sleep(float(os.environ.get('FAKE_NETSH_DELAY', '0')))
+args = sys.argv[1:]
+options = dict(arg.split('=', 1) for arg in args if '=' in arg)
+
+if args[:3] == ['wlan', 'add', 'profile']:
+    print(f'Profile {os.path.basename(options["filename"])} is added on interface {INTERFACE}.')
+
+elif args[:2] == ['wlan', 'connect']:
+    with open(STATE_FILE, 'w') as state_file:
+        json.dump({'ssid': options['name'], 'requested_at': time.time()}, state_file)
+    print('Connection request was completed successfully.')
+
+elif args[:3] == ['wlan', 'show', 'interfaces']:
+    state = load_state()
+    name, _ = interface_state(state)
+    print('\nThere is 1 interface on the system:\n')
+    print(f'    Name                   : {INTERFACE}')
+    print('    Description            : Fake Wireless Adapter')
+    print('    Physical address       : 00:11:22:33:44:55')
+    print(f'    State                  : {name}')
+    if name != 'disconnected':
+        print(f'    SSID                   : {state["ssid"]}')
+        print('    BSSID                  : 66:77:88:99:aa:bb')
+
+elif args[:4] == ['interface', 'ipv4', 'show', 'addresses']:
+    _, has_address = interface_state(load_state())
+    print(f'\nConfiguration for interface "{INTERFACE}"')
+    print('    DHCP enabled:                         Yes')
+    print(f'    IP Address:                           {"192.168.0.100" if has_address else "169.254.10.20"}')
+
+else:
+    print(f'The following command was not found: {" ".join(args)}.')
+    sys.exit(1)
+'''
+
+
+def install_fake_tool(directory, name, script):
+    """
+    This function writes an executable python script named 'name' into 'directory'.
+    Prepend 'directory' to PATH in order to make the managers run the fake tool instead of the real one.
+
+    Args:
+        directory:  target directory
+        name:       tool name, e.g. 'adb'
+        script:     the python source of the fake tool
+
+    Returns:
+        str:        path of the fake tool
+
+    Raises:
+        NA
+    """
+
+    path = os.path.join(directory, name)
+    with open(path, 'w') as tool_file:
+        tool_file.write(f'#!{sys.executable}\n{script}')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def prepend_to_path(directory):
+    os.environ['PATH'] = directory + os.pathsep + os.environ.get('PATH', '')
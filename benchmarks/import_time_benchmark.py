@@ -0,0 +1,110 @@
+"""
+Measures the import (startup) time of the manager modules with 'python -X importtime', in a fresh interpreter
+per module, and guards it: a module must not execute the WebDriver / Appium packages at import time (they
+are loaded lazily, see lazy_imports), and its cumulative import time must stay under a budget.
+The heaviest imports of every module are printed. The exit code is 1 if a guard failed.
+Run from the repository root:
+python -m benchmarks.import_time_benchmark --budget-ms 300 --repeat 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+MODULES = ['android_device_manager', 'configure_ap', 'ap_session_pool', 'appium_sessions', 'ui_snapshot',
+           'windows_wifi_manager', 'ap_http_backend']
+# Packages which only the WebDriver code paths need
+FORBIDDEN = ('selenium.webdriver', 'appium.webdriver')
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$')
+
+
+def parse_import_times(stderr):
+    """
+    This function parses the '-X importtime' report of an interpreter.
+
+    Args:
+        stderr:     the stderr of 'python -X importtime ...'
+
+    Returns:
+        list:   (module, self_us, cumulative_us, depth) tuples, in the report order
+
+    Raises:
+        NA
+    """
+
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+
+def measure(module, repeat):
+    """
+    This function imports 'module' in 'repeat' fresh interpreters, and returns the run with the smallest
+    cumulative time, which is the least disturbed by the rest of the machine.
+
+    Args:
+        module:     the module name
+        repeat:     number of interpreters to start
+
+    Returns:
+        list:   the parse_import_times() result of the best run
+
+    Raises:
+        RuntimeError:   if the import failed
+    """
+
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=os.environ.copy())
+        if process.returncode:
+            raise RuntimeError(f'import {module} failed:\n{process.stderr.splitlines()[-1] if process.stderr else ""}')
+        imports = parse_import_times(process.stderr)
+        total = next((cumulative for name, _, cumulative, depth in imports if name == module and depth == 0), 0)
+        if best is None or total < best[0]:
+            best = (total, imports)
+    return best[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the manager modules')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--budget-ms', type=float, default=300.0, help='cumulative import time allowed per module')
+    parser.add_argument('--repeat', type=int, default=3, help='interpreters started per module, the fastest one counts')
+    parser.add_argument('--top', type=int, default=5, help='heaviest imports printed per module')
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        try:
+            imports = measure(module, args.repeat)
+        except RuntimeError as error:
+            failures.append(str(error))
+            continue
+        total = next((cumulative for name, _, cumulative, depth in imports if name == module and depth == 0), 0)
+        print(f'{module}: {total / 1000:.1f} ms cumulative, {len(imports)} modules executed')
+        for name, self_us, cumulative_us, _ in sorted(imports, key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f'    {name:<40} self {self_us / 1000:>7.1f} ms   cumulative {cumulative_us / 1000:>7.1f} ms')
+
+        eager = sorted({name for name, *_ in imports if name.startswith(FORBIDDEN)})
+        if eager:
+            failures.append(f'{module} executes {", ".join(eager)} at import time')
+        if total / 1000 > args.budget_ms:
+            failures.append(f'{module} takes {total / 1000:.1f} ms to import, over the {args.budget_ms:.0f} ms budget')
+
+    for failure in failures:
+        print(f'FAILED {failure}')
+    if failures:
+        sys.exit(1)
+    print(f'All {len(args.modules)} modules import lazily within {args.budget_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Writes a synthetic init_logger log of a long campaign (Wi-Fi toggles, page loads, AP saves, failures and
+unrelated lines of several loggers) and analyses it: with a Python loop which parses every line (split +
+strptime), with log_analyser in one process over an mmap, in chunks from a stream, and with several processes.
+Prints the throughput and the peak Python memory of every mode, and checks all analyser modes agree.
+Run from the repository root:
+python -m benchmarks.log_analyser_benchmark --lines 2000000 --processes 4
+"""
+import argparse
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from log_analyser import analyse_file, analyse_stream
+from logger import LOG_FORMAT
+
+
+MESSAGES = [
+    ('android_device_manager', 'android_device_manager.py', logging.INFO, 'Turned Wi-Fi off in {seconds:.3f}s'),
+    ('android_device_manager', 'android_device_manager.py', logging.INFO, 'Turned Wi-Fi on in {seconds:.3f}s (reconnected in 2.1s)'),
+    ('android_device_manager', 'android_device_manager.py', logging.INFO, 'Navigating chrome to: http://example.com/{index}'),
+    ('android_device_manager', 'android_device_manager.py', logging.INFO, 'Loaded http://example.com/{index} in {ms} ms (TTFB 80 ms)'),
+    ('android_device_manager', 'android_device_manager.py', logging.ERROR, 'Wi-Fi of FAKE0001 did not turn on: timed out'),
+    ('android_device_manager', 'android_device_manager.py', logging.ERROR, 'Was unable to  run chrome'),
+    ('configure_ap', 'configure_ap.py', logging.INFO, "Saved AP wireless settings: {{'ssid': 'AP_{index}'}}"),
+    ('configure_ap', 'configure_ap.py', logging.ERROR, 'AP rejected the wireless settings: timeout'),
+    ('adb_shell', 'adb_shell.py', logging.DEBUG, 'adb shell reply: mWifiEnabled=true'),
+    ('windows_wifi_manager', 'windows_wifi_manager.py', logging.INFO, 'Profile added to interface Wi-Fi'),
+    ('windows_wifi_manager', 'windows_wifi_manager.py', logging.ERROR, 'Got exception while trying to run "netsh wlan show interfaces"'),
+]
+WEIGHTS = [10, 10, 20, 19, 1, 1, 5, 1, 20, 10, 1]
+
+
+def write_log(path, lines, seed=1):
+    generator = random.Random(seed)
+    formatter = logging.Formatter(LOG_FORMAT)
+    created = time.time() - 30 * 24 * 3600
+    with open(path, 'w') as log_file:
+        for index in range(lines):
+            name, filename, level, message = generator.choices(MESSAGES, WEIGHTS)[0]
+            created += generator.expovariate(1 / 0.5)
+            record = logging.LogRecord(name, level, filename, generator.randint(1, 400),
+                                       message.format(index=index, seconds=generator.uniform(0.2, 3), ms=generator.randint(200, 5000)),
+                                       None, None)
+            record.created = created
+            record.msecs = (created % 1) * 1000
+            record.filename = filename
+            log_file.write(formatter.format(record) + '\n')
+            if level == logging.ERROR and generator.random() < 0.3:
+                log_file.write('Traceback (most recent call last):\n  File "x.py", line 1, in <module>\nTimeoutError\n')
+
+
+def python_loop(path):
+    """
+    The straightforward analysis: every line is split and its time parsed.
+    """
+    counts = dict()
+    errors = 0
+    with open(path) as log_file:
+        for line in log_file:
+            fields = line.rstrip('\n').split(' - ', 5)
+            if len(fields) != 6:
+                continue
+            datetime.strptime(fields[0], '%Y-%m-%d %H:%M:%S,%f')
+            errors += fields[1].strip() == 'ERROR'
+            for prefix in ('Turned Wi-Fi', 'Navigating chrome to', 'Loaded'):
+                if fields[5].startswith(prefix):
+                    counts[prefix] = counts.get(prefix, 0) + 1
+    return counts, errors
+
+
+def measure(title, function, size, memory=True):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    line = f'{title:<28} {elapsed:>7.2f}s {size / 2 ** 20 / elapsed:>8.1f} MiB/s'
+    if memory:
+        # A second, slower run under tracemalloc, so the tracing does not distort the time
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f'   peak Python memory {peak / 2 ** 10:>6.0f} KiB'
+    print(line)
+    return result
+
+
+def same_report(first, second):
+    """
+    Compares two analysis reports. The duration sums of a parallel analysis add up in another order, so
+    the means may differ in the last digits.
+    """
+    if first.keys() != second.keys():
+        return False
+    for key, value in first.items():
+        if isinstance(value, dict) and not same_report(value, second[key]):
+            return False
+        if isinstance(value, float) and not math.isclose(value, second[key], rel_tol=1e-9):
+            return False
+        if not isinstance(value, (dict, float)) and value != second[key]:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming analysis of an init_logger log')
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'run.log')
+        write_log(path, args.lines)
+        size = os.path.getsize(path)
+        print(f'Log of {args.lines} lines, {size / 2 ** 20:.1f} MiB')
+
+        measure('python loop', lambda: python_loop(path), size, memory=False)
+        serial = measure('analyser, mmap', lambda: analyse_file(path), size)
+
+        def chunked():
+            with open(path, 'rb') as log_file:
+                return analyse_stream(log_file, chunk_size=1 << 20)
+        streamed = measure('analyser, chunks', chunked, size)
+        parallel = measure(f'analyser, {args.processes} processes', lambda: analyse_file(path, args.processes), size)
+
+    assert same_report(streamed.report(), serial.report()), 'the chunked analysis differs'
+    assert same_report(parallel.report(), serial.report()), 'the parallel analysis differs'
+    print(serial)
+
+
+if __name__ == '__main__':
+    main()
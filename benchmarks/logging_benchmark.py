@@ -0,0 +1,72 @@
+"""
+Measures the per-call cost of a LOGGER.info() call under N concurrent producer threads, with the
+handlers attached directly to the logger (the synchronous pipeline) and behind a queue (queue mode).
+Run from the repository root:
+python -m benchmarks.logging_benchmark --threads 1 8 32 --calls 2000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from logger import build_handlers, install_handlers
+
+
+def producer_overhead(logger, threads, calls):
+    """
+    Returns the mean time, in microseconds, a logging call blocks its producer thread.
+    """
+    barrier = threading.Barrier(threads)
+    elapsed = []
+
+    def produce():
+        barrier.wait()
+        start = time.perf_counter()
+        for index in range(calls):
+            logger.info(f'Turned Wi-Fi on {index}')
+        elapsed.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=produce) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(elapsed) / (threads * calls) * 1e6
+
+
+def run_pipeline(log_dir, queue_mode, json_lines, threads, calls):
+    logger = logging.getLogger(f'benchmark.{queue_mode}.{json_lines}.{threads}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    log_file_path = os.path.join(log_dir, f'{logger.name}.log')
+    handlers = build_handlers(log_file_path, 'w', json_lines=json_lines, console=False)
+    listener = install_handlers(logger, handlers, queue_mode)
+    try:
+        overhead = producer_overhead(logger, threads, calls)
+    finally:
+        if listener is not None:
+            listener.stop()
+        for handler in handlers + logger.handlers:
+            handler.close()
+            logger.removeHandler(handler)
+    return overhead
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Logging pipeline per-call overhead')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--calls', type=int, default=2000, help='logging calls per thread')
+    parser.add_argument('--json-lines', action='store_true')
+    args = parser.parse_args()
+
+    print(f'{"threads":>8} {"sync [us/call]":>16} {"queue [us/call]":>16}')
+    with tempfile.TemporaryDirectory() as log_dir:
+        for threads in args.threads:
+            sync = run_pipeline(log_dir, False, args.json_lines, threads, args.calls)
+            queued = run_pipeline(log_dir, True, args.json_lines, threads, args.calls)
+            print(f'{threads:>8} {sync:>16.1f} {queued:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Fills a MeasurementStore with synthetic campaign measurements, then aggregates the durations per AP
+configuration (band, channel, security) twice: vectorised by MeasurementStore.aggregate() over the
+memory-mapped records, and with a Python loop over the same records as JSON lines (the way
+page_load_metrics.PageLoadStats aggregates). Prints the write rate, the file sizes and both aggregation
+times, and checks the two agree.
+Run from the repository root:
+python -m benchmarks.measurement_store_benchmark --records 2000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from measurement_store import Measurement, MeasurementStore
+from page_load_metrics import percentile
+
+
+DEVICES = [f'FAKE{index:04}' for index in range(8)]
+CONFIGS = [(2.4, channel, security) for channel in (1, 6, 11) for security in ('OPEN', 'AES')] + \
+          [(5, channel, security) for channel in (36, 40, 44, 48) for security in ('OPEN', 'AES')]
+STEPS = {'configure ap': 4.0, 'connect': 3.0, 'wifi on': 1.5, 'page load': 1.2}
+PERCENTS = (50, 90, 95)
+
+
+def synthetic_measurements(count, seed=1):
+    generator = random.Random(seed)
+    start = time.time() - 30 * 24 * 3600
+    for index in range(count):
+        band, channel, security = generator.choice(CONFIGS)
+        step = generator.choice(list(STEPS))
+        yield Measurement(start + index, generator.choice(DEVICES), band, channel, security, step,
+                          generator.lognormvariate(0, 0.5) * STEPS[step], generator.random() < 0.02)
+
+
+def python_aggregate(path):
+    groups = defaultdict(list)
+    with open(path) as records_file:
+        for line in records_file:
+            record = json.loads(line)
+            if not record['error']:
+                groups[(record['band'], record['channel'], record['security'])].append(record['duration'])
+    return {group: dict(count=len(values), **{f'p{percent}': percentile(values, percent) for percent in PERCENTS})
+            for group, values in groups.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorised vs Python loop aggregation of campaign measurements')
+    parser.add_argument('--records', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = os.path.join(directory, 'store')
+        json_path = os.path.join(directory, 'measurements.jsonl')
+
+        start = time.perf_counter()
+        with MeasurementStore(store_path) as store, open(json_path, 'w') as json_file:
+            for measurement in synthetic_measurements(args.records):
+                store.append(measurement)
+                json_file.write(json.dumps(measurement._asdict()) + '\n')
+        print(f'Wrote {args.records} measurements to both formats in {time.perf_counter() - start:.1f}s')
+
+        store_size = os.path.getsize(store.records_path)
+        json_size = os.path.getsize(json_path)
+        print(f'Store {store_size / 2 ** 20:.1f} MiB ({store_size / args.records:.0f} B/record), '
+              f'JSON lines {json_size / 2 ** 20:.1f} MiB ({json_size / args.records:.0f} B/record)')
+
+        start = time.perf_counter()
+        reference = python_aggregate(json_path)
+        python_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = MeasurementStore(store_path)
+        result = store.aggregate(by=('band', 'channel', 'security'), percents=PERCENTS)
+        store_time = time.perf_counter() - start
+
+        for group, stats in reference.items():
+            assert result[group]['count'] == stats['count'], (group, result[group], stats)
+            for percent in PERCENTS:
+                assert abs(result[group][f'p{percent}'] - stats[f'p{percent}']) < 1e-9, (group, result[group], stats)
+
+        start = time.perf_counter()
+        page_loads = store.aggregate(by='device', where=store.select(step='page load', band=5))
+        filtered_time = time.perf_counter() - start
+
+    print(f'{len(result)} groups. Python loop {python_time:.2f}s, vectorised {store_time:.3f}s '
+          f'({python_time / store_time:.0f}x), filtered by step and band {filtered_time:.3f}s for {len(page_loads)} devices')
+
+
+if __name__ == '__main__':
+    main()
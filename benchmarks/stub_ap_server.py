@@ -0,0 +1,346 @@
+"""
+A local stand-in for the TP-Link web UI. It serves a single page with the same element ids and
+'wifiSettingsSection' layout that APManager drives, and keeps the AP wireless settings in memory.
+Every UI transition (page load, dropdown open, save) is delayed by 'delay' seconds, so waits can be
+measured. The same settings can be read and written without a browser through TP-Link like
+'/cgi-bin/luci/;stok=<token>/...' JSON endpoints, which take the dropdown item indexes. Run it standalone with:
+python -m benchmarks.stub_ap_server --port 8080 --delay 0.2
+"""
+import argparse
+import json
+import secrets
+import threading
+import re
+import time
+from http import cookies
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+CHANNELS = {'2.4GHz': ['Auto'] + [str(channel) for channel in range(1, 14)],
+            '5GHz': ['Auto', '36', '40', '44', '48']}
+SECURITY = ['No Security', 'WPA/WPA2-Personal (Auto)', 'WPA2-Personal (AES)']
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<title>TP-Link stub</title>
+<style>
+.hidden {display: none;}
+.select {border: 1px solid #888; width: 240px; cursor: pointer;}
+.select ul {list-style: none; margin: 0; padding: 0;}
+.select li:hover {background: #ddd;}
+</style>
+</head>
+<body>
+<div id="loginSection" class="hidden">
+    <input id="password" type="password">
+    <button id="loginBtn">Log In</button>
+</div>
+<div id="wifiSettingsSection" class="hidden">
+    <div><label>Wireless Radio</label></div>
+    <div><label>Network Name (SSID)</label> <input id="ssidInput"></div>
+    <div><label>Hide SSID</label></div>
+    <div><label>Band</label><div class="select" data-name="band"><span></span><span>&#9662;</span><ul class="hidden"></ul></div></div>
+    <div><label>Channel</label><div class="select" data-name="channel"><span></span><span>&#9662;</span><ul class="hidden"></ul></div></div>
+    <div><label>Mode</label><div class="select" data-name="mode"><span>802.11b/g/n mixed</span><ul class="hidden"></ul></div></div>
+    <div><label>Channel Width</label></div>
+    <div><label>Security</label><div class="select" data-name="security"><span></span><span>&#9662;</span><ul class="hidden"></ul></div></div>
+    <div><label>Password</label> <input id="keyInput"></div>
+    <button id="wirelessSettingsSave">Save</button>
+</div>
+<div id="rebootDialog" class="hidden">
+    <button id="wifiRebootOK">Reboot</button>
+    <button id="wifiRebootCancel">Cancel</button>
+</div>
+<script>
+const DELAY = __DELAY_MS__;
+const CHANNELS = __CHANNELS__;
+const SECURITY = __SECURITY__;
+const values = {};
+
+function $(id) { return document.getElementById(id); }
+function show(id, visible) { $(id).classList.toggle('hidden', !visible); }
+function select(name) { return document.querySelector('.select[data-name="' + name + '"]'); }
+
+function fill(name, items, value) {
+    const root = select(name);
+    const list = root.querySelector('ul');
+    list.innerHTML = '';
+    items.forEach(function (item) {
+        const li = document.createElement('li');
+        li.textContent = item;
+        li.addEventListener('click', function (event) {
+            event.stopPropagation();
+            pick(name, item);
+            list.classList.add('hidden');
+        });
+        list.appendChild(li);
+    });
+    pick(name, value === undefined ? items[0] : value);
+}
+
+function pick(name, item) {
+    values[name] = item;
+    select(name).querySelector('span').textContent = item;
+    if (name == 'band') {
+        fill('channel', CHANNELS[item]);
+    }
+}
+
+document.querySelectorAll('.select').forEach(function (root) {
+    root.addEventListener('click', function () {
+        const list = root.querySelector('ul');
+        if (list.classList.contains('hidden')) {
+            setTimeout(function () { list.classList.remove('hidden'); }, DELAY);
+        } else {
+            list.classList.add('hidden');
+        }
+    });
+});
+
+function load() {
+    show('wifiSettingsSection', false);
+    fetch('/stub/state').then(function (response) {
+        if (response.status == 401) {
+            setTimeout(function () { show('loginSection', true); }, DELAY);
+            return;
+        }
+        response.json().then(function (state) {
+            setTimeout(function () {
+                show('loginSection', false);
+                $('ssidInput').value = state.ssid;
+                fill('band', Object.keys(CHANNELS), state.band);
+                fill('channel', CHANNELS[state.band], state.channel);
+                fill('security', SECURITY, state.security);
+                $('keyInput').value = state.key;
+                show('wifiSettingsSection', true);
+            }, DELAY);
+        });
+    });
+}
+
+$('loginBtn').addEventListener('click', function () {
+    fetch('/stub/login', {method: 'POST', body: JSON.stringify({password: $('password').value})})
+        .then(function (response) { if (response.ok) { load(); } });
+});
+
+$('wirelessSettingsSave').addEventListener('click', function () {
+    const state = {ssid: $('ssidInput').value, band: values.band, channel: values.channel,
+                   security: values.security, key: $('keyInput').value};
+    fetch('/stub/save', {method: 'POST', body: JSON.stringify(state)}).then(function (response) {
+        if (response.status == 401) { load(); return; }
+        setTimeout(function () { show('rebootDialog', true); }, DELAY);
+    });
+});
+
+['wifiRebootOK', 'wifiRebootCancel'].forEach(function (id) {
+    $(id).addEventListener('click', function () { show('rebootDialog', false); });
+});
+
+window.addEventListener('hashchange', load);
+load();
+</script>
+</body>
+</html>
+'''
+
+
+class StubAPServer:
+    """
+    This class runs the stub TP-Link web UI on a background thread.
+    'state' holds the current wireless settings, 'saves' every saved configuration, and a login
+    expires 'session_ttl' seconds after it was made (None never expires).
+    """
+
+    def __init__(self, port=0, delay=0.0, password='admin', session_ttl=None):
+        self.delay = delay
+        self.password = password
+        self.session_ttl = session_ttl
+        self.state = {'ssid': 'TP-Link_STUB', 'band': '2.4GHz', 'channel': 'Auto', 'security': SECURITY[0], 'key': ''}
+        self.saves = []
+        self.logins = 0
+        self.connections = 0
+        self.sessions = dict()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def wireless_settings_url(self):
+        return f'{self.url}#Advanced/Wireless/WirelessSettings'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='stub-ap', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def login(self, password):
+        if password != self.password:
+            return None
+        token = secrets.token_hex(8)
+        with self.lock:
+            self.sessions[token] = time.monotonic()
+            self.logins += 1
+        return token
+
+    def is_authenticated(self, token):
+        with self.lock:
+            created = self.sessions.get(token)
+            if created is None:
+                return False
+            if self.session_ttl is not None and time.monotonic() - created > self.session_ttl:
+                del self.sessions[token]
+                return False
+            return True
+
+    def expire_sessions(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def wireless_form(self):
+        # The wireless settings as 1-based dropdown item indexes, the way the web UI form submits them
+        bands = list(CHANNELS)
+        return {'ssid': self.state['ssid'], 'band': bands.index(self.state['band']) + 1,
+                'channel': CHANNELS[self.state['band']].index(self.state['channel']) + 1,
+                'security': SECURITY.index(self.state['security']) + 1, 'key': self.state['key']}
+
+    def write_wireless_form(self, form):
+        with self.lock:
+            state = dict(self.state)
+            if 'band' in form:
+                state['band'] = list(CHANNELS)[int(form['band']) - 1]
+            if 'channel' in form:
+                state['channel'] = CHANNELS[state['band']][int(form['channel']) - 1]
+            elif state['channel'] not in CHANNELS[state['band']]:
+                state['channel'] = 'Auto'
+            if 'security' in form:
+                state['security'] = SECURITY[int(form['security']) - 1]
+            for field in ('ssid', 'key'):
+                if field in form:
+                    state[field] = form[field]
+            self.state = state
+            self.saves.append(dict(state))
+
+    def page(self):
+        return (PAGE.replace('__DELAY_MS__', str(int(self.delay * 1000)))
+                    .replace('__CHANNELS__', json.dumps(CHANNELS))
+                    .replace('__SECURITY__', json.dumps(SECURITY)))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def token(self):
+                jar = cookies.SimpleCookie(self.headers.get('Cookie', ''))
+                return jar['stok'].value if 'stok' in jar else None
+
+            def body(self):
+                length = int(self.headers.get('Content-Length', 0))
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def reply(self, status, payload, content_type='application/json', headers=None):
+                data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or dict()).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/stub/state':
+                    if not server.is_authenticated(self.token()):
+                        return self.reply(401, {'error': 'login required'})
+                    return self.reply(200, server.state)
+                if self.path.split('#')[0] in ('/', '/index.html'):
+                    return self.reply(200, server.page(), content_type='text/html')
+                self.reply(404, {'error': 'not found'})
+
+            def luci(self):
+                form = dict(parse_qsl(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')))
+                match = re.match(r'/cgi-bin/luci/;stok=([^/]*)(/.*)$', self.path)
+                token, command = match.groups() if match else (None, self.path)
+                if command == '/login?form=login' and form.get('operation') == 'login':
+                    token = server.login(form.get('password'))
+                    if token is None:
+                        return self.reply(200, {'success': False, 'errorcode': 'login failed'})
+                    return self.reply(200, {'success': True, 'data': {'stok': token}})
+                if command != '/admin/wireless?form=wireless':
+                    return self.reply(404, {'success': False, 'errorcode': 'not found'})
+                if not server.is_authenticated(token):
+                    return self.reply(403, {'success': False, 'errorcode': 'timeout'})
+                if form.get('operation') == 'read':
+                    return self.reply(200, {'success': True, 'data': server.wireless_form()})
+                if form.get('operation') == 'write':
+                    try:
+                        server.write_wireless_form(form)
+                    except (ValueError, IndexError, KeyError):
+                        return self.reply(200, {'success': False, 'errorcode': 'invalid value'})
+                    return self.reply(200, {'success': True, 'data': server.wireless_form()})
+                self.reply(200, {'success': False, 'errorcode': 'invalid operation'})
+
+            def do_POST(self):
+                if self.path.startswith('/cgi-bin/luci/'):
+                    return self.luci()
+                if self.path == '/stub/login':
+                    token = server.login(self.body().get('password'))
+                    if token is None:
+                        return self.reply(403, {'error': 'wrong password'})
+                    return self.reply(200, {'success': True}, headers={'Set-Cookie': f'stok={token}; Path=/'})
+                if self.path == '/stub/save':
+                    if not server.is_authenticated(self.token()):
+                        return self.reply(401, {'error': 'login required'})
+                    with server.lock:
+                        server.state = self.body()
+                        server.saves.append(dict(server.state))
+                    return self.reply(200, {'success': True})
+                self.reply(404, {'error': 'not found'})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub TP-Link web UI')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--delay', type=float, default=0.2, help='delay of every UI transition, in seconds')
+    parser.add_argument('--session-ttl', type=float, default=None, help='login expiry, in seconds')
+    args = parser.parse_args()
+
+    server = StubAPServer(port=args.port, delay=args.delay, session_ttl=args.session_ttl)
+    print(f'Serving stub AP web UI on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""
+A local stand-in for the Appium server. It speaks enough of the WebDriver protocol (both the W3C and
+the legacy JSON wire response shapes) for AndroidManager: session create/delete, navigation, element
+lookup and click, page source, script execution and the Appium activity endpoints.
+Session creation and navigation are delayed, and every request is counted, so session reuse and
+round trips can be measured. Run it standalone with:
+python -m benchmarks.stub_webdriver_server --port 4723 --session-delay 2
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+
+SETTINGS_SOURCE = '''<?xml version="1.0" encoding="UTF-8"?>
+<hierarchy rotation="0">
+  <android.widget.FrameLayout resource-id="" text="" class="android.widget.FrameLayout" bounds="[0,0][1080,2280]">
+    <android.widget.TextView resource-id="com.android.settings:id/search_action_bar_title" text="Search settings" class="android.widget.TextView" bounds="[0,100][1080,220]"/>
+    <android.widget.LinearLayout resource-id="com.android.settings:id/dashboard_tile" text="" class="android.widget.LinearLayout" bounds="[0,300][1080,480]">
+      <android.widget.TextView resource-id="android:id/title" text="Network &amp; internet" class="android.widget.TextView" bounds="[200,330][900,400]"/>
+    </android.widget.LinearLayout>
+    <android.widget.LinearLayout resource-id="com.android.settings:id/dashboard_tile" text="" class="android.widget.LinearLayout" bounds="[0,480][1080,660]">
+      <android.widget.TextView resource-id="android:id/title" text="Connected devices" class="android.widget.TextView" bounds="[200,510][900,580]"/>
+    </android.widget.LinearLayout>
+    <android.widget.LinearLayout resource-id="com.android.settings:id/icon_frame" text="" class="android.widget.LinearLayout" bounds="[40,700][160,820]"/>
+  </android.widget.FrameLayout>
+</hierarchy>
+'''
+
+
+class StubSession:
+    def __init__(self, capabilities):
+        self.id = uuid.uuid4().hex
+        self.capabilities = capabilities
+        self.url = 'about:blank'
+        self.activity = capabilities.get('appActivity', '.Main')
+        self.elements = dict()
+
+
+class StubWebDriverServer:
+    """
+    This class runs the stub Appium / WebDriver server on a background thread.
+    'requests' counts every request by its route, 'sessions_created' counts new sessions, and
+    kill_sessions() drops all sessions, the way an Appium server restart or a crashed session would.
+    """
+
+    def __init__(self, port=0, session_delay=0.0, navigation_delay=0.0, page_source=SETTINGS_SOURCE):
+        self.session_delay = session_delay
+        self.navigation_delay = navigation_delay
+        self.page_source = page_source
+        self.sessions = dict()
+        self.sessions_created = 0
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/wd/hub'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='stub-webdriver', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def kill_sessions(self):
+        with self.lock:
+            self.sessions.clear()
+
+    def round_trips(self):
+        return sum(self.requests.values())
+
+    def execute_script(self, session, script):
+        if 'readyState' in script:
+            return 'complete'
+        if 'performance' in script:
+            # Navigation timing of a page which took 'navigation_delay' seconds to load
+            start = time.time() * 1000 - self.navigation_delay * 1000
+            step = self.navigation_delay * 1000 / 8
+            names = ['navigationStart', 'domainLookupStart', 'domainLookupEnd', 'connectStart', 'connectEnd',
+                     'requestStart', 'responseStart', 'responseEnd', 'domContentLoadedEventEnd', 'loadEventEnd']
+            offsets = [0, 0, 1, 1, 2, 2, 4, 5, 7, 8]
+            return {name: int(start + offset * step) for name, offset in zip(names, offsets)}
+        return None
+
+    def find_elements(self, session, using, value):
+        nodes = list(ET.fromstring(self.page_source.encode('utf-8')).iter())[1:]
+        if using in ('id', 'css selector'):
+            value = value.lstrip('#').replace('\\:', ':')
+            matches = [node for node in nodes if node.get('resource-id') == value]
+        elif using == 'xpath':
+            attribute = re.match(r'//\*\[@([\w-]+)=["\'](.*)["\']\]$', value)
+            if attribute is None:
+                matches = nodes[:1]
+            else:
+                matches = [node for node in nodes if node.get(attribute.group(1)) == attribute.group(2)]
+        else:
+            matches = []
+        ids = []
+        for node in matches:
+            element_id = uuid.uuid4().hex
+            session.elements[element_id] = dict(node.attrib)
+            ids.append({ELEMENT_KEY: element_id, 'ELEMENT': element_id})
+        return ids
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def reply(self, status, value, session_id=None):
+                data = json.dumps({'sessionId': session_id, 'status': 0 if status == 200 else 13, 'value': value}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def error(self, status, error, message):
+                self.reply(status, {'error': error, 'message': message})
+
+            def body(self):
+                length = int(self.headers.get('Content-Length', 0))
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def route(self, method):
+                path = self.path.split('?')[0]
+                if path.startswith('/wd/hub'):
+                    path = path[len('/wd/hub'):]
+                body = self.body() if method == 'POST' else dict()
+
+                if path == '/session' and method == 'POST':
+                    server.requests['new session'] += 1
+                    capabilities = body.get('desiredCapabilities') or body.get('capabilities', {}).get('alwaysMatch', {})
+                    time.sleep(server.session_delay)
+                    session = StubSession(capabilities)
+                    with server.lock:
+                        server.sessions[session.id] = session
+                        server.sessions_created += 1
+                    return self.reply(200, {'sessionId': session.id, 'capabilities': capabilities}, session.id)
+
+                match = re.match(r'/session/([^/]+)(/.*)?$', path)
+                if match is None:
+                    return self.error(404, 'unknown command', path)
+                session = server.sessions.get(match.group(1))
+                command = match.group(2) or ''
+                command_name = re.sub(r'/element/[^/]+/', '/element/<id>/', command) or '/'
+                server.requests[f'{method} {command_name}'] += 1
+                if session is None:
+                    return self.error(404, 'invalid session id', 'session is gone')
+
+                if command == '' and method == 'DELETE':
+                    with server.lock:
+                        server.sessions.pop(session.id, None)
+                    return self.reply(200, None, session.id)
+                if command == '/url' and method == 'POST':
+                    time.sleep(server.navigation_delay)
+                    session.url = body.get('url')
+                    return self.reply(200, None, session.id)
+                if command == '/url':
+                    return self.reply(200, session.url, session.id)
+                if command == '/title':
+                    return self.reply(200, f'Stub page {session.url}', session.id)
+                if command == '/window' and method == 'DELETE':
+                    return self.reply(200, [], session.id)
+                if command == '/source':
+                    return self.reply(200, server.page_source, session.id)
+                if command in ('/execute', '/execute/sync'):
+                    return self.reply(200, server.execute_script(session, body.get('script', '')), session.id)
+                if command == '/appium/device/current_activity':
+                    return self.reply(200, session.activity, session.id)
+                if command == '/appium/device/start_activity':
+                    session.activity = body.get('appActivity', session.activity)
+                    return self.reply(200, None, session.id)
+                if command in ('/element', '/elements'):
+                    elements = server.find_elements(session, body.get('using'), body.get('value'))
+                    if command == '/elements':
+                        return self.reply(200, elements, session.id)
+                    if not elements:
+                        return self.error(404, 'no such element', body.get('value'))
+                    return self.reply(200, elements[0], session.id)
+                if re.match(r'/element/[^/]+/click$', command):
+                    return self.reply(200, None, session.id)
+                element = re.match(r'/element/([^/]+)/(text|attribute/[\w-]+)$', command)
+                if element is not None:
+                    attributes = session.elements.get(element.group(1), dict())
+                    name = 'text' if element.group(2) == 'text' else element.group(2).split('/')[1]
+                    return self.reply(200, attributes.get(name), session.id)
+                if command in ('/touch/perform', '/actions', '/appium/tap'):
+                    return self.reply(200, None, session.id)
+                return self.error(404, 'unknown command', command)
+
+            def do_GET(self):
+                self.route('GET')
+
+            def do_POST(self):
+                self.route('POST')
+
+            def do_DELETE(self):
+                self.route('DELETE')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub Appium / WebDriver server')
+    parser.add_argument('--port', type=int, default=4723)
+    parser.add_argument('--session-delay', type=float, default=2.0, help='session creation time, in seconds')
+    parser.add_argument('--navigation-delay', type=float, default=0.2, help='page load time, in seconds')
+    args = parser.parse_args()
+
+    server = StubWebDriverServer(port=args.port, session_delay=args.session_delay, navigation_delay=args.navigation_delay)
+    print(f'Serving stub WebDriver protocol on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
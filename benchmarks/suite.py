@@ -0,0 +1,290 @@
+"""
+Runs end-to-end scenarios of the managers against local stand-ins: the fake 'adb' and 'netsh' executables
+(see benchmarks.fake_tools), the stub Appium / WebDriver server and the stub TP-Link web UI, each with a
+configurable latency. Every scenario is timed over a number of iterations, and the latency percentiles and
+throughput are printed and can be saved as a JSON baseline, which later runs compare against.
+Run from the repository root:
+python -m benchmarks.suite --iterations 20 --save-baseline baseline.json
+python -m benchmarks.suite --iterations 20 --compare baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from adb_shell import AdbShellPool
+from android_device_manager import AndroidManager
+from ap_http_backend import HttpAPManager
+from ap_matrix import build_matrix, order_matrix
+from appium_sessions import AppiumSessionManager
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, FAKE_NETSH_SCRIPT, install_fake_tool, prepend_to_path
+from benchmarks.stub_ap_server import StubAPServer
+from benchmarks.stub_webdriver_server import StubWebDriverServer
+from page_load_metrics import percentile
+from wifi_profile_store import WiFiProfileStore
+from windows_wifi_manager import WiFiManager
+
+
+PERCENTS = (50, 90, 99)
+
+
+class Scenario:
+    """
+    A benchmarked operation. setup() runs once before the timed iterations, run() once per iteration
+    and teardown() once after them.
+    """
+
+    name = ''
+
+    def __init__(self, context):
+        self.context = context
+
+    def setup(self):
+        pass
+
+    def run(self, iteration):
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+
+class CapabilitiesScenario(Scenario):
+    """
+    Builds the Appium capabilities of a device which is not cached yet: 'adb devices -l' plus one getprop.
+    """
+
+    name = 'capabilities (cold cache)'
+
+    def setup(self):
+        self.pool = AdbShellPool()
+
+    def run(self, iteration):
+        android = AndroidManager(shell_pool=self.pool, appium_sessions=self.context['appium_sessions'])
+        caps = android.create_desire_capabilities('chrome')
+        assert caps['udid'], caps
+
+    def teardown(self):
+        self.pool.close()
+
+
+class WifiToggleScenario(Scenario):
+    """
+    Turns the Wi-Fi of the fake device off and on again, waiting until it reconnected.
+    """
+
+    name = 'wifi toggle'
+
+    def setup(self):
+        self.pool = AdbShellPool()
+        self.android = AndroidManager(shell_pool=self.pool, appium_sessions=self.context['appium_sessions'])
+
+    def run(self, iteration):
+        for timing in (self.android.turn_wifi_off(wait=True, timeout=10), self.android.turn_wifi_on(wait=True, timeout=10)):
+            assert timing.error is None, timing
+
+    def teardown(self):
+        self.pool.close()
+
+
+class APMatrixStepScenario(Scenario):
+    """
+    Applies the next configuration of the AP matrix to the stub TP-Link endpoints through HttpAPManager.
+    """
+
+    name = 'ap matrix step'
+
+    def setup(self):
+        self.configs = order_matrix(build_matrix(security_types=['OPEN', 'AES']))
+        self.ap = HttpAPManager(self.context['ap_server'].url)
+        self.ap.login_ap(self.context['ap_server'].password)
+
+    def run(self, iteration):
+        self.ap.set_ap_params(*self.configs[iteration % len(self.configs)])
+        assert self.ap.save_params()
+
+    def teardown(self):
+        self.ap.close()
+
+
+class ProfileConnectScenario(Scenario):
+    """
+    Installs a Wi-Fi profile through the profile store and connects the fake interface, waiting for an IP address.
+    """
+
+    name = 'profile install + connect'
+
+    def setup(self):
+        profiles_dir = os.path.join(self.context['fake_dir'], 'profiles')
+        self.wfm = WiFiManager(os.path.join(self.context['fake_dir'], 'wifi_profile.xml'), WiFiProfileStore(profiles_dir))
+
+    def run(self, iteration):
+        # A new password every iteration, so the profile really is installed
+        self.wfm.create_wifi_profile('SECURED', 'FakeWiFi', f'key{iteration:08}', 'WPA2PSK', 'AES')
+        self.wfm.add_wifi_profile()
+        timing = self.wfm.connect_to_wifi('FakeWiFi', wait=True, timeout=10)
+        assert timing.error is None, timing
+
+
+class PageLoadScenario(Scenario):
+    """
+    Loads a page in the (reused) Appium chrome session of the stub Appium server. Needs the Appium python client.
+    """
+
+    name = 'page load'
+
+    def setup(self):
+        self.android = AndroidManager(appium_sessions=self.context['appium_sessions'])
+
+    def run(self, iteration):
+        record = self.android.browse_to(f'http://stub.local/page/{iteration}')
+        assert record is not None and record.error is None, record
+
+    def teardown(self):
+        self.android.close()
+
+
+SCENARIOS = [CapabilitiesScenario, WifiToggleScenario, APMatrixStepScenario, ProfileConnectScenario, PageLoadScenario]
+
+
+def summarize(durations, wall_time):
+    stats = {'iterations': len(durations), 'mean': sum(durations) / len(durations),
+             'throughput': len(durations) / wall_time if wall_time else 0.0}
+    for percent in PERCENTS:
+        stats[f'p{percent}'] = percentile(durations, percent)
+    return stats
+
+
+def run_scenario(scenario, iterations, warmup):
+    """
+    This function runs a scenario and returns its latency statistics (seconds) and throughput (iterations/s).
+
+    Args:
+        scenario:   Scenario
+        iterations: timed iterations
+        warmup:     untimed iterations run first
+
+    Returns:
+        dict:   the statistics, or {'error': ...} if the scenario failed
+
+    Raises:
+        NA
+    """
+
+    try:
+        scenario.setup()
+    except Exception as error:
+        return {'error': f'setup failed: {error!r}'}
+    try:
+        for iteration in range(warmup):
+            scenario.run(iteration)
+        durations = []
+        start = time.perf_counter()
+        for iteration in range(warmup, warmup + iterations):
+            iteration_start = time.perf_counter()
+            scenario.run(iteration)
+            durations.append(time.perf_counter() - iteration_start)
+        return summarize(durations, time.perf_counter() - start)
+    except Exception as error:
+        return {'error': repr(error)}
+    finally:
+        try:
+            scenario.teardown()
+        except Exception:
+            pass
+
+
+def compare(results, baseline, tolerance):
+    """
+    This function compares the results with a baseline, and returns the regressions: scenarios whose p50 or p90
+    latency grew by more than 'tolerance' (e.g. 0.2 for 20%), or which failed although the baseline passed.
+    """
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get('scenarios', dict()).get(name)
+        if reference is None or 'error' in reference:
+            continue
+        if 'error' in stats:
+            regressions.append(f'{name}: failed ({stats["error"]})')
+            continue
+        for metric in ('p50', 'p90'):
+            if stats[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {reference[metric] * 1000:.1f} ms -> {stats[metric] * 1000:.1f} ms '
+                                   f'(+{(stats[metric] / reference[metric] - 1) * 100:.0f}%)')
+    return regressions
+
+
+def report(results):
+    lines = [f'{"scenario":<28} {"p50 [ms]":>9} {"p90 [ms]":>9} {"p99 [ms]":>9} {"ops/s":>8}']
+    for name, stats in results.items():
+        if 'error' in stats:
+            lines.append(f'{name:<28} error: {stats["error"]}')
+        else:
+            lines.append(f'{name:<28} {stats["p50"] * 1000:>9.1f} {stats["p90"] * 1000:>9.1f} '
+                         f'{stats["p99"] * 1000:>9.1f} {stats["throughput"]:>8.2f}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline end-to-end benchmark suite of the managers')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--scenarios', nargs='*', help='names of the scenarios to run, all by default')
+    parser.add_argument('--adb-latency', type=float, default=0.01, help='fake adb start/server round trip, in seconds')
+    parser.add_argument('--netsh-latency', type=float, default=0.01, help='fake netsh run time, in seconds')
+    parser.add_argument('--wifi-timeline', default='0.1,0.3,0.1', help='fake device Wi-Fi timeline, see fake_tools')
+    parser.add_argument('--netsh-timeline', default='0.05,0.1,0.15,0.2', help='fake interface timeline, see fake_tools')
+    parser.add_argument('--ap-delay', type=float, default=0.0, help='stub TP-Link UI transition delay, in seconds')
+    parser.add_argument('--appium-delay', type=float, default=0.5, help='stub Appium session creation time, in seconds')
+    parser.add_argument('--navigation-delay', type=float, default=0.05, help='stub page load time, in seconds')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare the results with this baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p50/p90 growth over the baseline')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    results = dict()
+    with tempfile.TemporaryDirectory() as fake_dir, StubAPServer(delay=args.ap_delay) as ap_server, \
+            StubWebDriverServer(session_delay=args.appium_delay, navigation_delay=args.navigation_delay) as appium_server:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        install_fake_tool(fake_dir, 'netsh', FAKE_NETSH_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ.update({'FAKE_ADB_DEVICES': 'FAKE0001:Pixel_3', 'FAKE_ADB_STARTUP_DELAY': str(args.adb_latency),
+                           'FAKE_ADB_WIFI_TIMELINE': args.wifi_timeline,
+                           'FAKE_ADB_WIFI_STATE': os.path.join(fake_dir, 'adb_wifi.json'),
+                           'FAKE_NETSH_DELAY': str(args.netsh_latency), 'FAKE_NETSH_TIMELINE': args.netsh_timeline,
+                           'FAKE_NETSH_STATE': os.path.join(fake_dir, 'netsh_state.json')})
+
+        context = {'fake_dir': fake_dir, 'ap_server': ap_server, 'appium_sessions': AppiumSessionManager(appium_server.url)}
+
+        for scenario_class in SCENARIOS:
+            if args.scenarios and scenario_class.name not in args.scenarios:
+                continue
+            results[scenario_class.name] = run_scenario(scenario_class(context), args.iterations, args.warmup)
+            print(f'{scenario_class.name}: done')
+
+    print(report(results))
+
+    if args.save_baseline:
+        baseline = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+                    'platform': platform.platform(), 'config': vars(args), 'scenarios': results}
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+        print(f'Saved baseline to {args.save_baseline}')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regression over {args.compare} (tolerance {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the overhead of the tracing spans while tracing is disabled, then traces a short run of
+AndroidManager (fake 'adb') and WiFiManager (fake 'netsh') and prints the time per step summary.
+The Chrome trace is written to --trace, in the temp directory by default (open it in chrome://tracing or
+https://ui.perfetto.dev).
+Run from the repository root:
+python -m benchmarks.tracing_benchmark --trace /tmp/trace.json
+"""
+import argparse
+import os
+import tempfile
+import timeit
+from adb_shell import AdbShellPool
+from android_device_manager import AndroidManager
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, FAKE_NETSH_SCRIPT, install_fake_tool, prepend_to_path
+from tracing import span, start_tracing, stop_tracing, traced
+from windows_wifi_manager import WiFiManager
+
+
+def plain():
+    return None
+
+
+@traced()
+def decorated():
+    return None
+
+
+def with_span():
+    with span('step'):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tracing overhead and a traced run against fake adb / netsh')
+    parser.add_argument('--trace', default=os.path.join(tempfile.gettempdir(), 'tracing_benchmark_trace.json'),
+                        help='the Chrome trace file')
+    parser.add_argument('--calls', type=int, default=1000000)
+    args = parser.parse_args()
+
+    for name, function in (('plain call', plain), ('@traced, disabled', decorated), ('span, disabled', with_span)):
+        seconds = timeit.timeit(function, number=args.calls)
+        print(f'{name:<20} {seconds / args.calls * 1e9:8.1f} ns/call')
+    start_tracing()
+    seconds = timeit.timeit(with_span, number=args.calls // 10)
+    stop_tracing()
+    print(f'{"span, enabled":<20} {seconds / (args.calls // 10) * 1e9:8.1f} ns/call')
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        install_fake_tool(fake_dir, 'netsh', FAKE_NETSH_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_ADB_WIFI_STATE'] = os.path.join(fake_dir, 'adb_wifi.json')
+        os.environ['FAKE_ADB_WIFI_TIMELINE'] = '0.1,0.3,0.1'
+        os.environ['FAKE_NETSH_STATE'] = os.path.join(fake_dir, 'netsh_state.json')
+
+        tracer = start_tracing()
+        pool = AdbShellPool()
+        android = AndroidManager(shell_pool=pool)
+        android.turn_wifi_off(wait=True)
+        android.turn_wifi_on(wait=True)
+        wfm = WiFiManager(os.path.join(fake_dir, 'wifi_profile.xml'))
+        wfm.create_wifi_profile('SECURED', 'FakeWiFi', '00099999', 'WPA2PSK', 'AES')
+        wfm.add_wifi_profile()
+        wfm.connect_to_wifi('FakeWiFi', wait=True, timeout=5)
+        pool.close()
+        stop_tracing()
+
+    print(tracer.summary_table())
+    tracer.save_chrome_trace(args.trace)
+    print(f'{len(tracer.records)} spans written to {args.trace}')
+
+
+if __name__ == '__main__':
+    main()
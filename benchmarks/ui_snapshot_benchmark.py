@@ -0,0 +1,81 @@
+"""
+Counts the Appium round trips of the Settings navigation flow against the stub Appium server, with an
+Appium lookup per element and with one page source snapshot per screen (UiSnapshotIndex).
+Needs the Appium python client. Run from the repository root:
+python -m benchmarks.ui_snapshot_benchmark --flows 5
+"""
+import argparse
+import os
+import tempfile
+import time
+from android_device_manager import AndroidManager
+from appium_sessions import AppiumSessionManager
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool, prepend_to_path
+from benchmarks.stub_webdriver_server import StubWebDriverServer
+from ui_snapshot import UiSnapshotIndex
+
+
+TITLE_ID = 'android:id/title'
+SEARCH_ID = 'com.android.settings:id/search_action_bar_title'
+ICON_FRAME_ID = 'com.android.settings:id/icon_frame'
+
+
+def lookup_flow(driver):
+    # Check the screen, read the menu, open 'Network & internet', then the Wi-Fi entry
+    driver.find_element_by_id(SEARCH_ID)
+    menu = [element.text for element in driver.find_elements_by_id(TITLE_ID)]
+    driver.find_element_by_xpath('//*[@text="Network & internet"]').click()
+    driver.find_element_by_id(ICON_FRAME_ID).click()
+    return menu
+
+
+def snapshot_flow(driver):
+    ui_index = UiSnapshotIndex(driver)
+    ui_index.find('id', SEARCH_ID)
+    menu = [node.text for node in ui_index.snapshot().find_all('id', TITLE_ID)]
+    ui_index.tap('text', 'Network & internet')
+    ui_index.tap('id', ICON_FRAME_ID)
+    return menu
+
+
+def measure(server, flow, driver, flows):
+    before = server.round_trips()
+    start = time.perf_counter()
+    for _ in range(flows):
+        flow(driver)
+    return (server.round_trips() - before) / flows, (time.perf_counter() - start) / flows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Appium round trips per Settings navigation flow against the stub Appium server')
+    parser.add_argument('--flows', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fake_dir, StubWebDriverServer() as server:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_ADB_DEVICES'] = 'FAKE0001:Pixel_3'
+
+        android = AndroidManager(appium_sessions=AppiumSessionManager(server.url))
+        driver = android.appium_sessions.get(android, 'settings')
+        lookup_trips, lookup_time = measure(server, lookup_flow, driver, args.flows)
+        snapshot_trips, snapshot_time = measure(server, snapshot_flow, driver, args.flows)
+
+        results = []
+        for use_snapshot in (False, True):
+            before = server.round_trips()
+            start = time.perf_counter()
+            android.connect_to_wifi(use_snapshot=use_snapshot)
+            results.append((server.round_trips() - before, time.perf_counter() - start))
+        android.close()
+
+    print(f'{"":<34} {"round trips":>12} {"time [s]":>9}')
+    print(f'{"menu flow, lookup per element":<34} {lookup_trips:>12.1f} {lookup_time:>9.3f}')
+    print(f'{"menu flow, snapshot per screen":<34} {snapshot_trips:>12.1f} {snapshot_time:>9.3f}')
+    print(f'{"connect_to_wifi()":<34} {results[0][0]:>12} {results[0][1]:>9.3f}')
+    print(f'{"connect_to_wifi(use_snapshot=True)":<34} {results[1][0]:>12} {results[1][1]:>9.3f}')
+    print(f'round trips saved per menu flow: {lookup_trips - snapshot_trips:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Connects WiFiManager to a network through a fake 'netsh' whose interface walks through associating,
+authenticating and connected, and prints the measured time-to-connect breakdown. Runs on Linux.
+Run from the repository root:
+python -m benchmarks.wifi_connect_benchmark --timeline 0.2,0.5,0.8,1.0 --runs 3
+"""
+import argparse
+import os
+import tempfile
+from benchmarks.fake_tools import FAKE_NETSH_SCRIPT, install_fake_tool, prepend_to_path
+from windows_wifi_manager import WiFiManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WiFiManager connect-and-wait against a fake netsh')
+    parser.add_argument('--timeline', default='0.1,0.2,0.3,0.4',
+                        help='seconds after the connect request to associating, authenticating, connected and the IP address')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--fail-auth', action='store_true', help='make the fake interface drop during authentication')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        install_fake_tool(fake_dir, 'netsh', FAKE_NETSH_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_NETSH_TIMELINE'] = args.timeline
+        os.environ['FAKE_NETSH_STATE'] = os.path.join(fake_dir, 'netsh_state.json')
+        if args.fail_auth:
+            os.environ['FAKE_NETSH_FAIL_AUTH'] = '1'
+
+        wfm = WiFiManager(os.path.join(fake_dir, 'wifi_profile.xml'))
+        print(f'{"run":>4} {"associating":>12} {"authenticating":>15} {"connected":>10} {"ip address":>11}  error')
+        for run in range(args.runs):
+            timing = wfm.connect_to_wifi('FakeWiFi', wait=True, timeout=5)
+            values = [timing.associating, timing.authenticating, timing.connected, timing.ip_address]
+            print(f'{run:>4} ' + ' '.join(f'{value:>{width}.3f}' if value is not None else f'{"-":>{width}}'
+                                          for value, width in zip(values, (12, 15, 10, 11))) + f'  {timing.error or ""}')
+
+
+if __name__ == '__main__':
+    main()
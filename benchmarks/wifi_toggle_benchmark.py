@@ -0,0 +1,47 @@
+"""
+Toggles the Wi-Fi of a fake android device with AndroidManager, waiting for the radio instead of sleeping,
+and prints the measured disable / enable / reconnect latencies per device model. Runs on Linux.
+Run from the repository root:
+python -m benchmarks.wifi_toggle_benchmark --timeline 0.3,1.0,0.2 --runs 3
+"""
+import argparse
+import os
+import tempfile
+from adb_shell import AdbShellPool
+from android_device_manager import AndroidManager
+from android_wifi_state import readiness_by_model
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool, prepend_to_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AndroidManager Wi-Fi toggle latency against a fake adb')
+    parser.add_argument('--timeline', default='0.3,1.0,0.2',
+                        help='seconds after "svc wifi enable" to enabled and connected, and after "svc wifi disable" to disabled')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-cmd-wifi', action='store_true', help='make the fake device fall back to "dumpsys wifi"')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as fake_dir:
+        install_fake_tool(fake_dir, 'adb', FAKE_ADB_SCRIPT)
+        prepend_to_path(fake_dir)
+        os.environ['FAKE_ADB_WIFI_TIMELINE'] = args.timeline
+        os.environ['FAKE_ADB_WIFI_STATE'] = os.path.join(fake_dir, 'adb_wifi.json')
+        if args.no_cmd_wifi:
+            os.environ['FAKE_ADB_NO_CMD_WIFI'] = '1'
+
+        pool = AdbShellPool()
+        android = AndroidManager(shell_pool=pool)
+        print(f'{"run":>4} {"action":>6} {"command":>8} {"state":>8} {"reconnect":>10}  error')
+        for run in range(args.runs):
+            for timing in (android.turn_wifi_off(wait=True, timeout=5), android.turn_wifi_on(wait=True, timeout=5)):
+                values = [timing.command, timing.state, timing.reconnect]
+                print(f'{run:>4} {timing.action:>6} ' + ' '.join(f'{value:>{width}.3f}' if value is not None else f'{"-":>{width}}'
+                                                               for value, width in zip(values, (8, 8, 10))) + f'  {timing.error or ""}')
+        pool.close()
+
+        for (model, action), summary in readiness_by_model(android.wifi_timings).items():
+            print(f'{model} {action}: {summary}')
+
+
+if __name__ == '__main__':
+    main()
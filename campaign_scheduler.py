@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from ap_matrix import config_label
+from wifi_profile_store import WiFiProfile
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+Stage = namedtuple('Stage', ['name', 'action', 'depends_on', 'resource', 'after_previous'], defaults=((), None, ()))
+Stage.__doc__ = '''
+A step of the campaign, run once per item (e.g. per AP configuration) as action(item).
+'depends_on' names the stages of the same item which must finish first, 'resource' names the resource the
+stage occupies while it runs (see PipelineScheduler 'resources'), and 'after_previous' names the stages of
+the previous item which must finish first, e.g. the AP may be reconfigured only after the clients measured it.
+'''
+
+TaskResult = namedtuple('TaskResult', ['item', 'stage', 'start', 'end', 'result', 'error'])
+
+
+class PipelineReport:
+    """
+    This class holds the task results of a PipelineScheduler.run() call, and derives the utilisation of every
+    stage and resource, and the speedup over running all tasks one after the other.
+    """
+
+    def __init__(self, stages, resources, tasks, wall_time):
+        self.stages = stages
+        self.resources = resources
+        self.tasks = tasks
+        self.wall_time = wall_time
+
+    @property
+    def sequential_time(self):
+        """
+        Seconds the same tasks take when run strictly one after the other.
+        """
+        return sum(task.end - task.start for task in self.tasks if task.start is not None)
+
+    @property
+    def speedup(self):
+        return self.sequential_time / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def failed(self):
+        return [task for task in self.tasks if task.error is not None]
+
+    def busy_time(self, stage=None, resource=None):
+        names = {item.name for item in self.stages
+                 if (stage is None or item.name == stage) and (resource is None or item.resource == resource)}
+        return sum(task.end - task.start for task in self.tasks if task.stage in names and task.start is not None)
+
+    def utilisation(self):
+        """
+        This method returns the share of the wall time every stage and resource was busy.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   {'stages': {stage: share}, 'resources': {resource: share}}. A resource share is relative
+                    to its capacity
+
+        Raises:
+            NA
+        """
+
+        if not self.wall_time:
+            return {'stages': dict(), 'resources': dict()}
+        return {'stages': {stage.name: self.busy_time(stage=stage.name) / self.wall_time for stage in self.stages},
+                'resources': {resource: self.busy_time(resource=resource) / (self.wall_time * capacity)
+                              for resource, capacity in self.resources.items()}}
+
+    def __str__(self):
+        utilisation = self.utilisation()
+        lines = [f'{"stage":<20} {"resource":<10} {"busy [s]":>9} {"utilisation":>12}']
+        for stage in self.stages:
+            lines.append(f'{stage.name:<20} {stage.resource or "-":<10} {self.busy_time(stage=stage.name):>9.3f} '
+                         f'{utilisation["stages"][stage.name]:>12.1%}')
+        for resource, share in utilisation['resources'].items():
+            lines.append(f'{"resource " + resource:<31} {self.busy_time(resource=resource):>9.3f} {share:>12.1%}')
+        lines.append(f'wall time {self.wall_time:.3f}s, sequential {self.sequential_time:.3f}s, '
+                     f'speedup {self.speedup:.2f}x, {len(self.failed)} failed tasks')
+        return '\n'.join(lines)
+
+
+class PipelineScheduler:
+    """
+    This class runs a campaign as a pipeline: every item (e.g. AP configuration) passes through the same
+    stages, and a stage task starts as soon as its dependencies are done and its resource is free, so the
+    stages of consecutive items overlap. For example the Wi-Fi profile of the next configuration is installed
+    while the clients are still measuring the current one.
+    'resources' maps every resource name to the number of tasks which may use it at the same time, e.g.
+    {'ap': 1, 'client': 1}. Ready tasks of earlier items run first.
+    When a task fails, the later stages of the same item are skipped, and the next items go on.
+    """
+
+    def __init__(self, stages, resources=None, max_workers=None):
+        self.stages = list(stages)
+        self.resources = dict(resources or dict())
+        for stage in self.stages:
+            if stage.resource is not None:
+                self.resources.setdefault(stage.resource, 1)
+        names = [stage.name for stage in self.stages]
+        for index, stage in enumerate(self.stages):
+            # Listing the stages in dependency order rules out dependency cycles
+            unknown = [name for name in stage.depends_on if name not in names[:index]]
+            unknown += [name for name in stage.after_previous if name not in names]
+            if unknown:
+                raise ValueError(f'Stage "{stage.name}" depends on unknown or later stages: {unknown}')
+        self.max_workers = max_workers or len(self.stages)
+
+    def run(self, items):
+        """
+        This method runs every stage for every item.
+
+        Args:
+            items:  the campaign items, e.g. ap_matrix.APConfig tuples, passed to the stage actions
+
+        Returns:
+            PipelineReport:     the task results and the stage utilisation
+
+        Raises:
+            NA
+        """
+
+        items = list(items)
+        order = {stage.name: index for index, stage in enumerate(self.stages)}
+        pending = [(index, stage) for index in range(len(items)) for stage in self.stages]
+        finished = dict()
+        failed_items = set()
+        in_use = {resource: 0 for resource in self.resources}
+        running = 0
+        changed = threading.Condition()
+        results = []
+
+        def ready(index, stage):
+            if stage.resource is not None and in_use[stage.resource] >= self.resources[stage.resource]:
+                return False
+            if any((index, name) not in finished for name in stage.depends_on):
+                return False
+            return index == 0 or all((index - 1, name) in finished for name in stage.after_previous)
+
+        def execute(index, stage, start):
+            nonlocal running
+            result = error = None
+            try:
+                result = stage.action(items[index])
+            except Exception as exception:
+                error = repr(exception)
+                LOGGER.error(f'Stage "{stage.name}" of {items[index]} failed: {error}')
+            end = time.monotonic()
+            with changed:
+                results.append(TaskResult(index, stage.name, start - started, end - started, result, error))
+                finished[(index, stage.name)] = error
+                if error is not None:
+                    failed_items.add(index)
+                if stage.resource is not None:
+                    in_use[stage.resource] -= 1
+                running -= 1
+                changed.notify_all()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            with changed:
+                while pending:
+                    dispatched = False
+                    for task in sorted(pending, key=lambda task: (task[0], order[task[1].name])):
+                        index, stage = task
+                        if index in failed_items:
+                            # Skipped tasks count as finished, so the next items are not blocked
+                            pending.remove(task)
+                            finished[(index, stage.name)] = 'skipped'
+                            results.append(TaskResult(index, stage.name, None, None, None, 'skipped'))
+                            dispatched = True
+                        elif ready(index, stage):
+                            pending.remove(task)
+                            if stage.resource is not None:
+                                in_use[stage.resource] += 1
+                            running += 1
+                            executor.submit(execute, index, stage, time.monotonic())
+                            dispatched = True
+                    if not dispatched:
+                        changed.wait()
+                changed.wait_for(lambda: running == 0)
+
+        report = PipelineReport(self.stages, self.resources, sorted(results, key=lambda task: (task.item, order[task.stage])),
+                                time.monotonic() - started)
+        LOGGER.info(f'Campaign of {len(items)} items:\n{report}')
+        return report
+
+
+def wifi_profile(config):
+    """
+    Returns the WiFiProfile of an ap_matrix.APConfig.
+    """
+    if config.security == 'OPEN':
+        return WiFiProfile('OPEN', config.ssid, '', '', '')
+    return WiFiProfile('SECURED', config.ssid, config.password, 'WPA2PSK', 'AES')
+
+
+def campaign_stages(ap_manager, wifi_manager, android_manager, urls):
+    """
+    This function builds the stages of the AP campaign:
+    wifi profile    install the Wi-Fi profile of the configuration (host), ahead of time
+    appium session  make sure the Appium chrome session is up (appium), once the previous configuration was
+                    browsed, so it never touches the driver while browse uses it
+    configure ap    set_ap_params + save_params (ap), once the clients measured the previous configuration. A failed
+                    save fails the stage, so the clients do not measure a configuration the AP did not apply
+    connect         connect the Windows client and wait for an IP address (client), once the AP is configured
+    browse          measure the page loads on the android device (client), once the client is connected
+
+    Args:
+        ap_manager:         a logged-in configure_ap.APManager or ap_http_backend.HttpAPManager
+        wifi_manager:       windows_wifi_manager.WiFiManager, with a profile store
+        android_manager:    android_device_manager.AndroidManager
+        urls:               the urls to browse per configuration
+
+    Returns:
+        list:   Stage
+
+    Raises:
+        NA
+    """
+
+    def configure_ap(config):
+        changes = ap_manager.set_ap_params(*config)
+        # None: nothing changed, so there was nothing to save
+        if ap_manager.save_params() is False:
+            raise RuntimeError(f'The AP did not save {config_label(config)}')
+        return changes
+
+    def install_profile(config):
+        # None: an identical profile is installed already
+        if wifi_manager.profile_store.install(wifi_profile(config)) is False:
+            raise RuntimeError(f'Was unable to install the Wi-Fi profile of {config.ssid}')
+
+    def prepare_session(config):
+        android_manager.appium_sessions.get(android_manager, 'chrome')
+
+    def connect(config):
+        timing = wifi_manager.connect_to_wifi(config.ssid, wait=True)
+        if timing.error is not None:
+            raise ConnectionError(timing.error)
+        return timing
+
+    return [
+        Stage('wifi profile', install_profile, resource='host'),
+        Stage('appium session', prepare_session, resource='appium', after_previous=('browse',)),
+        Stage('configure ap', configure_ap, resource='ap', after_previous=('browse',)),
+        Stage('connect', connect, depends_on=('configure ap', 'wifi profile'), resource='client'),
+        Stage('browse', lambda config: android_manager.browse_many(urls, ap_config=config_label(config)),
+              depends_on=('connect', 'appium session'), resource='client'),
+    ]
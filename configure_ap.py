@@ -1,16 +1,25 @@
 import time
 import logging
-from selenium import webdriver
-from Configuration.auto_configuration import Settings
-from JSON.channels_map import wifi_channels_map
-from JSON.security_types_map import security_types_map
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
+from lazy_imports import lazy_import
+from ap_settings import changed_settings, channel_band, requested_settings
+from waits import PageWaiter
+from tracing import span, trace_webdriver, traced
+
+# Loaded on first use, so importing this module does not pay for selenium
+webdriver = lazy_import('selenium.webdriver')
+auto_configuration = lazy_import('Configuration.auto_configuration')
+channels_map = lazy_import('JSON.channels_map')
+security_types = lazy_import('JSON.security_types_map')
 
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.DEBUG)
 
+WIFI_SETTINGS = '//*[@id="wifiSettingsSection"]'
+# Number of UI interactions (clicks / clear / send_keys) applying each field takes
+FIELD_INTERACTIONS = {'ssid': 2, 'band': 2, 'channel': 2, 'security': 2, 'password': 2}
+SAVE_INTERACTIONS = 2
+
 
 class APManager:
     """
@@ -22,95 +31,260 @@ class APManager:
     Mode:       11bgn mixed is currently the only acceptable
     Security:   Unsecured | AUTO | AES
     Password:   Network key/password
+
+    Instead of sleeping a fixed time, every step waits for the element it needs (see waits.PageWaiter).
+    'wait_timeout' is the default timeout of a step and 'step_timeouts' overrides it per step name.
+    The time each step actually waited is kept in self.waiter.timings.
+
+    With 'only_changed' set, set_ap_params reads the current wireless settings from the page once,
+    and applies only the fields which differ from them. save_params is skipped when nothing changed.
+    The number of UI interactions saved this way is counted in self.interactions_saved.
+
+    With a 'session_pool' (see ap_session_pool.APSessionPool) the browser session of 'ap_address' is
+    reused across APManager objects: login_ap and open_wireless_settings log in only when the page
+    asks for it, and close() returns the session to the pool instead of quitting the browser.
     """
 
-    def __init__(self):
-        self.driver = webdriver.Chrome(Settings.PATH_TO_CHROMEDRIVER)
-        self.driver.set_window_size(1280, 1024)
-        time.sleep(1)
-        self.driver.get(Settings.AP_HOME_PAGE)
+    def __init__(self, wait_timeout=10, step_timeouts=None, only_changed=False, session_pool=None, ap_address=None):
+        self.session_pool = session_pool
+        self.login_password = None
+        if session_pool is None:
+            self.session = None
+            with span('chrome new session', 'webdriver'):
+                self.driver = trace_webdriver(webdriver.Chrome(auto_configuration.Settings.PATH_TO_CHROMEDRIVER))
+            self.driver.set_window_size(1280, 1024)
+            with span('sleep', 'sleep'):
+                time.sleep(1)
+            self.driver.get(auto_configuration.Settings.AP_HOME_PAGE)
+        else:
+            self.session = session_pool.acquire(ap_address or auto_configuration.Settings.AP_HOME_PAGE)
+            self.driver = self.session.driver
+            self.login_password = self.session.password
+        self.waiter = PageWaiter(self.driver, timeout=wait_timeout, step_timeouts=step_timeouts)
+        self.only_changed = only_changed
+        self.snapshot = None
+        self.pending_changes = None
+        self.interactions_saved = 0
 
+    @traced()
     def login_ap(self, password):
-        self.password = password
-        element = self.driver.find_element_by_id('password')
-        element.click()
-        element.send_keys(self.password)
-
-        element = self.driver.find_element_by_id('loginBtn')
-        element.click()
+        self.login_password = password
+        if self.session is not None:
+            # A pooled session logs in lazily, once the wireless settings page asks for it
+            self.session.password = password
+            self.open_wireless_settings()
+            return
+        self._submit_login()
 
+    @traced()
     def open_wireless_settings(self):
+        self._navigate_to_wireless_settings()
+        if self.login_password is not None and self._login_required():
+            LOGGER.info(f'AP login has expired, logging in again')
+            self._submit_login()
+            self._navigate_to_wireless_settings()
+            self.snapshot = None
+
+    def close(self):
+        if self.session_pool is not None:
+            self.session_pool.release(self.session)
+        else:
+            self.driver.quit()
+
+    def _navigate_to_wireless_settings(self):
         wireless_settings_uri = '#Advanced/Wireless/WirelessSettings'
         if wireless_settings_uri not in self.driver.current_url:
-            self.driver.get(Settings.AP_WIRELESS_SETTINGS_PAGE)
+            self.driver.get(auto_configuration.Settings.AP_WIRELESS_SETTINGS_PAGE)
+            # A reloaded page shows the saved settings, not the ones in the snapshot
+            self.snapshot = None
+
+    def _submit_login(self):
+        element = self.waiter.element('login password', 'id', 'password', clickable=True)
+        element.click()
+        element.send_keys(self.login_password)
+
+        element = self.waiter.element('login button', 'id', 'loginBtn', clickable=True)
+        element.click()
+
+    def _login_required(self, ready_id='wifiSettingsSection'):
+        """
+        Waits until the page shows either the login form or the 'ready_id' element, and returns True for the login form.
+        """
+        def page_state(driver):
+            for element_id, state in (('password', 'login'), (ready_id, 'ready')):
+                if any(element.is_displayed() for element in driver.find_elements_by_id(element_id)):
+                    return state
+            return None
+
+        return self.waiter.until('login check', page_state) == 'login'
+
+    @traced()
+    def read_wireless_settings(self):
+        """
+        This method reads the current wireless settings from the 'Wireless Settings' page.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   snapshot with the keys 'ssid', 'band', 'channel', 'security' and 'password'.
+                    A value which could not be mapped back to APManager's arguments is None
+
+        Raises:
+            WaitTimeoutError:   if the page did not load in time
+        """
+
+        self.open_wireless_settings()
+        snapshot = dict()
+        snapshot['ssid'] = self.waiter.element('ssid input', 'id', 'ssidInput').get_attribute('value')
+
+        band_item = self._selected_item(4)
+        snapshot['band'] = {1: 2.4, 2: 5}.get(band_item)
+
+        channel_item = self._selected_item(5)
+        channels = [channel for channel, item in channels_map.wifi_channels_map.items()
+                    if item == channel_item and channel_band(channel) == snapshot['band']]
+        snapshot['channel'] = channels[0] if channels else None
+
+        security_item = self._selected_item(8)
+        snapshot['security'] = next((security for security, item in security_types.security_types_map.items() if item == security_item), None)
+
+        snapshot['password'] = self.driver.find_element_by_id('keyInput').get_attribute('value')
+        LOGGER.debug(f'Current wireless settings: {snapshot}')
+        return snapshot
+
+    @traced()
+    def set_ap_params(self, ssid, band, channel, mode, security, password, only_changed=None):
+        if only_changed is None:
+            only_changed = self.only_changed
 
-    def set_ap_params(self, ssid, band, channel, mode, security, password):
         # Navigate to 'Wireless Settings' page
         self.open_wireless_settings()
 
-        # Set ssid
-        time.sleep(1)   # to replace with WaitPageToLoad()
-        self.ssid = ssid
-        self.driver.find_element_by_id('ssidInput').clear()
-        element = self.driver.find_element_by_id('ssidInput')
-        element.send_keys(self.ssid)
+        requested = requested_settings(ssid, band, channel, security, password)
+        if only_changed and self.snapshot is None:
+            self.snapshot = self.read_wireless_settings()
+        changes = changed_settings(self.snapshot if only_changed else None, requested)
 
-        # Set WiFi band
-        time.sleep(1)  # to replace with WaitPageToLoad()
+        self.ssid = ssid
         self.band = band
-        element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[4]/div')
-        element.click()
-        time.sleep(0.5)
-        if self.band == 2.4:
-            element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[4]/div/ul/li[1]')
-        else:
-            element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[4]/div/ul/li[2]')
-        element.click()
-
-        # Set Wi-Fi channel
-        time.sleep(1)  # to replace with WaitPageToLoad()
         self.channel = channel
-        element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[5]/div/span[1]')
-        element.click()
-        time.sleep(1)
-        element = self.driver.find_element_by_xpath(f'//*[@id="wifiSettingsSection"]/div[5]/div/ul/li[{wifi_channels_map[self.channel]}]')
-        element.click()
+        self.security = security
+        self.password = password
+
+        if 'ssid' in changes:
+            self._set_ssid()
+        if 'band' in changes:
+            self._set_band()
+        if 'channel' in changes:
+            self._set_channel()
 
         # Set Wi-Fi mode
-        # time.sleep(1)  # to replace with WaitPageToLoad()
         # self.mode = mode
-        # element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[6]/div/span[1]')
+        # element = self.waiter.element('mode dropdown', 'xpath', f'{WIFI_SETTINGS}/div[6]/div/span[1]', clickable=True)
         # element.click()
 
-        # Set Security type
-        time.sleep(1)  # to replace with WaitPageToLoad()
-        self.security = security
-        self.password = password
-        element = self.driver.find_element_by_xpath('//*[@id="wifiSettingsSection"]/div[8]/div')
+        if 'security' in changes:
+            self._set_security()
+        if 'password' in changes:
+            self._set_password()
+
+        saved = sum(FIELD_INTERACTIONS[field] for field in requested if field not in changes)
+        self.interactions_saved += saved
+        self.pending_changes = bool(changes) or bool(self.pending_changes)
+        if self.snapshot is not None:
+            self.snapshot.update(requested)
+        if only_changed:
+            LOGGER.info(f'Applied changed AP fields: {changes or "none"} (saved {saved} UI interactions)')
+        return changes
+
+    def _set_ssid(self):
+        element = self.waiter.element('ssid input', 'id', 'ssidInput', clickable=True)
+        element.clear()
+        element.send_keys(self.ssid)
+
+    def _set_band(self):
+        element = self.waiter.element('band dropdown', 'xpath', f'{WIFI_SETTINGS}/div[4]/div', clickable=True)
+        element.click()
+        band_item = 1 if self.band == 2.4 else 2
+        element = self.waiter.element('band item', 'xpath', f'{WIFI_SETTINGS}/div[4]/div/ul/li[{band_item}]', clickable=True)
+        element.click()
+
+    def _set_channel(self):
+        element = self.waiter.element('channel dropdown', 'xpath', f'{WIFI_SETTINGS}/div[5]/div/span[1]', clickable=True)
+        element.click()
+        element = self.waiter.element('channel item', 'xpath', f'{WIFI_SETTINGS}/div[5]/div/ul/li[{channels_map.wifi_channels_map[self.channel]}]', clickable=True)
         element.click()
 
-        time.sleep(1)  # to replace with WaitPageToLoad()
+    def _set_security(self):
+        element = self.waiter.element('security dropdown', 'xpath', f'{WIFI_SETTINGS}/div[8]/div', clickable=True)
+        element.click()
         # security_type_map = {'OPEN': 1, 'AUTO': 2, 'AES': 3}
-        element = self.driver.find_element_by_xpath(f'//*[@id="wifiSettingsSection"]/div[8]/div/ul/li[{security_types_map[self.security]}]')
+        element = self.waiter.element('security item', 'xpath', f'{WIFI_SETTINGS}/div[8]/div/ul/li[{security_types.security_types_map[self.security]}]', clickable=True)
         element.click()
-        if self.security != 'OPEN':
-            self.driver.find_element_by_id('keyInput').clear()
-            element = self.driver.find_element_by_id('keyInput')
-            element.send_keys(self.password)
 
-    def save_params(self):
-        element = self.driver.find_element_by_id('wirelessSettingsSave')
+    def _set_password(self):
+        element = self.waiter.element('key input', 'id', 'keyInput', clickable=True)
+        element.clear()
+        element.send_keys(self.password)
+
+    def _selected_item(self, row):
+        """
+        Returns the 1-based index of the selected item of the dropdown in the given 'wifiSettingsSection' row.
+        """
+        selected = self.driver.find_element_by_xpath(f'{WIFI_SETTINGS}/div[{row}]/div/span[1]').get_attribute('textContent').strip()
+        items = self.driver.find_elements_by_xpath(f'{WIFI_SETTINGS}/div[{row}]/div/ul/li')
+        for index, item in enumerate(items, start=1):
+            if item.get_attribute('textContent').strip() == selected:
+                return index
+        return None
+
+    @traced()
+    def save_params(self, retry_login=True):
+        """
+        This method saves the wireless settings and dismisses the reboot dialog.
+
+        Args:
+            retry_login:    log in and apply the settings again once, if the login expired
+
+        Returns:
+            True:   If the settings were saved
+            None:   If no setting changed, so the save was skipped
+            False:  If the AP did not save the settings
+
+        Raises:
+            NA
+        """
+
+        if self.pending_changes is False:
+            self.interactions_saved += SAVE_INTERACTIONS
+            LOGGER.info(f'No AP setting changed, skipping save')
+            return None
+
+        element = self.waiter.element('save button', 'id', 'wirelessSettingsSave', clickable=True)
         element.click()
-        time.sleep(1)
-        # element = self.driver.find_element_by_id('wifiRebootOK')
-        element = self.driver.find_element_by_id('wifiRebootCancel')
+        if self.login_password is not None and self._login_required('wifiRebootCancel'):
+            if not retry_login:
+                LOGGER.error(f'AP asked for a login again right after logging in, settings were not saved')
+                return False
+            # The login expired while the page was open, so the settings have to be applied again
+            LOGGER.info(f'AP login has expired, logging in and applying the settings again')
+            self._submit_login()
+            self._navigate_to_wireless_settings()
+            self.snapshot = None
+            self.set_ap_params(self.ssid, self.band, self.channel, '', self.security, self.password, only_changed=False)
+            return self.save_params(retry_login=False)
+
+        # element = self.waiter.element('reboot dialog', 'id', 'wifiRebootOK', clickable=True)
+        element = self.waiter.element('reboot dialog', 'id', 'wifiRebootCancel', clickable=True)
         element.click()
+        self.pending_changes = False
+        LOGGER.debug(f'AP configuration step timings:\n{self.waiter.report()}')
+        return True
 
 
 if __name__ == '__main__':
     ap = APManager()
     ap.login_ap('admin')
-    time.sleep(1)
     ap.set_ap_params('Hilton_5_OPEN', 5, 44, '', 'AES', '00099999')
-    time.sleep(1)
     ap.save_params()
@@ -0,0 +1,284 @@
+import logging
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from adb_shell import AdbShellError, run_shell_command
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+DeviceIdentity = namedtuple('DeviceIdentity', ['udid', 'state', 'model', 'platform_version', 'probed_at'])
+
+
+def parse_adb_devices(reply):
+    """
+    This function parses the reply of the 'adb devices' / 'adb devices -l' commands.
+
+    Args:
+        reply:  the command output, as a str
+
+    Returns:
+        dict:   {serial: (state, model)} for every listed device. model is '' when
+                the short listing format was used
+
+    Raises:
+        NA
+    """
+
+    devices = dict()
+    for line in reply.splitlines():
+        line = line.strip()
+        if not line or line.startswith('List of devices') or line.startswith('*'):
+            continue
+
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+
+        model = ''
+        for field in fields[2:]:
+            if field.startswith('model:'):
+                model = field[len('model:'):]
+        devices[fields[0]] = (fields[1], model)
+
+    return devices
+
+
+class DeviceCache:
+    """
+    This class caches the identity (UDID, model and platform version) of the attached android devices.
+    A single probe fills all three fields of a device together:
+    adb devices -l                                              (UDID, state and model of all devices)
+    adb -s <udid> shell getprop ro.build.version.release        (platform version of the probed device)
+
+    Entries expire after 'ttl' seconds, and are dropped as soon as a probe no longer lists the
+    device or when invalidate() is called (e.g. after an adb command failed).
+    When a 'shell_pool' is given, the getprop command goes through the pooled 'adb shell' session.
+    When a started DeviceTracker is given, the device list is read from its registry instead of running
+    'adb devices -l', and entries are dropped as soon as the tracker reports that a device was detached
+    or changed state.
+    """
+
+    def __init__(self, ttl=300, shell_pool=None, tracker=None):
+        self.ttl = ttl
+        self.shell_pool = shell_pool
+        self.tracker = tracker
+        self.probe_count = 0
+        self._identities = dict()
+        self._lock = threading.Lock()
+        if tracker is not None:
+            tracker.add_callback(self._on_device_change)
+
+    def get(self, udid=None):
+        """
+        This method returns the identity of a device, probing it only if it is not cached or expired.
+
+        Args:
+            udid:   the device serial. None selects the first attached device
+
+        Returns:
+            DeviceIdentity:     the device identity, or None if the device is not attached
+
+        Raises:
+            NA
+        """
+
+        identity = self.get_cached(udid)
+        if identity is not None:
+            return identity
+        return self._probe(udid)
+
+    def get_cached(self, udid=None):
+        """
+        This method returns a cached, non expired device identity without probing.
+
+        Args:
+            udid:   the device serial. None selects the first cached device
+
+        Returns:
+            DeviceIdentity:     the device identity, or None on a cache miss
+
+        Raises:
+            NA
+        """
+
+        with self._lock:
+            return self._lookup(udid)
+
+    def probe_all(self, devices=None, max_workers=8):
+        """
+        This method fills the cache for a whole device list in one pass: the list is taken as it is (or
+        listed once), and only the platform version of every device without a fresh entry is probed, on up to
+        'max_workers' devices at the same time. E.g. a fan-out seeds the cache from its listing, instead of
+        every device's AndroidManager listing the devices again.
+
+        Args:
+            devices:        {serial: (state, model)} as list_devices() returns it. None lists the devices
+            max_workers:    the number of devices probed at the same time
+
+        Returns:
+            dict:   {serial: DeviceIdentity} of every device in 'device' state
+
+        Raises:
+            NA
+        """
+
+        if devices is None:
+            devices = self.list_devices()
+        identities = dict()
+        missing = []
+        for udid, (state, model) in devices.items():
+            if state != 'device':
+                continue
+            identity = self.get_cached(udid)
+            if identity is not None:
+                identities[udid] = identity
+            else:
+                missing.append(udid)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing)), thread_name_prefix='device-probe') as executor:
+                for identity in executor.map(lambda udid: self._probe_device(udid, devices[udid]), missing):
+                    identities[identity.udid] = identity
+        return identities
+
+    def list_devices(self):
+        """
+        This method lists every attached device by running the next 'adb' command:
+        adb devices -l
+        or from the tracker registry, while the tracker is synced.
+        Devices which are no longer listed are dropped from the cache.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   {serial: (state, model)} for every attached device
+
+        Raises:
+            NA
+        """
+
+        if self.tracker is not None and self.tracker.is_synced():
+            devices = self.tracker.devices()
+        else:
+            reply = self._run(['adb', 'devices', '-l'])
+            if reply is None:
+                return dict()
+            devices = parse_adb_devices(reply)
+        self._drop_disconnected(devices)
+        return devices
+
+    def serials(self):
+        """
+        This method returns the serials of all cached devices which are in 'device' state.
+
+        Args:
+            NA
+
+        Returns:
+            list:   device serials
+
+        Raises:
+            NA
+        """
+
+        with self._lock:
+            return [identity.udid for identity in self._identities.values() if self._is_fresh(identity)]
+
+    def invalidate(self, udid=None):
+        """
+        This method drops a cached device identity, or the whole cache if 'udid' is None.
+
+        Args:
+            udid:   the device serial
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        with self._lock:
+            if udid is None:
+                self._identities.clear()
+            else:
+                self._identities.pop(udid, None)
+        LOGGER.debug(f'Invalidated device cache entry: {udid or "all"}')
+
+    def _is_fresh(self, identity):
+        return identity.state == 'device' and time.monotonic() - identity.probed_at < self.ttl
+
+    def _lookup(self, udid):
+        if udid is None:
+            candidates = list(self._identities.values())
+        else:
+            candidates = [self._identities[udid]] if udid in self._identities else []
+
+        for identity in candidates:
+            if self._is_fresh(identity):
+                return identity
+        return None
+
+    def _probe(self, udid):
+        devices = self.list_devices()
+
+        if udid is None:
+            udid = next((serial for serial, (state, model) in devices.items() if state == 'device'), None)
+        if udid is None or udid not in devices:
+            LOGGER.error(f'Device {udid or ""} is not attached. Attached devices: {devices}')
+            return None
+
+        return self._probe_device(udid, devices[udid])
+
+    def _probe_device(self, udid, listing):
+        state, model = listing
+        platform_version = ''
+        if state == 'device':
+            reply = self._run_shell(udid, 'getprop ro.build.version.release')
+            if reply is not None:
+                platform_version = reply.strip()
+
+        identity = DeviceIdentity(udid, state, model, platform_version, time.monotonic())
+        with self._lock:
+            self._identities[udid] = identity
+        LOGGER.info(f'Probed device UDID: {udid}, Model: {model}, OS version: Android {platform_version}')
+        return identity
+
+    def _drop_disconnected(self, devices):
+        with self._lock:
+            for serial in list(self._identities):
+                if serial not in devices:
+                    LOGGER.info(f'Device {serial} was disconnected')
+                    del self._identities[serial]
+
+    def _on_device_change(self, serial, old_state, new_state, model):
+        with self._lock:
+            self._identities.pop(serial, None)
+
+    def _run(self, args):
+        self.probe_count += 1
+        try:
+            with span(' '.join(args[:2]), args[0], args=' '.join(args[2:])):
+                reply = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
+            LOGGER.debug(f'{reply}')
+            return reply.decode('utf-8')
+        except (OSError, subprocess.CalledProcessError) as error:
+            LOGGER.error(f'Got exception while trying to run "{" ".join(args)}" command: {error}')
+            return None
+
+    def _run_shell(self, udid, command):
+        self.probe_count += 1
+        try:
+            reply = run_shell_command(udid, command, self.shell_pool)
+            LOGGER.debug(f'{reply}')
+            return reply.decode('utf-8')
+        except (OSError, subprocess.CalledProcessError, AdbShellError) as error:
+            LOGGER.error(f'Got exception while trying to run "adb -s {udid} shell {command}" command: {error}')
+            return None
@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from android_device_manager import AndroidManager
+from device_cache import DeviceCache
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+DeviceResult = namedtuple('DeviceResult', ['udid', 'result', 'error', 'duration'])
+
+
+class FanOutReport:
+    """
+    This class holds the per-device results of a single DeviceFanOut.run() call.
+    """
+
+    def __init__(self, operation, results, wall_time):
+        self.operation = operation
+        self.results = results
+        self.wall_time = wall_time
+
+    @property
+    def succeeded(self):
+        return {udid: result for udid, result in self.results.items() if result.error is None}
+
+    @property
+    def failed(self):
+        return {udid: result for udid, result in self.results.items() if result.error is not None}
+
+    @property
+    def throughput(self):
+        """
+        Completed device operations per second of wall time.
+        """
+        return len(self.results) / self.wall_time if self.wall_time else 0.0
+
+    def __str__(self):
+        return (f'{self.operation}: {len(self.succeeded)}/{len(self.results)} devices succeeded '
+                f'in {self.wall_time:.2f}s ({self.throughput:.2f} devices/s)')
+
+
+class DeviceFanOut:
+    """
+    This class runs an AndroidManager operation on every attached android device concurrently.
+    The devices are listed once through the shared DeviceCache, which is seeded with the identity of every
+    listed device (DeviceCache.probe_all), so the per-device AndroidManagers do not list the devices again.
+    Every device gets its own AndroidManager, and the operations run on a bounded thread pool. For example:
+    fan_out = DeviceFanOut(max_workers=8)
+    report = fan_out.run('turn_wifi_off')
+    report = fan_out.run('browse_to', 'http://www.bbc.com')
+    """
+
+    def __init__(self, device_cache=None, shell_pool=None, max_workers=8, manager_factory=AndroidManager):
+        self.shell_pool = shell_pool
+        self.device_cache = device_cache if device_cache is not None else DeviceCache(shell_pool=shell_pool)
+        self.max_workers = max_workers
+        self.manager_factory = manager_factory
+        self.managers = dict()
+
+    def attached_devices(self):
+        """
+        This method returns the serials of all attached devices which are in 'device' state, and caches
+        the identity of every one of them.
+
+        Args:
+            NA
+
+        Returns:
+            list:   device serials
+
+        Raises:
+            NA
+        """
+
+        devices = self.device_cache.list_devices()
+        for udid in list(self.managers):
+            if udid not in devices:
+                del self.managers[udid]
+        return list(self.device_cache.probe_all(devices, max_workers=self.max_workers))
+
+    def manager(self, udid):
+        if udid not in self.managers:
+            self.managers[udid] = self.manager_factory(udid=udid, device_cache=self.device_cache, shell_pool=self.shell_pool)
+        return self.managers[udid]
+
+    def run(self, operation, *args, udids=None, **kwargs):
+        """
+        This method runs an operation on all devices concurrently and collects the per-device results.
+
+        Args:
+            operation:  an AndroidManager method name (e.g. 'turn_wifi_on'), or a callable which gets
+                        the device's AndroidManager as its first argument
+            args:       positional arguments for the operation
+            udids:      the devices to run on. None runs on all attached devices
+            kwargs:     keyword arguments for the operation
+
+        Returns:
+            FanOutReport:   results and errors per device, and the aggregate throughput
+
+        Raises:
+            NA
+        """
+
+        if udids is None:
+            udids = self.attached_devices()
+        name = operation if isinstance(operation, str) else getattr(operation, '__name__', repr(operation))
+        managers = [self.manager(udid) for udid in udids]
+
+        start = time.perf_counter()
+        results = dict()
+        if managers:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(managers)), thread_name_prefix='fan-out') as executor:
+                futures = [executor.submit(self._run_one, manager, operation, args, kwargs) for manager in managers]
+                for future in futures:
+                    result = future.result()
+                    results[result.udid] = result
+
+        report = FanOutReport(name, results, time.perf_counter() - start)
+        LOGGER.info(f'{report}')
+        for udid, result in report.failed.items():
+            LOGGER.error(f'{name} failed on {udid}: {result.error!r}')
+        return report
+
+    @staticmethod
+    def _run_one(manager, operation, args, kwargs):
+        start = time.perf_counter()
+        try:
+            if isinstance(operation, str):
+                result = getattr(manager, operation)(*args, **kwargs)
+            else:
+                result = operation(manager, *args, **kwargs)
+            error = None
+        except Exception as exception:
+            result = None
+            error = exception
+        return DeviceResult(manager.target_udid, result, error, time.perf_counter() - start)
@@ -0,0 +1,207 @@
+import logging
+import subprocess
+import threading
+import time
+from device_cache import parse_adb_devices
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+class TrackDevicesParser:
+    """
+    This class parses the 'adb track-devices' stream incrementally. The adb server sends the complete device
+    list on every change, as a message of 4 hex digits (the payload length) followed by the payload, which has
+    the 'adb devices' ('adb devices -l' with '-l') line format.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """
+        This method adds a chunk of the stream and returns the device lists it completed.
+
+        Args:
+            data:   bytes read from the stream. A message may be split over several chunks
+
+        Returns:
+            list:   a {serial: (state, model)} dict per completed message
+
+        Raises:
+            ValueError:     if the stream is not a track-devices stream
+        """
+
+        self._buffer.extend(data)
+        snapshots = []
+        while len(self._buffer) >= 4:
+            length = int(self._buffer[:4], 16)
+            if len(self._buffer) < 4 + length:
+                break
+            payload = bytes(self._buffer[4:4 + length]).decode('utf-8', errors='replace')
+            del self._buffer[:4 + length]
+            snapshots.append(parse_adb_devices(payload))
+        return snapshots
+
+
+class DeviceTracker:
+    """
+    This class keeps a live registry of the attached android devices, {serial: (state, model)}, from a single
+    'adb track-devices' stream which a background thread holds open, instead of polling 'adb devices'.
+    Callbacks registered with add_callback() are called on every hot-plug event as
+    callback(serial, old_state, new_state, model), with old_state None when a device was attached and
+    new_state None when it was detached. If the stream ends (e.g. the adb server restarted) it is reopened
+    after 'restart_delay' seconds, and the first device list it sends is diffed against the registry.
+    """
+
+    def __init__(self, long_format=True, restart_delay=1.0):
+        self.long_format = long_format
+        self.restart_delay = restart_delay
+        self.updates = 0
+        self._devices = dict()
+        self._callbacks = []
+        self._synced = False
+        self._stopped = threading.Event()
+        self._changed = threading.Condition()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        """
+        This method starts the tracker thread, and returns once the first device list arrived (or after 5 seconds).
+        """
+        if self._thread is not None:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._track, name='adb-track-devices', daemon=True)
+        self._thread.start()
+        with self._changed:
+            self._changed.wait_for(lambda: self._synced, timeout=5)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._changed:
+            self._synced = False
+
+    def is_synced(self):
+        """
+        Returns True while the stream is open and the registry reflects it.
+        """
+        return self._synced
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        self._callbacks.remove(callback)
+
+    def devices(self):
+        """
+        This method returns the registry, without running any adb command.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   {serial: (state, model)} for every attached device
+
+        Raises:
+            NA
+        """
+
+        with self._changed:
+            return dict(self._devices)
+
+    def wait_for(self, serial, state='device', timeout=30):
+        """
+        This method blocks until a device reaches 'state' (None waits until it is detached).
+
+        Args:
+            serial:     the device serial
+            state:      the awaited state, e.g. 'device'
+            timeout:    seconds to wait
+
+        Returns:
+            True:   If the device reached the state
+            False:  If it did not within 'timeout'
+
+        Raises:
+            NA
+        """
+
+        def reached():
+            current = self._devices.get(serial)
+            return (current is None) if state is None else (current is not None and current[0] == state)
+
+        with self._changed:
+            return self._changed.wait_for(reached, timeout=timeout)
+
+    def _track(self):
+        args = ['adb', 'track-devices'] + (['-l'] if self.long_format else [])
+        while not self._stopped.is_set():
+            parser = TrackDevicesParser()
+            try:
+                self._process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                                 stderr=subprocess.DEVNULL, bufsize=0)
+                LOGGER.debug(f'Started "{" ".join(args)}"')
+                while True:
+                    data = self._process.stdout.read(4096)
+                    if not data:
+                        break
+                    for snapshot in parser.feed(data):
+                        self._apply(snapshot)
+            except (OSError, ValueError) as error:
+                LOGGER.error(f'Got exception while tracking devices: {error!r}')
+            finally:
+                if self._process is not None:
+                    if self._process.poll() is None:
+                        self._process.kill()
+                    self._process.wait()
+                    self._process.stdout.close()
+                with self._changed:
+                    self._synced = False
+                    self._changed.notify_all()
+
+            if not self._stopped.is_set():
+                LOGGER.info(f'"{" ".join(args)}" stream ended, reopening it in {self.restart_delay}s')
+                self._stopped.wait(self.restart_delay)
+
+    def _apply(self, snapshot):
+        with self._changed:
+            previous = self._devices
+            self._devices = snapshot
+            self._synced = True
+            self.updates += 1
+            self._changed.notify_all()
+
+        for serial in previous.keys() | snapshot.keys():
+            old_state = previous[serial][0] if serial in previous else None
+            new_state, model = snapshot[serial] if serial in snapshot else (None, previous[serial][1])
+            if old_state == new_state:
+                continue
+            LOGGER.info(f'Device {serial} ({model or "unknown model"}): {old_state or "detached"} -> {new_state or "detached"}')
+            for callback in list(self._callbacks):
+                try:
+                    callback(serial, old_state, new_state, model)
+                except Exception as error:
+                    LOGGER.error(f'Device callback {callback!r} failed on {serial}: {error!r}')
+
+
+if __name__ == '__main__':
+    from logger import init_logger
+    init_logger()
+    tracker = DeviceTracker().start()
+    print(tracker.devices())
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        tracker.stop()
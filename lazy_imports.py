@@ -0,0 +1,32 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    This function returns a module which is executed only when one of its attributes is first used, so heavy
+    dependencies (selenium, Appium) cost nothing to modules which import them but never use them.
+    The parent packages of 'name' are imported right away, so keep 'name' to a module right below a light
+    package, e.g. 'selenium.webdriver'.
+
+    Args:
+        name:   the module name
+
+    Returns:
+        module: the module, loaded lazily if it was not imported yet
+
+    Raises:
+        ModuleNotFoundError:    if the module is not installed
+    """
+
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,453 @@
+import argparse
+import math
+import mmap
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+
+Operation = namedtuple('Operation', ['name', 'pattern', 'failure', 'until_next', 'unit'], defaults=(None, False, None))
+Operation.__doc__ = '''
+An operation recognised in the log messages. 'pattern' matches the message (from its start) of a done
+operation, and 'failure' the message of a failed one. When 'pattern' has a group named 'value', it holds
+the duration, in 'unit' seconds. Otherwise, with 'until_next' set, the operation lasts until the next line
+of the same logger, e.g. 'Navigating chrome to' lasts until the page was loaded. Both patterns are bytes.
+'''
+
+# The messages logged by the managers, in the current and in the older releases
+OPERATIONS = [
+    Operation('wifi on', rb'Turned Wi-Fi on(?: in (?P<value>[\d.]+)s)?',
+              rb"Got exception while trying to (?:turn on|enable) device's wi-fi|Wi-Fi of \S+ did not turn on", unit=1),
+    Operation('wifi off', rb'Turned Wi-Fi off(?: in (?P<value>[\d.]+)s)?',
+              rb"Got exception while trying to (?:turn off|disable) device's wi-fi|Wi-Fi of \S+ did not turn off", unit=1),
+    Operation('navigate', rb'Navigating chrome to', rb'Was unable to +run chrome', until_next=True),
+    Operation('page load', rb'Loaded \S+ in (?P<value>[\d.]+) ms', rb'Was unable to measure the navigation', unit=0.001),
+    Operation('launch settings', rb'Launching settings', until_next=True),
+    Operation('ap save', rb'Saved AP wireless settings', rb'AP rejected the wireless settings|AP asked for a login again'),
+    Operation('ap apply', rb'Applied changed AP fields'),
+]
+
+# A line of logger.LOG_FORMAT:
+# '%(asctime)s - %(levelname)-12s - %(name)-20s - %(filename)-24s - %(lineno)-4d - %(message)s'
+# Lines which do not match (tracebacks, the rest of multi-line messages) are skipped
+LINE_PATTERN = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d):(\d\d),(\d{3}) - ([A-Z]+) +- (\S+) +- \S+ +- \d+ +- (.*?)\r?$', re.MULTILINE)
+ERROR_LEVELS = {b'ERROR', b'CRITICAL'}
+# The failure of an error line which matches no failure pattern
+ERROR_LINE = -1
+
+# Durations are counted in log-spaced buckets from 1 ms, 20 per decade (about 12% wide)
+BUCKETS_PER_DECADE = 20
+BUCKETS_START = 0.001
+BUCKETS = 8 * BUCKETS_PER_DECADE + 2
+
+CHUNK_SIZE = 1 << 22
+
+
+class OperationStats:
+    """
+    This class sums up the instances of an operation in constant memory: the count, the failures, the
+    duration total / min / max, and a histogram of the durations for the approximate percentiles.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.timed = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0] * BUCKETS
+
+    def add(self, duration=None, failed=False):
+        self.count += 1
+        self.errors += failed
+        if duration is None:
+            return
+        self.timed += 1
+        self.total += duration
+        self.minimum = duration if self.minimum is None else min(self.minimum, duration)
+        self.maximum = duration if self.maximum is None else max(self.maximum, duration)
+        if duration < BUCKETS_START:
+            index = 0
+        else:
+            index = min(int(math.log10(duration / BUCKETS_START) * BUCKETS_PER_DECADE) + 1, BUCKETS - 1)
+        self.buckets[index] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.timed += other.timed
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+
+    @property
+    def error_rate(self):
+        return self.errors / self.count if self.count else 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.timed if self.timed else None
+
+    def percentile(self, percent):
+        """
+        Returns the approximate 'percent' percentile of the durations: the geometric middle of its histogram
+        bucket, within the measured min and max.
+        """
+        if not self.timed:
+            return None
+        rank = (self.timed - 1) * percent / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen > rank:
+                break
+        if index == 0:
+            value = BUCKETS_START
+        else:
+            value = BUCKETS_START * 10 ** ((index - 0.5) / BUCKETS_PER_DECADE)
+        return min(max(value, self.minimum), self.maximum)
+
+
+class LogAnalysis:
+    """
+    This class analyses init_logger text logs incrementally: feed() takes the log as consecutive byte blocks
+    (whole lines), and only running totals are kept, so the memory does not grow with the log size.
+    It counts the lines per level and the instances, failures and durations of every Operation. An ERROR line
+    which matches no failure pattern fails the 'until_next' operation its logger is running, otherwise it is
+    counted as an error of the logger. The failure message of a running operation fails that same instance.
+    The analyses of consecutive parts of a log, run in parallel, are combined with merge().
+    """
+
+    def __init__(self, operations=None):
+        self.operations = list(operations or OPERATIONS)
+        self.lines = 0
+        self.levels = dict()
+        self.stats = {operation.name: OperationStats() for operation in self.operations}
+        self.logger_errors = dict()
+        # Per logger: the running 'until_next' operation (index, start), and the time and failure (an operation
+        # index, ERROR_LINE or None) of the first line seen
+        self.pending = dict()
+        self.heads = dict()
+        self.first_time = None
+        self.last_time = None
+        self._event_pattern = None
+        self._minute = (None, None)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_event_pattern'] = None
+        return state
+
+    def _events(self):
+        if self._event_pattern is None:
+            alternatives = []
+            for index, operation in enumerate(self.operations):
+                alternatives.append(b'(?P<e%d>%s)' % (index, operation.pattern.replace(b'(?P<value>', b'(?:')))
+                if operation.failure is not None:
+                    alternatives.append(b'(?P<f%d>%s)' % (index, operation.failure))
+            self._event_pattern = re.compile(b'|'.join(alternatives))
+        return self._event_pattern
+
+    def _timestamp(self, minute, second, millisecond):
+        # Lines are in time order, so one cached minute saves nearly every strptime call
+        if self._minute[0] != minute:
+            self._minute = (minute, time.mktime(time.strptime(minute.decode('ascii'), '%Y-%m-%d %H:%M')))
+        return self._minute[1] + int(second) + int(millisecond) / 1000
+
+    def feed(self, data, start=0, end=None):
+        """
+        This method analyses the next block of the log.
+
+        Args:
+            data:   bytes, or an mmap of the log file
+            start:  the offset of the block, at the start of a line
+            end:    the offset after the block, at the start of a line (or the end of the data)
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        events = self._events()
+        operations = self.operations
+        stats = [self.stats[operation.name] for operation in operations]
+        pending = self.pending
+        heads = self.heads
+        levels = self.levels
+        timestamp = None
+
+        for match in LINE_PATTERN.finditer(data, start, len(data) if end is None else end):
+            minute, second, millisecond, level, name, message = match.groups()
+            self.lines += 1
+            levels[level] = levels.get(level, 0) + 1
+            failed = level in ERROR_LEVELS
+            event = events.match(message)
+            running = pending.get(name)
+            if event is None and running is None and not failed and name in heads:
+                continue
+
+            kind, index = (event.lastgroup[0], int(event.lastgroup[1:])) if event is not None else (None, None)
+            failure = index if kind == 'f' else ERROR_LINE if failed and event is None else None
+            timestamp = self._timestamp(minute, second, millisecond)
+            if name not in heads:
+                heads[name] = (timestamp, failure)
+            if self.first_time is None:
+                self.first_time = timestamp
+
+            if running is not None:
+                # Any line of the logger ends its running operation. An error line, or the failure message of
+                # the operation itself, fails it
+                del pending[name]
+                if failure is not None and failure in (ERROR_LINE, running[0]):
+                    stats[running[0]].add(timestamp - running[1], True)
+                    continue
+                stats[running[0]].add(timestamp - running[1])
+
+            if event is None:
+                if failed:
+                    self.logger_errors[name] = self.logger_errors.get(name, 0) + 1
+                continue
+
+            operation = operations[index]
+            if kind == 'f':
+                stats[index].add(failed=True)
+            elif operation.unit is not None:
+                value = re.match(operation.pattern, message)
+                duration = value.group('value') if value is not None else None
+                stats[index].add(float(duration) * operation.unit if duration else None)
+            elif operation.until_next:
+                pending[name] = (index, timestamp)
+            else:
+                stats[index].add()
+
+        if timestamp is not None:
+            self.last_time = timestamp
+
+    def merge(self, other):
+        """
+        This method adds the analysis of the part of the log which follows this one: the operations still
+        running at the end of this part are ended by the first line of their logger in 'other'.
+
+        Args:
+            other:  LogAnalysis of the next part of the log
+
+        Returns:
+            LogAnalysis:    self
+
+        Raises:
+            NA
+        """
+
+        for name, (head_time, head_failure) in other.heads.items():
+            running = self.pending.pop(name, None)
+            if running is not None:
+                operation = self.operations[running[0]].name
+                failed = head_failure is not None and head_failure in (ERROR_LINE, running[0])
+                self.stats[operation].add(head_time - running[1], failed)
+                # 'other' counted the failure line on its own, as it did not know the running operation
+                if head_failure == ERROR_LINE:
+                    other.logger_errors[name] -= 1
+                elif failed:
+                    other.stats[operation].count -= 1
+                    other.stats[operation].errors -= 1
+            self.heads.setdefault(name, (head_time, head_failure))
+        self.pending.update(other.pending)
+
+        self.lines += other.lines
+        for level, count in other.levels.items():
+            self.levels[level] = self.levels.get(level, 0) + count
+        for name, stats in other.stats.items():
+            self.stats.setdefault(name, OperationStats()).merge(stats)
+        for name, count in other.logger_errors.items():
+            self.logger_errors[name] = self.logger_errors.get(name, 0) + count
+        if self.first_time is None:
+            self.first_time = other.first_time
+        if other.last_time is not None:
+            self.last_time = other.last_time
+        return self
+
+    def finish(self):
+        """
+        This method counts the operations still running at the end of the log, without a duration.
+        """
+        for index, _ in self.pending.values():
+            self.stats[self.operations[index].name].add()
+        self.pending = dict()
+        return self
+
+    def report(self):
+        """
+        This method returns the totals of the analysis.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   'lines', 'levels' {level: count}, 'logger_errors' {logger: count}, 'span' (seconds between the
+                    first and the last timed line) and 'operations' {operation: {'count', 'errors', 'error_rate',
+                    'mean', 'p50', 'p90', 'p99', 'max'}}, durations in seconds
+
+        Raises:
+            NA
+        """
+
+        operations = dict()
+        for name, stats in self.stats.items():
+            operations[name] = {'count': stats.count, 'errors': stats.errors, 'error_rate': stats.error_rate,
+                                'mean': stats.mean, 'p50': stats.percentile(50), 'p90': stats.percentile(90),
+                                'p99': stats.percentile(99), 'max': stats.maximum}
+        return {'lines': self.lines,
+                'levels': {level.decode('ascii'): count for level, count in self.levels.items()},
+                'logger_errors': {name.decode('utf-8', 'replace'): count for name, count in self.logger_errors.items() if count},
+                'span': self.last_time - self.first_time if self.first_time is not None else 0.0,
+                'operations': operations}
+
+    def __str__(self):
+        report = self.report()
+
+        def ms(value):
+            return f'{value * 1000:>9.1f}' if value is not None else f'{"-":>9}'
+
+        lines = [f'{"operation":<18} {"count":>8} {"errors":>7} {"error %":>8} {"mean [ms]":>9} {"p50 [ms]":>9} {"p90 [ms]":>9} {"p99 [ms]":>9}']
+        for name, row in report['operations'].items():
+            lines.append(f'{name:<18} {row["count"]:>8} {row["errors"]:>7} {row["error_rate"] * 100:>8.2f} '
+                         f'{ms(row["mean"])} {ms(row["p50"])} {ms(row["p90"])} {ms(row["p99"])}')
+        lines.append(f'{report["lines"]} lines over {report["span"] / 3600:.1f} hours, levels: '
+                     + ', '.join(f'{level} {count}' for level, count in sorted(report['levels'].items())))
+        for name, count in sorted(report['logger_errors'].items()):
+            lines.append(f'{count} other errors of {name}')
+        return '\n'.join(lines)
+
+
+def iter_chunks(stream, chunk_size=CHUNK_SIZE):
+    """
+    This function reads a binary stream in blocks of about 'chunk_size' bytes which end at a line end, so
+    logs which cannot be memory-mapped (pipes, compressed files) are analysed in constant memory as well.
+
+    Args:
+        stream:         a binary file object
+        chunk_size:     the block size
+
+    Returns:
+        generator:  the blocks, bytes
+
+    Raises:
+        NA
+    """
+
+    rest = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        if not cut:
+            rest = block
+            continue
+        rest = block[cut:]
+        yield block[:cut]
+    if rest:
+        yield rest
+
+
+def analyse_stream(stream, operations=None, chunk_size=CHUNK_SIZE):
+    analysis = LogAnalysis(operations)
+    for block in iter_chunks(stream, chunk_size):
+        analysis.feed(block)
+    return analysis.finish()
+
+
+def analyse_range(path, start=0, end=None, operations=None):
+    """
+    This function analyses the lines of a log file between two offsets, through a read-only mmap, so the
+    pages are read by the OS on demand and never copied into Python objects.
+
+    Args:
+        path:           the log file
+        start:          the offset of the first line
+        end:            the offset after the last line, the end of the file by default
+        operations:     the Operations to recognise, OPERATIONS by default
+
+    Returns:
+        LogAnalysis:    the analysis of the range, not finished (see LogAnalysis.merge())
+
+    Raises:
+        NA
+    """
+
+    analysis = LogAnalysis(operations)
+    with open(path, 'rb') as log_file:
+        if not os.fstat(log_file.fileno()).st_size:
+            return analysis
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            analysis.feed(data, start, end)
+    return analysis
+
+
+def split_ranges(path, parts):
+    """
+    This function splits a file into about equal (start, end) byte ranges which begin at the start of a line.
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as log_file:
+        for part in range(1, parts):
+            log_file.seek(max(size * part // parts, offsets[-1]))
+            if log_file.tell():
+                log_file.readline()
+            offset = min(log_file.tell(), size)
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def analyse_file(path, processes=1, operations=None):
+    """
+    This function analyses an init_logger text log. With several processes, the file is split on line
+    boundaries, every part is analysed by its own process, and the part analyses are merged in file order.
+
+    Args:
+        path:           the log file
+        processes:      the number of processes, 1 analyses the file in this process
+        operations:     the Operations to recognise, OPERATIONS by default
+
+    Returns:
+        LogAnalysis:    the finished analysis of the whole file
+
+    Raises:
+        NA
+    """
+
+    if processes <= 1:
+        return analyse_range(path, operations=operations).finish()
+
+    ranges = split_ranges(path, processes)
+    with ProcessPoolExecutor(max_workers=min(processes, len(ranges))) as executor:
+        parts = list(executor.map(analyse_range, [path] * len(ranges), *zip(*ranges), [operations] * len(ranges)))
+    analysis = parts[0]
+    for part in parts[1:]:
+        analysis.merge(part)
+    return analysis.finish()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Operation durations and error rates of init_logger logs')
+    parser.add_argument('paths', nargs='+', help='log files, in time order')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    total = None
+    for log_path in args.paths:
+        file_analysis = analyse_file(log_path, args.processes)
+        total = file_analysis if total is None else total.merge(file_analysis)
+    print(total)
@@ -1,13 +1,106 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
 from Configuration.auto_configuration import Logger
 
 
 LOG_FILE_PATH = Logger.LOG_FILE_PATH
 LOG_MODE = Logger.LOG_FILE_MODE
+LOG_FORMAT = '%(asctime)s - %(levelname)-12s - %(name)-20s - %(filename)-24s - %(lineno)-4d - %(message)s'
 
+_listener = None
+_queue_handler = None
 
-def init_logger(*args):
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats every record as a single JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record), 'level': record.levelname, 'name': record.name,
+                 'filename': record.filename, 'lineno': record.lineno, 'thread': record.threadName,
+                 'message': record.getMessage()}
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry)
+
+
+def build_handlers(log_file_path, mode='a', json_lines=False, max_bytes=0, backup_count=5, when=None, console=True):
+    """
+    This function creates the file and console handlers of the logging pipeline.
+
+    Args:
+        log_file_path:  the log file
+        mode:           the log file open mode
+        json_lines:     write the log file as JSON lines instead of the text format
+        max_bytes:      rotate the log file when it reaches this size. 0 disables size based rotation
+        backup_count:   number of rotated log files to keep
+        when:           rotate the log file on time, e.g. 'midnight' or 'H' (see TimedRotatingFileHandler).
+                        None disables time based rotation
+        console:        add a console handler as well
+
+    Returns:
+        list:   the handlers
+
+    Raises:
+        NA
+    """
+
+    if max_bytes:
+        fileHandler = logging.handlers.RotatingFileHandler(log_file_path, mode=mode, maxBytes=max_bytes, backupCount=backup_count)
+    elif when:
+        fileHandler = logging.handlers.TimedRotatingFileHandler(log_file_path, when=when, backupCount=backup_count)
+    else:
+        fileHandler = logging.FileHandler(log_file_path, mode=mode)
+    fileHandler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    handlers = [fileHandler]
+
+    if console:
+        consoleHandler = logging.StreamHandler()
+        consoleHandler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(consoleHandler)
+
+    return handlers
+
+
+def install_handlers(logger, handlers, queue_mode=False):
+    """
+    This function attaches the handlers to a logger. In queue mode the logger only gets a QueueHandler,
+    and a background QueueListener thread owns the handlers, so the logging threads never do disk or
+    console I/O and never wait for the handlers' locks.
+
+    Args:
+        logger:         the logger, e.g. the root logger
+        handlers:       the handlers, see build_handlers()
+        queue_mode:     attach the handlers behind a queue
+
+    Returns:
+        QueueListener:  the started listener in queue mode, None otherwise
+
+    Raises:
+        NA
+    """
+
+    if not queue_mode:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return None
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
+
+
+def init_logger(*args, queue_mode=False, json_lines=False, max_bytes=0, backup_count=5, when=None):
+    global _listener, _queue_handler
 
     if not os.path.exists(Logger.APPLICATION_MAIN_PATH):
         os.makedirs(Logger.APPLICATION_MAIN_PATH)
@@ -17,15 +110,28 @@ def init_logger(*args):
         os.makedirs(log_files_dir)
         os.mknod(LOG_FILE_PATH)
 
-
-
-    logFormatter = logging.Formatter('%(asctime)s - %(levelname)-12s - %(name)-20s - %(filename)-24s - %(lineno)-4d - %(message)s')
     rootLogger = logging.getLogger()
+    handlers = build_handlers(LOG_FILE_PATH, LOG_MODE, json_lines, max_bytes, backup_count, when)
+    listener = install_handlers(rootLogger, handlers, queue_mode)
+    if listener is not None:
+        queue_handler = next(handler for handler in rootLogger.handlers
+                             if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is listener.queue)
+        stop_logger()
+        _listener = listener
+        _queue_handler = queue_handler
+        atexit.register(stop_logger)
+
 
-    fileHandler = logging.FileHandler(LOG_FILE_PATH, mode=LOG_MODE)
-    fileHandler.setFormatter(logFormatter)
-    rootLogger.addHandler(fileHandler)
+def stop_logger():
+    """
+    This function flushes the queued records, stops the background listener of the queue mode and removes
+    its QueueHandler from the root logger.
+    """
+    global _listener, _queue_handler
 
-    consoleHandler = logging.StreamHandler()
-    consoleHandler.setFormatter(logFormatter)
-    rootLogger.addHandler(consoleHandler)
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
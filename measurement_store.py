@@ -0,0 +1,345 @@
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+import numpy as np
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+Measurement = namedtuple('Measurement', ['timestamp', 'device', 'band', 'channel', 'security', 'step', 'duration', 'error'],
+                         defaults=('', 0.0, 0, '', '', 0.0, False))
+Measurement.__doc__ = '''
+A timed campaign step: 'timestamp' is time.time() seconds, 'device' the device serial (or host name),
+'band' / 'channel' / 'security' the AP configuration under test, 'step' e.g. 'page load' or 'wifi on',
+'duration' seconds and 'error' whether the step failed.
+'''
+
+# One packed record per measurement. The string fields hold codes into the store's dictionaries
+RECORD_DTYPE = np.dtype([('timestamp', '<f8'), ('device', '<u2'), ('band', '<f4'), ('channel', '<u2'),
+                         ('security', '<u2'), ('step', '<u2'), ('duration', '<f8'), ('error', 'u1')])
+STRING_FIELDS = ('device', 'security', 'step')
+RECORDS_FILE = 'records.bin'
+DICTIONARIES_FILE = 'dictionaries.json'
+SCHEMA_VERSION = 1
+
+
+class MeasurementStore:
+    """
+    This class stores campaign measurements as fixed-size binary records in a single file, which is appended
+    to and read back as a memory-mapped NumPy array, so the aggregations run vectorised over the columns
+    without creating a Python object per record.
+    The string fields (device, security, step) are dictionary encoded: the records hold small integer codes,
+    and the distinct strings are kept in a JSON file next to the records. A store is a directory:
+    <path>/records.bin          the records, RECORD_DTYPE
+    <path>/dictionaries.json    the string dictionaries
+    Appended records are buffered and written every 'flush_every' records, on flush() and on close().
+    Only one process may append to a store at a time, any number may read it. A record cut short by an
+    interrupted write is dropped by the first flush() of the next writer; readers leave the file as it is.
+    """
+
+    def __init__(self, path, flush_every=4096):
+        self.path = path
+        self.flush_every = flush_every
+        self.records_path = os.path.join(path, RECORDS_FILE)
+        self.dictionaries_path = os.path.join(path, DICTIONARIES_FILE)
+        self.dictionaries = {field: [] for field in STRING_FIELDS}
+        self._codes = {field: dict() for field in STRING_FIELDS}
+        self._buffer = []
+        self._dictionaries_changed = False
+        self._tail_checked = False
+        os.makedirs(path, exist_ok=True)
+        self._load_dictionaries()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self._stored_count() + len(self._buffer)
+
+    def append(self, measurement):
+        """
+        This method appends a measurement to the store.
+
+        Args:
+            measurement:    Measurement. A None timestamp is replaced by the current time
+
+        Returns:
+            NA
+
+        Raises:
+            ValueError:     if a string field has more distinct values than its code type can hold
+        """
+
+        timestamp = time.time() if measurement.timestamp is None else measurement.timestamp
+        self._buffer.append((timestamp, self._encode('device', measurement.device), measurement.band or 0.0,
+                             measurement.channel or 0, self._encode('security', measurement.security),
+                             self._encode('step', measurement.step), measurement.duration, bool(measurement.error)))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def extend(self, measurements):
+        for measurement in measurements:
+            self.append(measurement)
+
+    def flush(self):
+        """
+        This method writes the buffered records. The dictionaries are written first, so every code in the
+        records file always has its string.
+
+        Args:
+            NA
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        if self._dictionaries_changed:
+            temporary_path = f'{self.dictionaries_path}.tmp'
+            with open(temporary_path, 'w') as dictionaries_file:
+                json.dump({'version': SCHEMA_VERSION, 'dtype': RECORD_DTYPE.descr, 'dictionaries': self.dictionaries},
+                          dictionaries_file)
+            os.replace(temporary_path, self.dictionaries_path)
+            self._dictionaries_changed = False
+        if self._buffer:
+            if not self._tail_checked:
+                self._truncate_partial_record()
+                self._tail_checked = True
+            records = np.array(self._buffer, dtype=RECORD_DTYPE)
+            with open(self.records_path, 'ab') as records_file:
+                records.tofile(records_file)
+            LOGGER.debug(f'Wrote {len(records)} measurements to {self.records_path}')
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def records(self):
+        """
+        This method returns the written records (buffered ones are not included until flush()) as a read-only
+        memory-mapped array, so only the pages of the columns which are actually used get read.
+
+        Args:
+            NA
+
+        Returns:
+            numpy.ndarray:  structured array of RECORD_DTYPE
+
+        Raises:
+            NA
+        """
+
+        count = self._stored_count()
+        if not count:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        # A record cut short by an interrupted write is left out
+        return np.memmap(self.records_path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    def decode(self, field, codes):
+        """
+        Returns the strings of the codes of a string field, e.g. decode('step', records['step'][:10]).
+        """
+        values = np.array(self.dictionaries[field], dtype=object)
+        return values[np.asarray(codes, dtype=np.intp)]
+
+    def select(self, records=None, since=None, until=None, **equals):
+        """
+        This method returns a boolean mask of the records which match all the given conditions.
+
+        Args:
+            records:    the records to filter, all the written records by default
+            since:      keep the records with timestamp >= since
+            until:      keep the records with timestamp < until
+            equals:     field=value conditions, e.g. step='page load', band=5. A value may also be a list of
+                        accepted values. String values are matched through the dictionaries
+
+        Returns:
+            numpy.ndarray:  the boolean mask
+
+        Raises:
+            KeyError:   if a field is not a record field
+        """
+
+        if records is None:
+            records = self.records()
+        mask = np.ones(len(records), dtype=bool)
+        if since is not None:
+            mask &= records['timestamp'] >= since
+        if until is not None:
+            mask &= records['timestamp'] < until
+        for field, value in equals.items():
+            if field not in RECORD_DTYPE.names:
+                raise KeyError(f'Unknown measurement field: {field}')
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if field in STRING_FIELDS:
+                # A string which was never stored matches nothing
+                values = [self._codes[field][item] for item in values if item in self._codes[field]]
+            mask &= np.isin(records[field], np.asarray(values, dtype=RECORD_DTYPE[field]))
+        return mask
+
+    def aggregate(self, by=('band', 'channel', 'security'), field='duration', percents=(50, 90, 95), where=None,
+                  include_errors=False):
+        """
+        This method groups the records by one or more fields, and computes the count, mean and percentiles of
+        a numeric field per group, vectorised: the records are sorted once by group and value, and every
+        percentile is interpolated linearly between the closest ranks (as page_load_metrics.percentile does).
+
+        Args:
+            by:                 the fields to group by
+            field:              the aggregated field, e.g. 'duration'
+            percents:           the percentiles to compute
+            where:              a boolean mask of the records to aggregate, see select()
+            include_errors:     also aggregate the failed steps. Their count is reported as 'errors' either way
+
+        Returns:
+            dict:   {group: {'count': n, 'errors': n, 'mean': ..., 'p50': ..., ...}}. A group is a tuple of the
+                    decoded values of the 'by' fields. 'count' is the number of aggregated records
+
+        Raises:
+            NA
+        """
+
+        by = [by] if isinstance(by, str) else list(by)
+        records = self.records()
+        if where is not None:
+            records = records[where]
+        if not len(records):
+            return dict()
+
+        keys = [np.asarray(records[name]) for name in by]
+        values = np.asarray(records[field], dtype=np.float64)
+        errors = np.asarray(records['error'], dtype=bool)
+
+        # Sort by the group keys (the last key of lexsort is the primary one), then the failed steps last and
+        # the value, so every group is a contiguous run whose aggregated values are sorted
+        excluded = np.zeros(len(records), dtype=bool) if include_errors else errors
+        order = np.lexsort([values, excluded] + keys[::-1])
+        keys = [key[order] for key in keys]
+        values = values[order]
+        excluded = excluded[order]
+        errors = errors[order]
+
+        boundaries = np.zeros(len(values), dtype=bool)
+        boundaries[0] = True
+        for key in keys:
+            boundaries[1:] |= key[1:] != key[:-1]
+        starts = np.flatnonzero(boundaries)
+
+        error_counts = np.add.reduceat(errors.astype(np.int64), starts)
+        counts = np.add.reduceat((~excluded).astype(np.int64), starts)
+        sums = np.add.reduceat(np.where(excluded, 0.0, values), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+
+        columns = {'count': counts, 'errors': error_counts, 'mean': means}
+        for percent in percents:
+            rank = np.maximum(counts - 1, 0) * percent / 100
+            lower = np.floor(rank).astype(np.int64)
+            upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+            low_values = values[np.minimum(starts + lower, len(values) - 1)]
+            high_values = values[np.minimum(starts + upper, len(values) - 1)]
+            result = low_values + (high_values - low_values) * (rank - lower)
+            columns[f'p{percent}'] = np.where(counts > 0, result, np.nan)
+
+        group_keys = [self._group_values(name, key[starts]) for name, key in zip(by, keys)]
+        groups = dict()
+        for index, group in enumerate(zip(*group_keys)):
+            stats = {name: column[index].item() for name, column in columns.items()}
+            for name, value in stats.items():
+                if isinstance(value, float) and np.isnan(value):
+                    stats[name] = None
+            groups[group] = stats
+        return groups
+
+    def _group_values(self, field, values):
+        if field in STRING_FIELDS:
+            return self.decode(field, values).tolist()
+        if values.dtype == np.float32:
+            # The shortest repr of the float32 value, so a 2.4 band reads back as 2.4
+            return [float(str(value)) for value in values]
+        return values.tolist()
+
+    def _encode(self, field, value):
+        value = '' if value is None else str(value)
+        code = self._codes[field].get(value)
+        if code is None:
+            code = len(self.dictionaries[field])
+            if code > np.iinfo(RECORD_DTYPE[field]).max:
+                raise ValueError(f'Too many distinct {field} values for the measurement store')
+            self.dictionaries[field].append(value)
+            self._codes[field][value] = code
+            self._dictionaries_changed = True
+        return code
+
+    def _load_dictionaries(self):
+        if not os.path.exists(self.dictionaries_path):
+            return
+        with open(self.dictionaries_path) as dictionaries_file:
+            stored = json.load(dictionaries_file)
+        if stored.get('version') != SCHEMA_VERSION:
+            raise ValueError(f'{self.path} is a version {stored.get("version")} measurement store, '
+                             f'expected version {SCHEMA_VERSION}')
+        for field in STRING_FIELDS:
+            self.dictionaries[field] = list(stored['dictionaries'].get(field, []))
+            self._codes[field] = {value: code for code, value in enumerate(self.dictionaries[field])}
+
+    def _truncate_partial_record(self):
+        # A record cut short by an interrupted write would misalign every record appended after it
+        if not os.path.exists(self.records_path):
+            return
+        size = self._stored_count() * RECORD_DTYPE.itemsize
+        if os.path.getsize(self.records_path) != size:
+            LOGGER.warning(f'Dropping the partial record at the end of {self.records_path}')
+            os.truncate(self.records_path, size)
+
+    def _stored_count(self):
+        if not os.path.exists(self.records_path):
+            return 0
+        return os.path.getsize(self.records_path) // RECORD_DTYPE.itemsize
+
+
+def page_load_measurements(records, step='page load'):
+    """
+    This function converts page_load_metrics.PageLoadRecords into Measurements. The AP configuration is taken
+    from the record's ap_config label (see ap_matrix.config_label, e.g. '5/44/AES').
+
+    Args:
+        records:    PageLoadRecords
+        step:       the step name of the measurements
+
+    Returns:
+        list:   Measurement tuples, the duration being the record's wall time
+
+    Raises:
+        NA
+    """
+
+    measurements = []
+    for record in records:
+        band, channel, security = 0.0, 0, ''
+        parts = (record.ap_config or '').split('/')
+        if len(parts) == 3:
+            try:
+                band, channel, security = float(parts[0]), int(parts[1]), parts[2]
+            except ValueError:
+                LOGGER.debug(f'Unexpected AP configuration label: {record.ap_config}')
+        measurements.append(Measurement(record.timestamp, record.udid, band, channel, security, step,
+                                        record.wall_time, record.error is not None))
+    return measurements
+
+
+if __name__ == '__main__':
+    with MeasurementStore('measurements') as store:
+        store.append(Measurement(None, 'FAKE0001', 5, 44, 'AES', 'page load', 1.25))
+    for group, stats in store.aggregate().items():
+        print(group, stats)
@@ -0,0 +1,159 @@
+import json
+import logging
+import time
+from collections import defaultdict, namedtuple
+from waits import poll_until
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+NAVIGATION_TIMING_SCRIPT = 'return JSON.parse(JSON.stringify(window.performance.timing));'
+READY_STATE_SCRIPT = 'return document.readyState;'
+
+# Durations in milliseconds, each computed from two window.performance.timing marks
+METRICS = {'dns': ('domainLookupStart', 'domainLookupEnd'),
+           'connect': ('connectStart', 'connectEnd'),
+           'ttfb': ('requestStart', 'responseStart'),
+           'download': ('responseStart', 'responseEnd'),
+           'dom_content_loaded': ('navigationStart', 'domContentLoadedEventEnd'),
+           'load': ('navigationStart', 'loadEventEnd')}
+
+PageLoadRecord = namedtuple('PageLoadRecord', ['timestamp', 'udid', 'ap_config', 'url', 'wall_time', 'dns', 'connect',
+                                               'ttfb', 'download', 'dom_content_loaded', 'load', 'error'])
+
+
+def percentile(values, percent):
+    """
+    Returns the 'percent' percentile of 'values', interpolating linearly between the closest ranks.
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def measure_navigation(driver, url, udid='', ap_config='', timeout=30):
+    """
+    This function navigates the driver to 'url', waits until the document is ready and its load event has
+    finished, and collects the navigation timing of the page.
+
+    Args:
+        driver:     WebDriver session with a browser context
+        url:        a valid url
+        udid:       the device serial, stored in the record
+        ap_config:  a label of the AP configuration under test (e.g. '5/44/AES'), stored in the record
+        timeout:    seconds to wait for the page to load
+
+    Returns:
+        PageLoadRecord: the measured navigation. On failure, the metrics are None and 'error' holds the reason
+
+    Raises:
+        NA
+    """
+
+    start = time.perf_counter()
+    try:
+        driver.get(url)
+        timing, _, _ = poll_until(lambda: _finished_timing(driver), timeout=timeout)
+        metrics = {name: max(timing[end] - timing[begin], 0) for name, (begin, end) in METRICS.items()}
+        error = None
+    except Exception as exception:
+        metrics = {name: None for name in METRICS}
+        error = repr(exception)
+        LOGGER.debug(f'Navigation to {url} failed: {error}')
+
+    return PageLoadRecord(time.time(), udid, ap_config, url, time.perf_counter() - start, error=error, **metrics)
+
+
+def _finished_timing(driver):
+    if driver.execute_script(READY_STATE_SCRIPT) != 'complete':
+        return None
+    timing = driver.execute_script(NAVIGATION_TIMING_SCRIPT)
+    if not timing or not timing.get('loadEventEnd'):
+        return None
+    return timing
+
+
+class PageLoadStats:
+    """
+    This class collects PageLoadRecords, stores them as JSON lines and aggregates them, across runs,
+    into percentiles per AP configuration (or any other record field).
+    """
+
+    def __init__(self, records=None):
+        self.records = list(records or [])
+        self.saved = 0
+
+    def add(self, record):
+        self.records.append(record)
+
+    def save(self, path):
+        """
+        This method appends the records collected since the previous save to a JSON lines file, so saving
+        after every configuration writes every record once.
+
+        Args:
+            path:   the JSON lines file
+
+        Returns:
+            NA
+
+        Raises:
+            NA
+        """
+
+        with open(path, 'a') as records_file:
+            for record in self.records[self.saved:]:
+                records_file.write(json.dumps(record._asdict()) + '\n')
+        self.saved = len(self.records)
+
+    @classmethod
+    def load(cls, *paths):
+        """
+        This method loads the records of one or more runs from JSON lines files.
+
+        Args:
+            paths:  the JSON lines files
+
+        Returns:
+            PageLoadStats:  the loaded records
+
+        Raises:
+            NA
+        """
+
+        records = []
+        for path in paths:
+            with open(path) as records_file:
+                records.extend(PageLoadRecord(**json.loads(line)) for line in records_file if line.strip())
+        return cls(records)
+
+    def percentiles(self, metric='load', by='ap_config', percents=(50, 90, 95)):
+        """
+        This method returns the percentiles of a metric, grouped by a record field. Failed navigations are skipped.
+
+        Args:
+            metric:     one of METRICS, or 'wall_time'
+            by:         the record field to group by
+            percents:   the percentiles to compute
+
+        Returns:
+            dict:   {group: {'count': n, 'p50': ..., 'p90': ...}}
+
+        Raises:
+            NA
+        """
+
+        groups = defaultdict(list)
+        for record in self.records:
+            value = getattr(record, metric)
+            if record.error is None and value is not None:
+                groups[getattr(record, by)].append(value)
+
+        return {group: dict(count=len(values), **{f'p{percent}': percentile(values, percent) for percent in percents})
+                for group, values in groups.items()}
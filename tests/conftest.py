@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live flat in the repository root, so the tests import them the way the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import pytest
+import adb_shell
+from adb_shell import AdbShellInterrupted, AdbShellPool, run_shell_command
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    install_fake_tool(str(tmp_path), 'adb', FAKE_ADB_SCRIPT)
+    monkeypatch.setenv('PATH', f'{tmp_path}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('FAKE_ADB_WIFI_STATE', str(tmp_path / 'adb_wifi.json'))
+    shell_pool = AdbShellPool(timeout=2)
+    yield shell_pool
+    shell_pool.close()
+
+
+def test_output_with_and_without_trailing_newline(pool):
+    assert pool.run('FAKE0001', 'echo hello') == b'hello\r\n'
+    # Without a newline at the end the output still has to be framed by the sentinel
+    assert pool.run('FAKE0001', "printf 'foo'") == b'foo'
+    assert pool.run('FAKE0001', "printf ''") == b''
+    assert pool.run('FAKE0001', 'getprop ro.build.version.release') == b'10\r\n'
+
+
+def test_same_output_as_one_shot(pool):
+    for command in ('echo hello', "printf 'foo'", 'cmd wifi status'):
+        assert run_shell_command('FAKE0001', command, pool) == run_shell_command('FAKE0001', command).replace(b'\n', b'\r\n')
+
+
+def test_non_zero_status(pool):
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        pool.run('FAKE0001', 'no_such_command')
+    assert error.value.returncode == 127
+    assert b'not found' in error.value.output
+    # The session survives a failed command
+    assert pool.run('FAKE0001', 'echo again') == b'again\r\n'
+
+
+def test_interrupted_command_is_not_run_again(pool, monkeypatch):
+    monkeypatch.setenv('FAKE_ADB_COMMAND_DELAY', '1')
+    pool.timeout = 0.2
+
+    def one_shot(*args, **kwargs):
+        raise AssertionError('the command was run again one-shot')
+
+    monkeypatch.setattr(adb_shell.subprocess, 'check_output', one_shot)
+    with pytest.raises(AdbShellInterrupted):
+        run_shell_command('FAKE0001', 'svc wifi enable', pool)
@@ -0,0 +1,44 @@
+import asyncio
+import os
+import time
+import pytest
+
+# android_device_manager logs through init_logger and loads Appium lazily, so both need to be installed
+pytest.importorskip('Configuration.auto_configuration')
+pytest.importorskip('appium')
+
+from adb_shell import AdbShellPool
+from android_device_manager import AndroidManager, AsyncAndroidManager
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    install_fake_tool(str(tmp_path), 'adb', FAKE_ADB_SCRIPT)
+    monkeypatch.setenv('PATH', f'{tmp_path}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('FAKE_ADB_DEVICES', 'FAKE0001:Pixel_3')
+    monkeypatch.setenv('FAKE_ADB_WIFI_STATE', str(tmp_path / 'adb_wifi.json'))
+    return monkeypatch
+
+
+def test_no_device_turns_nothing_on(fake_adb):
+    fake_adb.setenv('FAKE_ADB_DEVICES', '')
+    assert asyncio.run(AsyncAndroidManager(manager=AndroidManager()).turn_wifi_on()) is False
+
+
+@pytest.mark.parametrize('pooled', [False, True])
+def test_shell_command_timeout(fake_adb, pooled):
+    pool = AdbShellPool() if pooled else None
+    manager = AndroidManager(shell_pool=pool)
+    assert manager.get_device_identity() is not None
+    # Only the commands started from now on are slow, so the pooled session has to be opened again
+    fake_adb.setenv('FAKE_ADB_COMMAND_DELAY', '3')
+    if pool is not None:
+        pool.close()
+
+    start = time.monotonic()
+    assert asyncio.run(AsyncAndroidManager(manager=manager).turn_wifi_on(timeout=0.5)) is False
+    assert time.monotonic() - start < 2.5
+    if pool is not None:
+        # The interrupted session was closed, so the command cannot finish in the background
+        assert pool._sessions == dict()
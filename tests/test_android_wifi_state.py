@@ -0,0 +1,24 @@
+from android_wifi_state import parse_wifi_status
+
+
+def test_parse_cmd_wifi_status_connected():
+    reply = ('Wifi is enabled\n'
+             'Wifi scanning is always available\n'
+             'Wifi is connected to "AP_5_44_AES"\n'
+             'WifiInfo: SSID: "AP_5_44_AES", BSSID: 11:22:33:44:55:66, RSSI: -45\n')
+    assert parse_wifi_status(reply) == (True, True)
+
+
+def test_parse_cmd_wifi_status_disabled():
+    assert parse_wifi_status('Wifi is disabled\nWifi scanning is only available when wifi is enabled\n') == (False, False)
+
+
+def test_parse_dumpsys_wifi():
+    reply = ('Wi-Fi is enabled\n'
+             'Stay-awake conditions: 0\n'
+             'mNetworkInfo [type: WIFI[], state: CONNECTED/CONNECTED, reason: (unspecified)]\n')
+    assert parse_wifi_status(reply) == (True, True)
+
+
+def test_parse_unknown_reply():
+    assert parse_wifi_status("cmd: Can't find service: wifi\n") == (None, False)
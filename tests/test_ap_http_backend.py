@@ -0,0 +1,64 @@
+import pytest
+
+# The channel and security maps come with the test bench configuration
+pytest.importorskip('JSON.channels_map')
+pytest.importorskip('Configuration.auto_configuration')
+
+from ap_http_backend import APLoginError, HttpAPManager
+from benchmarks.stub_ap_server import SECURITY, StubAPServer
+
+
+@pytest.fixture
+def server():
+    with StubAPServer() as stub:
+        yield stub
+
+
+@pytest.fixture
+def ap(server):
+    manager = HttpAPManager(server.url)
+    manager.login_ap(server.password)
+    yield manager
+    manager.close()
+
+
+def test_login_with_a_wrong_password(server):
+    with pytest.raises(APLoginError):
+        HttpAPManager(server.url).login_ap('wrong')
+
+
+def test_set_and_save(ap, server):
+    assert ap.set_ap_params('AP_5_44_AES', 5, 44, '', 'AES', '00099999') == ['ssid', 'band', 'channel', 'security', 'password']
+    assert ap.save_params() is True
+    assert server.state == {'ssid': 'AP_5_44_AES', 'band': '5GHz', 'channel': '44', 'security': SECURITY[2], 'key': '00099999'}
+    assert ap.read_wireless_settings() == {'ssid': 'AP_5_44_AES', 'band': 5, 'channel': 44, 'security': 'AES', 'password': '00099999'}
+
+
+def test_only_changed_fields_are_submitted(ap, server):
+    ap.set_ap_params('AP_5_44_AES', 5, 44, '', 'AES', '00099999')
+    ap.save_params()
+
+    ap.only_changed = True
+    assert ap.set_ap_params('AP_5_44_AES', 5, 48, '', 'AES', '00099999') == ['channel']
+    assert ap.form == {'channel': 5}
+    assert ap.save_params() is True
+    assert server.state['channel'] == '48'
+
+    # Nothing changed, so the save is skipped rather than failed
+    assert ap.set_ap_params('AP_5_44_AES', 5, 48, '', 'AES', '00099999') == []
+    assert ap.save_params() is None
+    assert len(server.saves) == 2
+
+
+def test_band_change_resubmits_the_channel(ap):
+    ap.set_ap_params('AP', 2.4, 1, '', 'OPEN', '')
+    ap.save_params()
+    assert ap.set_ap_params('AP', 5, 1, '', 'OPEN', '', only_changed=True) == ['band', 'channel']
+
+
+def test_expired_login_is_renewed(ap, server):
+    server.expire_sessions()
+    ap.set_ap_params('AP_2.4_6_OPEN', 2.4, 6, '', 'OPEN', '')
+    assert ap.save_params() is True
+    assert server.logins == 2
+    assert server.state['channel'] == '6'
@@ -0,0 +1,67 @@
+import json
+import pytest
+
+# The channel and security maps come with the test bench configuration, and ap_matrix imports configure_ap
+pytest.importorskip('JSON.channels_map')
+pytest.importorskip('Configuration.auto_configuration')
+pytest.importorskip('selenium')
+
+from ap_matrix import APConfig, MatrixRunner, build_matrix, order_matrix
+
+
+def field_changes(configs):
+    return sum(sum(getattr(first, field) != getattr(second, field) for field in ('band', 'channel', 'security'))
+               for first, second in zip(configs, configs[1:]))
+
+
+def test_order_matrix_keeps_every_configuration():
+    configs = build_matrix(security_types=['OPEN', 'AUTO', 'AES'])
+    ordered = order_matrix(list(reversed(configs)))
+    assert sorted(ordered) == sorted(configs)
+
+
+def test_order_matrix_changes_the_band_once():
+    ordered = order_matrix(build_matrix(security_types=['OPEN', 'AES'])[::-1])
+    bands = [config.band for config in ordered]
+    assert bands == sorted(bands)
+
+
+def test_order_matrix_walks_the_security_types_back_and_forth():
+    configs = [APConfig(f'AP_{channel}_{security}', 5, channel, '', security, 'key')
+               for security in ('OPEN', 'AES') for channel in (44, 36, 40)]
+    ordered = order_matrix(configs)
+    assert [(config.channel, config.security) for config in ordered] == \
+        [(36, 'OPEN'), (36, 'AES'), (40, 'AES'), (40, 'OPEN'), (44, 'OPEN'), (44, 'AES')]
+    # Every step changes one field
+    assert field_changes(ordered) == len(ordered) - 1
+    assert field_changes(ordered) < field_changes(configs)
+
+
+class FakeAPManager:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.applied = []
+
+    def set_ap_params(self, ssid, band, channel, mode, security, password, only_changed=None):
+        self.applied.append(ssid)
+        return ['ssid']
+
+    def save_params(self):
+        return self.applied[-1] not in self.failing
+
+
+def test_matrix_runner_resumes_and_clears_the_checkpoint(tmp_path):
+    checkpoint = tmp_path / 'checkpoint.json'
+    configs = build_matrix(bands=(5,), security_types=['OPEN', 'AES'])
+    failing = order_matrix(configs)[-1].ssid
+
+    report = MatrixRunner(FakeAPManager(failing=[failing]), checkpoint_path=str(checkpoint)).run(configs)
+    assert len(report.timings) == len(configs) - 1
+    assert [config.ssid for config in report.failed] == [failing]
+    assert len(json.loads(checkpoint.read_text())['completed']) == len(configs) - 1
+
+    ap_manager = FakeAPManager()
+    report = MatrixRunner(ap_manager, checkpoint_path=str(checkpoint)).run(configs)
+    assert ap_manager.applied == [failing]
+    assert report.skipped == len(configs) - 1
+    assert not checkpoint.exists()
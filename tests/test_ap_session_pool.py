@@ -0,0 +1,42 @@
+import pytest
+
+# ap_session_pool loads selenium lazily, but looks it up at import time
+pytest.importorskip('selenium')
+
+from ap_session_pool import APSessionPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.current_url = None
+        self.quit_called = False
+
+    def get(self, url):
+        self.current_url = url
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_session_in_use_is_not_shared():
+    pool = APSessionPool(driver_factory=FakeDriver)
+    first = pool.acquire('http://ap/')
+    second = pool.acquire('http://ap/')
+    assert first.driver is not second.driver
+    assert pool.created == 2
+
+    pool.release(first)
+    assert pool.acquire('http://ap/') is first
+    assert pool.reused == 1
+
+
+def test_evict_idle_skips_sessions_in_use():
+    pool = APSessionPool(idle_timeout=0, driver_factory=FakeDriver)
+    in_use = pool.acquire('http://ap/')
+    released = pool.acquire('http://ap/')
+    pool.release(released)
+
+    pool.evict_idle()
+    assert not in_use.driver.quit_called
+    assert released.driver.quit_called
+    assert pool.sessions['http://ap/'] == [in_use]
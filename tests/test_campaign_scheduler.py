@@ -0,0 +1,66 @@
+import pytest
+
+# campaign_scheduler labels the items with ap_matrix, which needs the test bench configuration and selenium
+pytest.importorskip('JSON.channels_map')
+pytest.importorskip('Configuration.auto_configuration')
+pytest.importorskip('selenium')
+
+from ap_matrix import APConfig
+from campaign_scheduler import PipelineScheduler, campaign_stages
+
+
+class FakeAPManager:
+    def __init__(self, rejected):
+        self.rejected = rejected
+        self.ssid = None
+
+    def set_ap_params(self, ssid, band, channel, mode, security, password):
+        self.ssid = ssid
+        return ['ssid']
+
+    def save_params(self):
+        return False if self.ssid == self.rejected else None
+
+
+class FakeProfileStore:
+    def install(self, profile):
+        return True
+
+
+class FakeWiFiManager:
+    profile_store = FakeProfileStore()
+
+    def connect_to_wifi(self, ssid, wait=False):
+        return FakeTiming()
+
+
+class FakeTiming:
+    error = None
+
+
+class FakeAppiumSessions:
+    def get(self, manager, capability_type):
+        return None
+
+
+class FakeAndroidManager:
+    appium_sessions = FakeAppiumSessions()
+
+    def __init__(self):
+        self.browsed = []
+
+    def browse_many(self, urls, ap_config=''):
+        self.browsed.append(ap_config)
+        return []
+
+
+def test_clients_do_not_measure_a_configuration_the_ap_rejected():
+    configs = [APConfig(f'AP_{channel}', 5, channel, '', 'OPEN', '') for channel in (36, 40, 44)]
+    android_manager = FakeAndroidManager()
+    stages = campaign_stages(FakeAPManager(rejected='AP_40'), FakeWiFiManager(), android_manager, ['http://a'])
+
+    report = PipelineScheduler(stages).run(configs)
+    assert android_manager.browsed == ['5/36/OPEN', '5/44/OPEN']
+    errors = {(task.item, task.stage): task.error for task in report.tasks if task.error is not None}
+    assert 'RuntimeError' in errors[(1, 'configure ap')]
+    assert errors[(1, 'browse')] == 'skipped'
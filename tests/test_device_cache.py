@@ -0,0 +1,46 @@
+import os
+import pytest
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool
+from device_cache import DeviceCache, parse_adb_devices
+
+
+def test_parse_adb_devices_long_format():
+    reply = ('* daemon not running; starting now at tcp:5037\n'
+             '* daemon started successfully\n'
+             'List of devices attached\n'
+             'FAKE0001               device usb:1-1 product:blueline model:Pixel_3 device:blueline transport_id:1\n'
+             'emulator-5554          offline transport_id:2\n'
+             '\n')
+    assert parse_adb_devices(reply) == {'FAKE0001': ('device', 'Pixel_3'), 'emulator-5554': ('offline', '')}
+
+
+def test_parse_adb_devices_short_format():
+    reply = 'List of devices attached\r\nFAKE0001\tdevice\r\nFAKE0002\tunauthorized\r\n\r\n'
+    assert parse_adb_devices(reply) == {'FAKE0001': ('device', ''), 'FAKE0002': ('unauthorized', '')}
+
+
+def test_parse_adb_devices_no_devices():
+    assert parse_adb_devices('List of devices attached\n\n') == dict()
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    install_fake_tool(str(tmp_path), 'adb', FAKE_ADB_SCRIPT)
+    monkeypatch.setenv('PATH', f'{tmp_path}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('FAKE_ADB_DEVICES', 'FAKE0001:Pixel_3,FAKE0002:Pixel_4,FAKE0003:Pixel_5')
+    monkeypatch.setenv('FAKE_ADB_PLATFORM_VERSION', '11')
+    return monkeypatch
+
+
+def test_probe_all_lists_the_devices_once(fake_adb):
+    cache = DeviceCache()
+    identities = cache.probe_all()
+    assert sorted(identities) == ['FAKE0001', 'FAKE0002', 'FAKE0003']
+    assert identities['FAKE0002'].model == 'Pixel_4'
+    assert identities['FAKE0002'].platform_version == '11'
+    # One 'adb devices -l', and one getprop per device
+    assert cache.probe_count == 4
+
+    assert cache.get('FAKE0003') == identities['FAKE0003']
+    assert cache.probe_all(cache.list_devices()) == identities
+    assert cache.probe_count == 5
@@ -0,0 +1,61 @@
+import os
+import time
+import pytest
+
+# device_fanout creates AndroidManagers by default, which log through init_logger and load Appium lazily
+pytest.importorskip('Configuration.auto_configuration')
+pytest.importorskip('appium')
+
+from benchmarks.fake_tools import FAKE_ADB_SCRIPT, install_fake_tool
+from device_cache import DeviceCache
+from device_fanout import DeviceFanOut
+
+
+class FakeManager:
+    def __init__(self, udid=None, device_cache=None, shell_pool=None):
+        self.target_udid = udid
+        self.device_cache = device_cache
+
+    def get_device_identity(self):
+        return self.device_cache.get(self.target_udid)
+
+    def turn_wifi_on(self, delay):
+        time.sleep(delay)
+        if self.target_udid == 'FAKE0002':
+            raise TimeoutError('Wi-Fi did not turn on')
+        return self.get_device_identity().model
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    install_fake_tool(str(tmp_path), 'adb', FAKE_ADB_SCRIPT)
+    monkeypatch.setenv('PATH', f'{tmp_path}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.setenv('FAKE_ADB_DEVICES', ','.join(f'FAKE000{index}:Pixel_{index}' for index in range(1, 7)))
+    return monkeypatch
+
+
+def test_fan_out_results_errors_and_throughput(fake_adb):
+    cache = DeviceCache()
+    fan_out = DeviceFanOut(device_cache=cache, max_workers=6, manager_factory=FakeManager)
+    report = fan_out.run('turn_wifi_on', 0.2)
+
+    assert len(report.results) == 6
+    assert {udid: result.result for udid, result in report.succeeded.items()} == \
+        {f'FAKE000{index}': f'Pixel_{index}' for index in (1, 3, 4, 5, 6)}
+    assert list(report.failed) == ['FAKE0002']
+    assert isinstance(report.failed['FAKE0002'].error, TimeoutError)
+    assert all(result.duration >= 0.2 for result in report.results.values())
+    # The devices run concurrently: 6 operations of 0.2s in much less than 1.2s
+    assert report.wall_time < 0.8
+    assert report.throughput == pytest.approx(6 / report.wall_time)
+    assert '5/6 devices succeeded' in str(report)
+
+    # The devices were listed once, and the managers found their identity in the seeded cache
+    assert cache.probe_count == 1 + 6
+
+
+def test_fan_out_on_selected_devices(fake_adb):
+    fan_out = DeviceFanOut(device_cache=DeviceCache(), manager_factory=FakeManager)
+    report = fan_out.run(lambda manager: manager.target_udid.lower(), udids=['FAKE0004'])
+    assert report.operation == '<lambda>'
+    assert report.results['FAKE0004'].result == 'fake0004'
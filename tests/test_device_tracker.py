@@ -0,0 +1,38 @@
+import pytest
+from device_tracker import TrackDevicesParser
+
+
+def message(payload):
+    data = payload.encode('utf-8')
+    return b'%04x' % len(data) + data
+
+
+def test_feed_whole_messages():
+    parser = TrackDevicesParser()
+    data = message('FAKE0001\tdevice\n') + message('')
+    assert parser.feed(data) == [{'FAKE0001': ('device', '')}, dict()]
+
+
+def test_feed_messages_split_across_chunks():
+    parser = TrackDevicesParser()
+    data = message('FAKE0001 device model:Pixel_3\n') + message('FAKE0001 offline\nFAKE0002 device model:Pixel_4\n')
+    snapshots = []
+    # Split inside the length prefix, inside the payload and on the message boundary
+    for start, end in [(0, 2), (2, 10), (10, 36), (36, 37), (37, len(data))]:
+        snapshots.extend(parser.feed(data[start:end]))
+    assert snapshots == [{'FAKE0001': ('device', 'Pixel_3')},
+                         {'FAKE0001': ('offline', ''), 'FAKE0002': ('device', 'Pixel_4')}]
+
+
+def test_feed_byte_by_byte():
+    parser = TrackDevicesParser()
+    data = message('FAKE0001\tdevice\n')
+    snapshots = []
+    for index in range(len(data)):
+        snapshots.extend(parser.feed(data[index:index + 1]))
+    assert snapshots == [{'FAKE0001': ('device', '')}]
+
+
+def test_feed_rejects_another_stream():
+    with pytest.raises(ValueError):
+        TrackDevicesParser().feed(b'List of devices attached\n')
@@ -0,0 +1,81 @@
+import io
+import math
+import random
+from datetime import datetime, timedelta
+import pytest
+from log_analyser import analyse_file, analyse_stream
+
+
+MESSAGES = [
+    ('android_device_manager', 'INFO', 'Turned Wi-Fi on in {seconds:.3f}s'),
+    ('android_device_manager', 'INFO', 'Turned Wi-Fi off in {seconds:.3f}s'),
+    ('android_device_manager', 'INFO', 'Navigating chrome to: http://example.com/{index}'),
+    ('android_device_manager', 'INFO', 'Loaded http://example.com/{index} in {ms} ms'),
+    ('android_device_manager', 'ERROR', 'Was unable to  run chrome'),
+    ('configure_ap', 'INFO', "Saved AP wireless settings: {{'ssid': 'AP_{index}'}}"),
+    ('configure_ap', 'ERROR', 'AP rejected the wireless settings: timeout'),
+    ('adb_shell', 'DEBUG', 'adb shell reply: mWifiEnabled=true'),
+    ('windows_wifi_manager', 'ERROR', 'Got exception while trying to run "netsh wlan show interfaces"'),
+]
+
+
+def log_line(created, name, level, message):
+    # The init_logger format, see logger.LOG_FORMAT
+    asctime = created.strftime('%Y-%m-%d %H:%M:%S,') + f'{created.microsecond // 1000:03d}'
+    return f'{asctime} - {level:<12} - {name:<20} - {name + ".py":<24} - {42:<4d} - {message}\n'
+
+
+def same_report(first, second):
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(same_report(value, second[key]) for key, value in first.items())
+    if isinstance(first, float):
+        # The parallel duration sums add up in another order
+        return math.isclose(first, second, rel_tol=1e-9)
+    return first == second
+
+
+@pytest.fixture(scope='module')
+def log_path(tmp_path_factory):
+    generator = random.Random(1)
+    created = datetime(2024, 1, 1, 10, 0, 0)
+    path = tmp_path_factory.mktemp('logs') / 'run.log'
+    with open(path, 'w') as log_file:
+        for index in range(5000):
+            name, level, message = generator.choice(MESSAGES)
+            created += timedelta(milliseconds=generator.randint(1, 2000))
+            log_file.write(log_line(created, name, level, message.format(index=index, seconds=generator.uniform(0.2, 3),
+                                                                         ms=generator.randint(200, 5000))))
+            if level == 'ERROR' and generator.random() < 0.3:
+                log_file.write('Traceback (most recent call last):\n  File "x.py", line 1, in <module>\nTimeoutError\n')
+    return str(path)
+
+
+def test_parallel_analysis_matches_serial(log_path):
+    serial = analyse_file(log_path).report()
+    for processes in (2, 3):
+        assert same_report(analyse_file(log_path, processes).report(), serial)
+
+
+def test_chunked_analysis_matches_serial(log_path):
+    serial = analyse_file(log_path).report()
+    with open(log_path, 'rb') as log_file:
+        assert same_report(analyse_stream(log_file, chunk_size=4096).report(), serial)
+
+
+def test_report_counts(log_path):
+    report = analyse_file(log_path).report()
+    assert report['lines'] == 5000
+    assert sum(report['levels'].values()) == 5000
+    assert report['operations']['page load']['count'] > 0
+    assert report['operations']['wifi off']['errors'] == 0
+
+
+def test_navigation_failure():
+    start = datetime(2024, 1, 1, 10, 0, 0)
+    log = ''.join([log_line(start, 'android_device_manager', 'INFO', 'Navigating chrome to: http://a'),
+                   log_line(start + timedelta(seconds=1.5), 'android_device_manager', 'ERROR', 'Was unable to  run chrome'),
+                   log_line(start + timedelta(seconds=2), 'android_device_manager', 'INFO', 'Navigating chrome to: http://b'),
+                   log_line(start + timedelta(seconds=2.25), 'android_device_manager', 'INFO', 'Loaded http://b in 250 ms')])
+    report = analyse_stream(io.BytesIO(log.encode('utf-8'))).report()
+    assert (report['operations']['navigate']['count'], report['operations']['navigate']['errors']) == (2, 1)
+    assert report['operations']['page load']['max'] == pytest.approx(0.25)
@@ -0,0 +1,65 @@
+import os
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from measurement_store import RECORD_DTYPE, Measurement, MeasurementStore
+from page_load_metrics import percentile
+
+
+def test_aggregate_by_configuration(tmp_path):
+    with MeasurementStore(str(tmp_path)) as store:
+        for duration in (1.0, 2.0, 3.0, 4.0):
+            store.append(Measurement(0.0, 'FAKE0001', 5, 44, 'AES', 'page load', duration))
+        store.append(Measurement(0.0, 'FAKE0001', 5, 44, 'AES', 'page load', 100.0, True))
+        store.append(Measurement(0.0, 'FAKE0002', 2.4, 6, 'OPEN', 'page load', 0.5))
+
+    groups = MeasurementStore(str(tmp_path)).aggregate(percents=(50, 90))
+    assert set(groups) == {(5.0, 44, 'AES'), (2.4, 6, 'OPEN')}
+    stats = groups[(5.0, 44, 'AES')]
+    assert (stats['count'], stats['errors']) == (4, 1)
+    assert stats['mean'] == pytest.approx(2.5)
+    assert stats['p50'] == pytest.approx(percentile([1.0, 2.0, 3.0, 4.0], 50))
+    assert stats['p90'] == pytest.approx(percentile([1.0, 2.0, 3.0, 4.0], 90))
+    assert groups[(2.4, 6, 'OPEN')]['p90'] == pytest.approx(0.5)
+
+
+def test_aggregate_with_errors_and_filter(tmp_path):
+    store = MeasurementStore(str(tmp_path))
+    store.extend([Measurement(1.0, 'FAKE0001', 5, 36, 'OPEN', 'wifi on', 2.0),
+                  Measurement(2.0, 'FAKE0001', 5, 36, 'OPEN', 'wifi on', 6.0, True),
+                  Measurement(3.0, 'FAKE0002', 5, 36, 'OPEN', 'connect', 9.0)])
+    store.flush()
+
+    wifi_on = store.aggregate(by='device', where=store.select(step='wifi on'), include_errors=True)
+    assert wifi_on == {('FAKE0001',): {'count': 2, 'errors': 1, 'mean': 4.0, 'p50': 4.0, 'p90': pytest.approx(5.6),
+                                       'p95': pytest.approx(5.8)}}
+    assert store.aggregate(where=store.select(step='page load')) == dict()
+    assert store.aggregate(by='step', where=store.select(since=2.0))[('wifi on',)]['count'] == 0
+
+
+def test_partial_record_is_dropped_on_open(tmp_path):
+    with MeasurementStore(str(tmp_path)) as store:
+        store.append(Measurement(1.0, 'FAKE0001', 5, 36, 'OPEN', 'wifi on', 2.0))
+    with open(store.records_path, 'ab') as records_file:
+        records_file.write(b'\0' * (RECORD_DTYPE.itemsize // 2))
+
+    with MeasurementStore(str(tmp_path)) as store:
+        store.append(Measurement(2.0, 'FAKE0001', 5, 36, 'OPEN', 'wifi on', 4.0))
+    assert os.path.getsize(store.records_path) == 2 * RECORD_DTYPE.itemsize
+    assert store.records()['duration'].tolist() == [2.0, 4.0]
+
+
+def test_reader_leaves_a_partial_record_alone(tmp_path):
+    with MeasurementStore(str(tmp_path)) as store:
+        store.append(Measurement(1.0, 'FAKE0001', 5, 36, 'OPEN', 'wifi on', 2.0))
+    # A writer in the middle of a flush
+    with open(store.records_path, 'ab') as records_file:
+        records_file.write(b'\0' * (RECORD_DTYPE.itemsize // 2))
+    size = os.path.getsize(store.records_path)
+
+    reader = MeasurementStore(str(tmp_path))
+    assert len(reader) == 1
+    assert reader.aggregate(by='step')[('wifi on',)]['count'] == 1
+    reader.close()
+    assert os.path.getsize(store.records_path) == size
@@ -0,0 +1,20 @@
+from page_load_metrics import PageLoadRecord, PageLoadStats
+
+
+def record(url, load, error=None):
+    return PageLoadRecord(0.0, 'FAKE0001', '5/44/AES', url, 1.0, 5, 10, 20, 30, load, load, error)
+
+
+def test_save_appends_each_record_once(tmp_path):
+    path = str(tmp_path / 'page_loads.jsonl')
+    stats = PageLoadStats()
+    stats.add(record('http://a', 100))
+    stats.save(path)
+    stats.add(record('http://b', 200))
+    stats.add(record('http://c', None, error='TimeoutError()'))
+    stats.save(path)
+    stats.save(path)
+
+    loaded = PageLoadStats.load(path)
+    assert [item.url for item in loaded.records] == ['http://a', 'http://b', 'http://c']
+    assert loaded.records[2].error == 'TimeoutError()'
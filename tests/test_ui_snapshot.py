@@ -0,0 +1,50 @@
+import pytest
+from ui_snapshot import UiSnapshot, parse_bounds
+
+
+SOURCE = '''<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][1080,2160]">
+    <android.widget.TextView resource-id="android:id/title" text="Network &amp; internet" class="android.widget.TextView" bounds="[180,300][900,360]" />
+    <android.widget.TextView resource-id="android:id/title" text="Connected devices" class="android.widget.TextView" bounds="[180,500][900,560]" />
+    <android.widget.ImageButton content-desc="Navigate up" class="android.widget.ImageButton" bounds="[0,60][120,180]" />
+  </android.widget.FrameLayout>
+</hierarchy>
+'''
+
+
+@pytest.fixture
+def snapshot():
+    return UiSnapshot(SOURCE)
+
+
+def test_find_by_id_in_document_order(snapshot):
+    assert [node.text for node in snapshot.find_all('id', 'android:id/title')] == ['Network & internet', 'Connected devices']
+
+
+def test_find_by_text_and_description(snapshot):
+    assert snapshot.find('text', 'Connected devices').bounds == (180, 500, 900, 560)
+    assert snapshot.find('accessibility id', 'Navigate up').class_name == 'android.widget.ImageButton'
+    assert snapshot.find('text', 'Battery') is None
+
+
+def test_find_by_xpath(snapshot):
+    absolute = '/hierarchy/android.widget.FrameLayout[1]/android.widget.TextView[2]'
+    assert snapshot.find('xpath', absolute).text == 'Connected devices'
+    assert snapshot.find('xpath', '//*[@text="Network & internet"]').xpath == \
+        '/hierarchy/android.widget.FrameLayout[1]/android.widget.TextView[1]'
+    assert snapshot.find_all('xpath', '//*[contains(@text, "Network")]') == []
+
+
+def test_center(snapshot):
+    assert snapshot.find('text', 'Network & internet').center == (540, 330)
+
+
+def test_unsupported_locator(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.find_all('class name', 'android.widget.TextView')
+
+
+def test_parse_bounds():
+    assert parse_bounds('[-10,0][1080,2160]') == (-10, 0, 1080, 2160)
+    assert parse_bounds(None) == (0, 0, 0, 0)
@@ -0,0 +1,98 @@
+import pytest
+import waits
+from waits import PageWaiter, StepTiming, WaitTimeoutError, poll_until
+
+
+class Countdown:
+    """
+    A condition which is met on poll number 'polls'.
+    """
+
+    def __init__(self, polls, error=None):
+        self.polls = polls
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        if self.calls >= self.polls:
+            return 'ready'
+        if self.error is not None:
+            raise self.error
+        return None
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(waits.time, 'sleep', recorded.append)
+    return recorded
+
+
+def test_condition_already_met_costs_one_poll(sleeps):
+    result, waited, polls = poll_until(Countdown(1), timeout=5)
+    assert (result, polls) == ('ready', 1)
+    assert sleeps == []
+
+
+def test_interval_grows_up_to_max_interval(sleeps):
+    result, _, polls = poll_until(Countdown(6), timeout=5, initial_interval=0.05, max_interval=0.1, backoff=1.5)
+    assert (result, polls) == ('ready', 6)
+    assert sleeps == pytest.approx([0.05, 0.075, 0.1, 0.1, 0.1])
+
+
+def test_errors_count_as_misses(sleeps):
+    result, _, polls = poll_until(Countdown(3, error=LookupError('not yet')), timeout=5)
+    assert (result, polls) == ('ready', 3)
+
+
+def test_abort_on_is_raised_right_away(sleeps):
+    condition = Countdown(3, error=KeyError('gone'))
+    with pytest.raises(KeyError):
+        poll_until(condition, timeout=5, abort_on=(KeyError,))
+    assert condition.calls == 1
+
+
+def test_timeout():
+    with pytest.raises(WaitTimeoutError, match='ValueError'):
+        poll_until(Countdown(10 ** 6, error=ValueError('never')), timeout=0.1, initial_interval=0.01)
+
+
+class FakeElement:
+    def __init__(self, displayed=True, enabled=True):
+        self.displayed = displayed
+        self.enabled = enabled
+
+    def is_displayed(self):
+        return self.displayed
+
+    def is_enabled(self):
+        return self.enabled
+
+
+class FakeDriver:
+    def __init__(self, elements):
+        self.elements = elements
+
+    def find_elements(self, by, value):
+        return self.elements.get((by, value), [])
+
+
+def test_page_waiter_records_step_timings(sleeps):
+    enabled = FakeElement()
+    waiter = PageWaiter(FakeDriver({('id', 'save'): [FakeElement(enabled=False), enabled]}))
+    assert waiter.element('save button', 'id', 'save', clickable=True) is enabled
+    assert waiter.until('three polls', Countdown(3)) == 'ready'
+    assert [(timing.step, timing.polls, timing.timed_out) for timing in waiter.timings] == \
+        [('save button', 1, False), ('three polls', 3, False)]
+
+
+def test_page_waiter_step_timeout():
+    waiter = PageWaiter(FakeDriver(dict()), timeout=5, step_timeouts={'reboot dialog': 0.1}, initial_interval=0.01)
+    with pytest.raises(WaitTimeoutError):
+        waiter.element('reboot dialog', 'id', 'wifiRebootCancel')
+    timing = waiter.timings[-1]
+    assert isinstance(timing, StepTiming)
+    assert (timing.step, timing.polls, timing.timed_out) == ('reboot dialog', None, True)
+    assert 0.1 <= timing.waited < 1
+    assert 'timeout' in waiter.report()
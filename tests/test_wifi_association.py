@@ -0,0 +1,47 @@
+from wifi_association import parse_interfaces, parse_ip_addresses
+
+
+INTERFACES = '''
+There are 2 interfaces on the system:
+
+    Name                   : Wi-Fi
+    Description            : Intel(R) Wi-Fi 6 AX201 160MHz
+    GUID                   : 0b5d8f3e-1111-2222-3333-444455556666
+    Physical address       : aa:bb:cc:dd:ee:ff
+    State                  : connected
+    SSID                   : AP_5_44_AES
+    BSSID                  : 11:22:33:44:55:66
+    Radio type             : 802.11ac
+    Authentication         : WPA2-Personal
+    Channel                : 44
+    Profile                : AP_5_44_AES
+
+    Name                   : Wi-Fi 2
+    Description            : USB Wi-Fi adapter
+    State                  : disconnected
+
+    Hosted network status  : Not available
+'''
+
+
+def test_parse_interfaces():
+    interfaces = parse_interfaces(INTERFACES)
+    assert [interface['name'] for interface in interfaces] == ['Wi-Fi', 'Wi-Fi 2']
+    assert interfaces[0]['state'] == 'connected'
+    assert interfaces[0]['ssid'] == 'AP_5_44_AES'
+    assert interfaces[0]['channel'] == '44'
+    # 'Hosted network status' follows the last interface, but must not replace its fields
+    assert interfaces[1] == {'name': 'Wi-Fi 2', 'description': 'USB Wi-Fi adapter', 'state': 'disconnected',
+                             'hosted network status': 'Not available'}
+
+
+def test_parse_interfaces_without_interfaces():
+    assert parse_interfaces('There is no wireless interface on the system.\n') == []
+
+
+def test_parse_ip_addresses_skips_link_local():
+    reply = ('Configuration for interface "Wi-Fi"\n'
+             '    DHCP enabled:                         Yes\n'
+             '    IP Address:                           169.254.10.20\n'
+             '    IP Address:                           192.168.0.101\n')
+    assert parse_ip_addresses(reply) == ['192.168.0.101']
@@ -0,0 +1,41 @@
+import os
+import pytest
+from benchmarks.fake_tools import FAKE_NETSH_SCRIPT, install_fake_tool
+from wifi_profile_store import WiFiProfile, WiFiProfileStore
+
+
+PROFILE = WiFiProfile('SECURED', 'Café AP', '00099999', 'WPA2PSK', 'AES')
+
+
+@pytest.fixture
+def fake_netsh(tmp_path, monkeypatch):
+    tools = tmp_path / 'tools'
+    tools.mkdir()
+    monkeypatch.setenv('PATH', f'{tools}{os.pathsep}{os.environ["PATH"]}')
+    return tools
+
+
+def test_install_skips_an_identical_profile(tmp_path, fake_netsh):
+    install_fake_tool(str(fake_netsh), 'netsh', FAKE_NETSH_SCRIPT)
+    store = WiFiProfileStore(str(tmp_path / 'profiles'))
+    assert store.install(PROFILE) is True
+    assert store.install(PROFILE) is None
+    assert store.install(PROFILE._replace(password='changed1')) is True
+    assert store.netsh_calls == 2
+
+    # The installed hashes are kept across runs
+    assert WiFiProfileStore(str(tmp_path / 'profiles')).install(PROFILE._replace(password='changed1')) is None
+
+
+def test_install_reports_a_netsh_failure(tmp_path, fake_netsh):
+    install_fake_tool(str(fake_netsh), 'netsh', 'import sys\nsys.exit(1)\n')
+    store = WiFiProfileStore(str(tmp_path / 'profiles'))
+    assert store.install(PROFILE) is False
+    assert store.installed == dict()
+
+
+def test_profile_file_is_ascii(tmp_path):
+    _, path = WiFiProfileStore(str(tmp_path)).profile_path(PROFILE)
+    with open(path, 'rb') as profile_file:
+        content = profile_file.read()
+    assert b'<name>Caf&#233; AP</name>' in content
@@ -0,0 +1,256 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+SpanRecord = namedtuple('SpanRecord', ['name', 'category', 'start', 'duration', 'self_time', 'thread', 'args', 'error'])
+SpanRecord.__doc__ = '''
+A finished span. 'start' is time.perf_counter() seconds, 'duration' and 'self_time' (the duration minus the
+nested spans of the same thread) are seconds.
+'''
+
+_tracer = None
+
+
+class _NullSpan:
+    """
+    The span returned while tracing is disabled: entering and leaving it does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, category, args, detached):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.detached = detached
+        self.child_time = 0.0
+        self.start = None
+
+    def set(self, **args):
+        """
+        Adds arguments to the span, e.g. a result which is known only at its end.
+        """
+        self.args.update(args)
+
+    def __enter__(self):
+        if not self.detached:
+            self.tracer._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        if not self.detached:
+            stack = self.tracer._stack()
+            stack.pop()
+            if stack:
+                stack[-1].child_time += duration
+        error = None if exc_type is None else f'{exc_type.__name__}: {exc_value}'
+        self.tracer.records.append(SpanRecord(self.name, self.category, self.start, duration, duration - self.child_time,
+                                              threading.current_thread().name, self.args, error))
+        return False
+
+
+class Tracer:
+    """
+    This class collects the spans of a run. Spans nest per thread, so the summary can tell the time of a step
+    itself from the time of the (adb, netsh, WebDriver) calls it made.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.started = time.perf_counter()
+        self._local = threading.local()
+
+    def span(self, name, category='', detached=False, **args):
+        return Span(self, name, category, args, detached)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def summary(self):
+        """
+        This method sums the spans up per name.
+
+        Args:
+            NA
+
+        Returns:
+            list:   a dict per span name with 'name', 'category', 'count', 'total', 'self', 'mean', 'max' and
+                    'errors', the largest self time first
+
+        Raises:
+            NA
+        """
+
+        rows = dict()
+        for record in list(self.records):
+            row = rows.setdefault(record.name, {'name': record.name, 'category': record.category, 'count': 0,
+                                                'total': 0.0, 'self': 0.0, 'max': 0.0, 'errors': 0})
+            row['count'] += 1
+            row['total'] += record.duration
+            row['self'] += record.self_time
+            row['max'] = max(row['max'], record.duration)
+            row['errors'] += record.error is not None
+        for row in rows.values():
+            row['mean'] = row['total'] / row['count']
+        return sorted(rows.values(), key=lambda row: row['self'], reverse=True)
+
+    def summary_table(self):
+        lines = [f'{"span":<44} {"category":<10} {"count":>6} {"total [s]":>10} {"self [s]":>9} {"mean [ms]":>10} {"max [ms]":>9} {"errors":>6}']
+        for row in self.summary():
+            lines.append(f'{row["name"]:<44} {row["category"]:<10} {row["count"]:>6} {row["total"]:>10.3f} {row["self"]:>9.3f} '
+                         f'{row["mean"] * 1000:>10.1f} {row["max"] * 1000:>9.1f} {row["errors"]:>6}')
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """
+        This method returns the spans as Chrome trace events ('complete' events, in microseconds), which
+        chrome://tracing and https://ui.perfetto.dev open.
+
+        Args:
+            NA
+
+        Returns:
+            dict:   the trace, {'traceEvents': [...]}
+
+        Raises:
+            NA
+        """
+
+        threads = dict()
+        events = []
+        for record in list(self.records):
+            tid = threads.setdefault(record.thread, len(threads) + 1)
+            args = {key: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+                    for key, value in record.args.items()}
+            if record.error is not None:
+                args['error'] = record.error
+            events.append({'name': record.name, 'cat': record.category or 'default', 'ph': 'X', 'pid': os.getpid(),
+                           'tid': tid, 'ts': (record.start - self.started) * 1e6, 'dur': record.duration * 1e6, 'args': args})
+        for thread, tid in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': thread}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+        LOGGER.info(f'Saved {len(self.records)} spans to {path}')
+
+
+def start_tracing():
+    """
+    This function enables tracing, and returns the Tracer which collects the spans from now on.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing():
+    """
+    This function disables tracing, and returns the Tracer of the run (None if tracing was not enabled).
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, category='', detached=False, **args):
+    """
+    This function returns a context manager which records the time of its block as a span, e.g.
+    with span('adb shell', 'adb', command=command):
+        ...
+    While tracing is disabled it returns a shared no-op span.
+
+    Args:
+        name:       the span name
+        category:   the span category, e.g. 'adb', 'netsh', 'webdriver', 'sleep'
+        detached:   do not nest the span under the current one of the thread. Use it for spans of asyncio
+                    tasks, which interleave on a single thread
+        args:       arguments stored with the span
+
+    Returns:
+        Span:   the span context manager
+
+    Raises:
+        NA
+    """
+
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, category, detached, **args)
+
+
+def traced(name=None, category='step'):
+    """
+    This function returns a decorator which records every call of the decorated function as a span,
+    named after the function's qualified name (e.g. 'AndroidManager.turn_wifi_on') unless 'name' is given.
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.span(span_name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_webdriver(driver):
+    """
+    This function records every WebDriver command of 'driver' (including the ones of its elements) as a span
+    named 'webdriver <command>', by wrapping the driver's execute() method.
+
+    Args:
+        driver:     a selenium / Appium WebDriver
+
+    Returns:
+        the driver
+
+    Raises:
+        NA
+    """
+
+    execute = driver.execute
+
+    def traced_execute(driver_command, params=None):
+        if _tracer is None:
+            return execute(driver_command, params)
+        with _tracer.span(f'webdriver {driver_command}', 'webdriver'):
+            return execute(driver_command, params)
+
+    driver.execute = traced_execute
+    return driver
@@ -0,0 +1,181 @@
+import logging
+import re
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from waits import poll_until
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+_BOUNDS = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+
+class UiNode(namedtuple('UiNode', ['resource_id', 'text', 'content_desc', 'class_name', 'bounds', 'xpath'])):
+    """
+    A node of the uiautomator hierarchy. 'bounds' is (left, top, right, bottom) in screen pixels.
+    """
+
+    @property
+    def center(self):
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+
+def parse_bounds(bounds):
+    match = _BOUNDS.match(bounds or '')
+    return tuple(int(value) for value in match.groups()) if match else (0, 0, 0, 0)
+
+
+class UiSnapshot:
+    """
+    This class indexes one uiautomator page source (the 'page_source' of an Appium session) by resource id,
+    text, content description and absolute xpath, so element lookups on the same screen need no Appium round trip.
+    """
+
+    def __init__(self, source):
+        self.root = ET.fromstring(source.encode('utf-8') if isinstance(source, str) else source)
+        self.nodes = []
+        self.by_id = dict()
+        self.by_text = dict()
+        self.by_description = dict()
+        self.by_xpath = dict()
+        self._by_element = dict()
+        self._index(self.root, f'/{self.root.tag}')
+
+    def find_all(self, by, value):
+        """
+        This method returns the nodes which match a locator, in document order.
+
+        Args:
+            by:     'id', 'text', 'accessibility id' or 'xpath'. An xpath is either an absolute path
+                    (as in UiNode.xpath) or in the ElementTree xpath subset, e.g. '//*[@text="Wi-Fi"]'
+            value:  locator value
+
+        Returns:
+            list:   UiNode
+
+        Raises:
+            ValueError:     if the locator strategy is not supported
+        """
+
+        if by == 'id':
+            return self.by_id.get(value, [])
+        if by == 'text':
+            return self.by_text.get(value, [])
+        if by == 'accessibility id':
+            return self.by_description.get(value, [])
+        if by == 'xpath':
+            if value in self.by_xpath:
+                return [self.by_xpath[value]]
+            path = '.' + value if value.startswith('//') else value
+            try:
+                return [self._by_element[element] for element in self.root.iterfind(path) if element in self._by_element]
+            except SyntaxError:
+                LOGGER.debug(f'Unsupported xpath: {value}')
+                return []
+        raise ValueError(f'Unsupported locator strategy: {by}')
+
+    def find(self, by, value):
+        nodes = self.find_all(by, value)
+        return nodes[0] if nodes else None
+
+    def _index(self, element, xpath):
+        if element is not self.root:
+            node = UiNode(element.get('resource-id', ''), element.get('text', ''), element.get('content-desc', ''),
+                          element.get('class', element.tag), parse_bounds(element.get('bounds')), xpath)
+            self.nodes.append(node)
+            self._by_element[element] = node
+            self.by_xpath[xpath] = node
+            for index, key in ((self.by_id, node.resource_id), (self.by_text, node.text),
+                               (self.by_description, node.content_desc)):
+                if key:
+                    index.setdefault(key, []).append(node)
+
+        counts = dict()
+        for child in element:
+            counts[child.tag] = counts.get(child.tag, 0) + 1
+            self._index(child, f'{xpath}/{child.tag}[{counts[child.tag]}]')
+
+
+class UiSnapshotIndex:
+    """
+    This class resolves element lookups of an Appium session against a snapshot of the current screen,
+    which is fetched once (a single 'page_source' round trip) and dropped after every tap, since a tap may
+    change the screen. Elements are tapped by the center of their bounds, so a lookup and a click cost a
+    single round trip together.
+    """
+
+    def __init__(self, driver, timeout=10):
+        self.driver = driver
+        self.timeout = timeout
+        self.fetches = 0
+        self.lookups = 0
+        self.taps = 0
+        self._snapshot = None
+
+    def snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = UiSnapshot(self.driver.page_source)
+            self.fetches += 1
+        return self._snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def find(self, by, value, timeout=None):
+        """
+        This method returns the first node matching a locator. If the current snapshot has no match, the screen
+        is fetched again, with a growing interval, until the node shows up.
+
+        Args:
+            by:         'id', 'text', 'accessibility id' or 'xpath'
+            value:      locator value
+            timeout:    seconds to wait for the node. None uses the index timeout
+
+        Returns:
+            UiNode: the node
+
+        Raises:
+            WaitTimeoutError:   if the node did not show up in time
+        """
+
+        self.lookups += 1
+        node = self.snapshot().find(by, value)
+        if node is not None:
+            return node
+
+        def refetched():
+            self.invalidate()
+            return self.snapshot().find(by, value)
+
+        node, waited, polls = poll_until(refetched, timeout=self.timeout if timeout is None else timeout,
+                                         initial_interval=0.1, max_interval=0.5)
+        LOGGER.debug(f'{by}={value} showed up after {waited:.3f}s ({polls} page source fetches)')
+        return node
+
+    def tap(self, by, value, timeout=None):
+        """
+        This method taps the center of the first node matching a locator, and drops the snapshot.
+
+        Args:
+            by:         'id', 'text', 'accessibility id' or 'xpath'
+            value:      locator value
+            timeout:    seconds to wait for the node. None uses the index timeout
+
+        Returns:
+            UiNode: the tapped node
+
+        Raises:
+            WaitTimeoutError:   if the node did not show up in time
+        """
+
+        node = self.find(by, value, timeout)
+        x, y = node.center
+        # A W3C pointer action on the Appium clients which support it, TouchAction is deprecated
+        self.driver.tap([(x, y)])
+        self.taps += 1
+        self.invalidate()
+        LOGGER.debug(f'Tapped {by}={value} at ({x}, {y})')
+        return node
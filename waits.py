@@ -0,0 +1,161 @@
+import logging
+import time
+from collections import namedtuple
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+
+StepTiming = namedtuple('StepTiming', ['step', 'waited', 'polls', 'timed_out'])
+
+
+class WaitTimeoutError(Exception):
+    """
+    Raised when a waited condition was not met within its timeout.
+    """
+
+
+def poll_until(condition, timeout=10, initial_interval=0.05, max_interval=1.0, backoff=1.5, abort_on=()):
+    """
+    This function polls 'condition' until it returns a truthy value. The poll interval starts at
+    'initial_interval' and grows by 'backoff' after every miss, up to 'max_interval', so a condition
+    which is already met costs a single poll while a slow one is not polled in a busy loop.
+
+    Args:
+        condition:          a callable without arguments. Exceptions it raises count as a miss,
+                            except the ones listed in 'abort_on'
+        timeout:            seconds to wait before giving up
+        initial_interval:   first poll interval, in seconds
+        max_interval:       largest poll interval, in seconds
+        backoff:            poll interval multiplier
+        abort_on:           exception types which stop the wait right away
+
+    Returns:
+        tuple:  (condition result, seconds waited, number of polls)
+
+    Raises:
+        WaitTimeoutError:   if the condition was not met within 'timeout' seconds
+        abort_on:           if the condition raised one of them
+    """
+
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = initial_interval
+    polls = 0
+    last_error = None
+    while True:
+        polls += 1
+        try:
+            result = condition()
+            if result:
+                return result, time.monotonic() - start, polls
+        except abort_on:
+            raise
+        except Exception as error:
+            last_error = error
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise WaitTimeoutError(f'Condition was not met after {timeout}s and {polls} polls. Last error: {last_error!r}')
+        with span('poll wait', 'sleep'):
+            time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+class PageWaiter:
+    """
+    This class waits for WebDriver elements and page conditions instead of sleeping a fixed time.
+    Every wait is a named step, and the time each step actually waited is recorded in 'timings',
+    so slow steps can be spotted in the log.
+    'step_timeouts' overrides the default timeout of specific steps, e.g. {'save': 30}.
+    """
+
+    def __init__(self, driver, timeout=10, step_timeouts=None, initial_interval=0.05, max_interval=0.5):
+        self.driver = driver
+        self.timeout = timeout
+        self.step_timeouts = step_timeouts or dict()
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.timings = []
+
+    def until(self, step, condition, timeout=None):
+        """
+        This method waits until condition(driver) returns a truthy value.
+
+        Args:
+            step:       the step name, used for the timing record
+            condition:  a callable which gets the driver
+            timeout:    seconds to wait. None uses the step's timeout
+
+        Returns:
+            the condition result
+
+        Raises:
+            WaitTimeoutError:   if the condition was not met in time
+        """
+
+        if timeout is None:
+            timeout = self.step_timeouts.get(step, self.timeout)
+        start = time.monotonic()
+        try:
+            result, waited, polls = poll_until(lambda: condition(self.driver), timeout, self.initial_interval, self.max_interval)
+        except WaitTimeoutError:
+            self.timings.append(StepTiming(step, time.monotonic() - start, None, True))
+            LOGGER.error(f'Step "{step}" timed out after {timeout}s')
+            raise
+
+        self.timings.append(StepTiming(step, waited, polls, False))
+        LOGGER.debug(f'Step "{step}" waited {waited:.3f}s ({polls} polls)')
+        return result
+
+    def element(self, step, by, value, clickable=False, timeout=None):
+        """
+        This method waits until an element is displayed (and enabled, if 'clickable') and returns it.
+
+        Args:
+            step:       the step name, used for the timing record
+            by:         locator strategy, e.g. 'id' or 'xpath'
+            value:      locator value
+            clickable:  wait for the element to be enabled as well
+            timeout:    seconds to wait. None uses the step's timeout
+
+        Returns:
+            WebElement: the element
+
+        Raises:
+            WaitTimeoutError:   if the element did not show up in time
+        """
+
+        def find(driver):
+            for element in driver.find_elements(by, value):
+                if element.is_displayed() and (not clickable or element.is_enabled()):
+                    return element
+            return None
+
+        return self.until(step, find, timeout)
+
+    def total_waited(self):
+        return sum(timing.waited for timing in self.timings)
+
+    def report(self):
+        """
+        This method returns a table of the recorded step timings, slowest first.
+
+        Args:
+            NA
+
+        Returns:
+            str:    the table
+
+        Raises:
+            NA
+        """
+
+        lines = [f'{"step":<32} {"waited [s]":>10} {"polls":>6}']
+        for timing in sorted(self.timings, key=lambda timing: timing.waited, reverse=True):
+            polls = 'timeout' if timing.timed_out else timing.polls
+            lines.append(f'{timing.step:<32} {timing.waited:>10.3f} {polls:>6}')
+        lines.append(f'{"total":<32} {self.total_waited():>10.3f}')
+        return '\n'.join(lines)
@@ -0,0 +1,132 @@
+import logging
+import re
+import subprocess
+import time
+from collections import namedtuple
+from waits import WaitTimeoutError, poll_until
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.DEBUG)
+
+
+AssociationTiming = namedtuple('AssociationTiming', ['ssid', 'interface', 'transitions', 'associating', 'authenticating',
+                                                     'connected', 'ip_address', 'address', 'error'])
+AssociationTiming.__doc__ = '''
+Time-to-connect breakdown of a 'netsh wlan connect' request. 'transitions' is a list of (state, seconds) and
+associating / authenticating / connected / ip_address are the seconds from the request until the interface first
+reported that state (or got an IP address), None if it was not observed.
+'''
+
+_FIELD = re.compile(r'^\s*(.+?)\s+:\s(.*)$')
+_IP_ADDRESS = re.compile(r'IP Address:\s+(\d+\.\d+\.\d+\.\d+)')
+
+
+def parse_interfaces(reply):
+    """
+    This function parses the reply of 'netsh wlan show interfaces'.
+
+    Args:
+        reply:  the command output, as a str
+
+    Returns:
+        list:   dict per interface, with lower case keys, e.g. {'name': 'Wi-Fi', 'state': 'connected', 'ssid': ...}
+
+    Raises:
+        NA
+    """
+
+    interfaces = []
+    for line in reply.splitlines():
+        match = _FIELD.match(line)
+        if match is None:
+            continue
+        key, value = match.group(1).strip().lower(), match.group(2).strip()
+        if key == 'name':
+            interfaces.append(dict())
+        if interfaces and key not in interfaces[-1]:
+            interfaces[-1][key] = value
+    return interfaces
+
+
+def parse_ip_addresses(reply):
+    """
+    Returns the IPv4 addresses of a 'netsh interface ipv4 show addresses' reply, without link-local (169.254.x.x) ones.
+    """
+    return [address for address in _IP_ADDRESS.findall(reply) if not address.startswith('169.254.')]
+
+
+def _netsh(args):
+    with span(f'netsh {" ".join(args[:3])}', 'netsh'):
+        reply = subprocess.check_output(['netsh'] + args, stdin=None, stderr=None, shell=False, universal_newlines=False)
+    return reply.decode('utf-8', errors='replace')
+
+
+def wait_for_association(ssid, requested_at, timeout=30, interface=None, wait_for_ip=True):
+    """
+    This function polls 'netsh wlan show interfaces' (with a growing poll interval) after a 'netsh wlan connect'
+    request, records the state transitions of the interface (associating, authenticating, connected) and then
+    polls 'netsh interface ipv4 show addresses' until the interface has an IP address.
+    It fails fast when the interface falls back to 'disconnected' after it started to associate.
+
+    Args:
+        ssid:           the network name/ssid
+        requested_at:   time.monotonic() of the connect request
+        timeout:        seconds, from the request, to wait for the connection
+        interface:      the wireless interface name. None takes the first interface
+        wait_for_ip:    wait for an IP address as well
+
+    Returns:
+        AssociationTiming:  the timing breakdown. 'error' is None on success
+
+    Raises:
+        NA
+    """
+
+    transitions = []
+    first_seen = dict()
+    found = dict()
+
+    def connected():
+        interfaces = parse_interfaces(_netsh(['wlan', 'show', 'interfaces']))
+        current = next((entry for entry in interfaces if interface is None or entry.get('name') == interface), None)
+        if current is None:
+            return False
+        found['interface'] = current.get('name')
+        state = current.get('state', '').lower()
+        if not transitions or transitions[-1][0] != state:
+            elapsed = time.monotonic() - requested_at
+            transitions.append((state, elapsed))
+            first_seen.setdefault(state, elapsed)
+            LOGGER.debug(f'{found["interface"]}: {state} after {elapsed:.3f}s')
+        if state == 'disconnected' and ('associating' in first_seen or 'authenticating' in first_seen):
+            raise ConnectionError(f'{found["interface"]} disconnected while connecting to {ssid}')
+        return state == 'connected' and current.get('ssid') == ssid
+
+    def has_address():
+        addresses = parse_ip_addresses(_netsh(['interface', 'ipv4', 'show', 'addresses', found['interface']]))
+        if addresses:
+            found['address'] = addresses[0]
+            first_seen['ip_address'] = time.monotonic() - requested_at
+        return bool(addresses)
+
+    error = None
+    try:
+        poll_until(connected, timeout=max(requested_at + timeout - time.monotonic(), 0), initial_interval=0.02, max_interval=0.5,
+                   abort_on=(ConnectionError,))
+        if wait_for_ip:
+            poll_until(has_address, timeout=max(requested_at + timeout - time.monotonic(), 0), initial_interval=0.02, max_interval=0.5)
+    except WaitTimeoutError as exception:
+        error = f'Timed out after {timeout}s: {exception}'
+    except (ConnectionError, OSError, subprocess.CalledProcessError) as exception:
+        error = repr(exception)
+
+    timing = AssociationTiming(ssid, found.get('interface'), transitions, first_seen.get('associating'),
+                               first_seen.get('authenticating'), first_seen.get('connected'),
+                               first_seen.get('ip_address'), found.get('address'), error)
+    if error is None:
+        LOGGER.info(f'Connected to {ssid} in {timing.connected:.3f}s, got {timing.address} after {timing.ip_address or 0:.3f}s')
+    else:
+        LOGGER.error(f'Was unable to connect to {ssid}: {error}')
+    return timing
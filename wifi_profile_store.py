@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from collections import namedtuple
+from string import Template
+from xml.sax.saxutils import escape
+from tracing import span
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.DEBUG)
+
+
+WiFiProfile = namedtuple('WiFiProfile', ['type', 'ssid', 'password', 'authentication', 'encryption'])
+
+# 'netsh wlan add profile' replies of an installed profile
+PROFILE_ADDED_REPLIES = (b'added on interface', b'updated on interface')
+
+# Written as ASCII with character references (see WiFiProfileStore.profile_path), byte for byte the XML
+# WiFiManager.create_wifi_profile writes with ElementTree
+_PROFILE_HEAD = ('<WLANProfile xmlns="http://www.microsoft.com/networking/WLAN/profile/v1">'
+                 '<name>$ssid</name><SSIDConfig><SSID><name>$ssid</name></SSID></SSIDConfig>'
+                 '<connectionType>ESS</connectionType><connectionMode>auto</connectionMode><MSM><security>')
+PROFILE_TEMPLATES = {
+    'SECURED': Template(_PROFILE_HEAD +
+                        '<authEncryption><authentication>$authentication</authentication><encryption>$encryption</encryption>'
+                        '<useOneX>false</useOneX></authEncryption><sharedKey><keyType>passPhrase</keyType>'
+                        '<protected>false</protected><keyMaterial>$password</keyMaterial></sharedKey>'
+                        '</security></MSM></WLANProfile>'),
+    'OPEN': Template(_PROFILE_HEAD +
+                     '<authEncryption><authentication>open</authentication><encryption>none</encryption>'
+                     '<useOneX>false</useOneX></authEncryption></security></MSM>'
+                     '<MacRandomization xmlns="http://www.microsoft.com/networking/WLAN/profile/v3">'
+                     '<enableRandomization>false</enableRandomization><randomizationSeed>10821901</randomizationSeed>'
+                     '</MacRandomization></WLANProfile>'),
+}
+
+
+def render_profile(profile):
+    """
+    This function serialises a Wi-Fi profile to its XML from the precompiled template of its type.
+
+    Args:
+        profile:    WiFiProfile
+
+    Returns:
+        str:    the profile XML
+
+    Raises:
+        ValueError:     if the profile type is not 'SECURED' or 'OPEN'
+    """
+
+    if profile.type not in PROFILE_TEMPLATES:
+        raise ValueError(f'A wrong input value for "network_type" parameter was delivered: {profile.type}')
+    return PROFILE_TEMPLATES[profile.type].substitute(ssid=escape(profile.ssid), password=escape(profile.password or ''),
+                                                      authentication=escape(profile.authentication or ''),
+                                                      encryption=escape(profile.encryption or ''))
+
+
+def profile_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class WiFiProfileStore:
+    """
+    This class installs Wi-Fi profiles with 'netsh wlan add profile' only when they are new or changed.
+    Every profile is written once to a content-addressed file (<hash>.xml) in 'profiles_dir', and the hash
+    installed per ssid is recorded in 'state_path', so reinstalling an identical profile costs no netsh call,
+    also across runs.
+    """
+
+    def __init__(self, profiles_dir, state_path=None):
+        self.profiles_dir = profiles_dir
+        self.state_path = state_path or os.path.join(profiles_dir, 'installed_profiles.json')
+        self.netsh_calls = 0
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        self.installed = self._load_state()
+
+    def profile_path(self, profile):
+        """
+        This method writes the profile XML to its content-addressed file, unless it already exists.
+
+        Args:
+            profile:    WiFiProfile
+
+        Returns:
+            tuple:  (profile hash, profile file path)
+
+        Raises:
+            ValueError:     if the profile type is not 'SECURED' or 'OPEN'
+        """
+
+        content = render_profile(profile)
+        digest = profile_hash(content)
+        path = os.path.join(self.profiles_dir, f'{digest}.xml')
+        if not os.path.exists(path):
+            # ASCII with character references, as ElementTree writes without an XML declaration, so a
+            # non-ASCII ssid reads back the same whatever the locale encoding of netsh is
+            with open(path, 'w', encoding='ascii', errors='xmlcharrefreplace') as profile_file:
+                profile_file.write(content)
+        return digest, path
+
+    def install(self, profile):
+        """
+        This method adds the profile to the profile list, if it is not installed yet or changed, using:
+        'netsh wlan add profile filename=<wifi_profile_xml_file>'
+
+        Args:
+            profile:    WiFiProfile
+
+        Returns:
+            True:   If netsh installed the profile
+            None:   If an identical profile was already installed, so netsh was skipped
+            False:  If netsh failed
+
+        Raises:
+            NA
+        """
+
+        installed = self._install(profile)
+        self._save_state()
+        return installed
+
+    def install_many(self, profiles):
+        """
+        This method installs a whole set of profiles in one pass. Only new or changed profiles reach netsh,
+        and the installed state is saved once at the end.
+
+        Args:
+            profiles:   WiFiProfile tuples
+
+        Returns:
+            int:    the number of profiles netsh installed
+
+        Raises:
+            NA
+        """
+
+        try:
+            return sum(1 for profile in profiles if self._install(profile))
+        finally:
+            self._save_state()
+
+    def forget(self, ssid=None):
+        """
+        This method forgets that a profile (or all profiles) were installed, e.g. after they were deleted with
+        'netsh wlan delete profile'.
+        """
+        if ssid is None:
+            self.installed.clear()
+        else:
+            self.installed.pop(ssid, None)
+        self._save_state()
+
+    def _install(self, profile):
+        digest, path = self.profile_path(profile)
+        if self.installed.get(profile.ssid) == digest:
+            LOGGER.debug(f'Profile {profile.ssid} is already installed')
+            return None
+
+        args = ['netsh', 'wlan', 'add', 'profile', f'filename={path}']
+        self.netsh_calls += 1
+        try:
+            with span('netsh wlan add profile', 'netsh', ssid=profile.ssid):
+                reply = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
+        except (OSError, subprocess.CalledProcessError) as error:
+            LOGGER.error(f'Was unable to add profile {profile.ssid}: {error}')
+            return False
+
+        if not any(added in reply for added in PROFILE_ADDED_REPLIES):
+            LOGGER.error(f'{reply}')
+            return False
+        LOGGER.info(f'{reply}')
+        self.installed[profile.ssid] = digest
+        return True
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return dict()
+        with open(self.state_path) as state_file:
+            return json.load(state_file)
+
+    def _save_state(self):
+        temp_path = f'{self.state_path}.tmp'
+        with open(temp_path, 'w') as state_file:
+            json.dump(self.installed, state_file)
+        os.replace(temp_path, self.state_path)
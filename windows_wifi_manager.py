@@ -1,5 +1,10 @@
+import asyncio
 import logging
 from logger import init_logger
+from async_subprocess import run_command, run_sync
+from wifi_profile_store import PROFILE_ADDED_REPLIES, WiFiProfile
+from wifi_association import AssociationTiming, wait_for_association
+from tracing import traced
 import xml.etree.cElementTree as XML
 import subprocess
 import time
@@ -8,6 +13,9 @@ import time
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.DEBUG)
 
+# 'netsh wlan connect' reply of an accepted connection request
+CONNECT_COMPLETED_REPLY = b'request was completed successfully'
+
 
 class WiFiManager:
     """
@@ -17,10 +25,15 @@ class WiFiManager:
     Once the profile file is created, it can be added to the profiles list.
     The next step is to connect the Windows machine to the network - this is done
     by the executing the 'netsh wlan connect' command.
+
+    With a 'profile_store' (see wifi_profile_store.WiFiProfileStore), create_wifi_profile renders the profile
+    from a precompiled template and add_wifi_profile calls netsh only if the profile is new or changed.
     """
 
-    def __init__(self, wifi_profile_filename):
+    def __init__(self, wifi_profile_filename, profile_store=None):
         self.wifi_profile_filename = wifi_profile_filename
+        self.profile_store = profile_store
+        self.profile = None
         self.ssid = ''
         self.root = ''
         self.ssid_config = ''
@@ -33,6 +46,7 @@ class WiFiManager:
         self.reply_msg2 = ''
         self.network_type = ''
 
+    @traced()
     def create_wifi_profile(self, type, ssid, password, authentication, encryption):
         """
         This method create the profile.xml file.
@@ -52,6 +66,16 @@ class WiFiManager:
 
         self.ssid = ssid
 
+        if self.profile_store is not None:
+            self.network_type = type
+            self.profile = WiFiProfile(type, ssid, password, authentication, encryption)
+            try:
+                digest, self.wifi_profile_filename = self.profile_store.profile_path(self.profile)
+                LOGGER.info(f'{self.wifi_profile_filename} was created successfully')
+            except ValueError as error:
+                LOGGER.error(f'{error}')
+            return
+
         self.root = XML.Element("WLANProfile", attrib={'xmlns': 'http://www.microsoft.com/networking/WLAN/profile/v1'})
         XML.SubElement(self.root, "name").text = self.ssid
         self.ssid_config = XML.SubElement(self.root, "SSIDConfig")
@@ -92,6 +116,7 @@ class WiFiManager:
         except:
             LOGGER.error(f'Was unable to create {self.wifi_profile_filename}')
 
+    @traced()
     def add_wifi_profile(self):
         """
         This method adds the profile to the profile list using the next Windows cmd command:
@@ -106,45 +131,150 @@ class WiFiManager:
             encryption:         Should be set to 'AES'
 
         Returns:
-            NA
+            True:   If the profile was added
+            None:   If an identical profile was already installed through the profile store
+            False:  If netsh failed
 
         Raises:
             NA
         """
 
-        args = ['netsh', 'wlan', 'add', 'profile', f'filename={self.wifi_profile_filename}']
-        try:
-            self.add_profile_reply_msg = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            if b'added on interface' in self.add_profile_reply_msg:
-                LOGGER.info(f'{self.add_profile_reply_msg}')
-                # return self.ssid
+        if self.profile_store is not None and self.profile is not None:
+            return self.profile_store.install(self.profile)
 
-        except():
-            LOGGER.error(f'{self.add_profile_reply_msg}')
+        return run_sync(AsyncWiFiManager(manager=self).add_wifi_profile())
 
-    def connect_to_wifi(self, ssid):
+    @traced()
+    def install_profiles(self, profiles):
+        """
+        This method installs a whole set of profiles in one pass through the profile store. Only new or
+        changed profiles reach 'netsh wlan add profile'.
+
+        Args:
+            profiles:   WiFiProfile tuples, e.g. WiFiProfile('SECURED', ssid, password, 'WPA2PSK', 'AES')
+
+        Returns:
+            int:    the number of profiles netsh installed
+
+        Raises:
+            ValueError:     if the manager has no profile store
+        """
+
+        if self.profile_store is None:
+            raise ValueError('install_profiles needs a WiFiManager with a profile_store')
+        return self.profile_store.install_many(profiles)
+
+    @traced()
+    def connect_to_wifi(self, ssid, wait=False, timeout=30, interface=None):
         """
         This method connects the windows machine to the wi-fi network using the next Windows cmd command:
         'netsh wlan connect name=<network_ssid>'
+        With 'wait', it then polls the interface until it is connected and has an IP address, and returns
+        the time-to-connect breakdown.
 
         Args:
-            ssid: The network name/ssid
+            ssid:       The network name/ssid
+            wait:       wait until the interface is connected and has an IP address
+            timeout:    seconds to wait for the connection
+            interface:  the wireless interface name. None takes the first interface
+
+        Returns:
+            AssociationTiming:  the timing breakdown, if 'wait' was set. NA otherwise
+
+        Raises:
+            NA
+        """
+
+        requested_at = time.monotonic()
+        connected = run_sync(AsyncWiFiManager(manager=self).connect_to_wifi(ssid, interface=interface))
+        if not wait:
+            return
+        if not connected:
+            return AssociationTiming(ssid, interface, [], None, None, None, None, None,
+                                     f'netsh wlan connect failed: {self.reply_msg2!r}')
+        return wait_for_association(ssid, requested_at, timeout, interface)
+
+
+class AsyncWiFiManager:
+    """
+    This class runs WiFiManager's 'netsh' commands with asyncio; WiFiManager's own netsh methods wrap it.
+    Every command runs with asyncio.create_subprocess_exec under a per-call timeout, and at most
+    'max_concurrency' netsh processes run at the same time. Cancelling a call kills its netsh process.
+    The profile file itself is created by the WiFiManager 'manager' (a new one for 'wifi_profile_filename'
+    by default), which also keeps the netsh replies.
+    """
+
+    def __init__(self, wifi_profile_filename=None, timeout=30, max_concurrency=4, limiter=None, manager=None):
+        self.manager = manager if manager is not None else WiFiManager(wifi_profile_filename)
+        self.timeout = timeout
+        self.limiter = limiter if limiter is not None else asyncio.Semaphore(max_concurrency)
+
+    def create_wifi_profile(self, type, ssid, password, authentication, encryption):
+        self.manager.create_wifi_profile(type, ssid, password, authentication, encryption)
+
+    def install_profiles(self, profiles):
+        return self.manager.install_profiles(profiles)
+
+    async def add_wifi_profile(self, timeout=None):
+        """
+        This coroutine adds the profile to the profile list using the next Windows cmd command:
+        'netsh wlan add profile filename=<wifi_profile_xml_file>'
+
+        Args:
+            timeout:    seconds to wait for netsh. None uses the manager's timeout
 
         Returns:
+            True:   If the profile was added
+            False:  If netsh failed or timed out
+
+        Raises:
             NA
+        """
+
+        args = ['netsh', 'wlan', 'add', 'profile', f'filename={self.manager.wifi_profile_filename}']
+        reply = self.manager.add_profile_reply_msg = await self._run(args, timeout)
+        if reply is not None and any(added in reply for added in PROFILE_ADDED_REPLIES):
+            LOGGER.info(f'{reply}')
+            return True
+        if reply is not None:
+            LOGGER.error(f'{reply}')
+        return False
+
+    async def connect_to_wifi(self, ssid, timeout=None, interface=None):
+        """
+        This coroutine connects the windows machine to the wi-fi network using the next Windows cmd command:
+        'netsh wlan connect name=<network_ssid>'
+
+        Args:
+            ssid:       The network name/ssid
+            timeout:    seconds to wait for netsh. None uses the manager's timeout
+            interface:  the wireless interface name. None lets netsh pick it
+
+        Returns:
+            True:   If the connection request was completed
+            False:  If netsh failed or timed out
 
         Raises:
             NA
         """
 
         args = ['netsh', 'wlan', 'connect', f'name={ssid}']
-        try:
-            self.reply_msg2 = subprocess.check_output(args, stdin=None, stderr=None, shell=False, universal_newlines=False)
-            if b'request was completed successfully' in self.reply_msg2:
-                LOGGER.info(f'{self.reply_msg2}')
+        if interface is not None:
+            args.append(f'interface={interface}')
+        reply = self.manager.reply_msg2 = await self._run(args, timeout)
+        if reply is not None and CONNECT_COMPLETED_REPLY in reply:
+            LOGGER.info(f'{reply}')
+            return True
+        if reply is not None:
+            LOGGER.error(f'{reply}')
+        return False
 
-        except:
-            LOGGER.error(f'{self.reply_msg2}')
+    async def _run(self, args, timeout):
+        try:
+            return await run_command(args, timeout=timeout or self.timeout, limiter=self.limiter)
+        except (asyncio.TimeoutError, subprocess.CalledProcessError, OSError) as error:
+            LOGGER.error(f'Got exception while trying to run "{" ".join(args)}": {error!r}')
+            return None
 
 
 if __name__ == '__main__':